@@ -3,32 +3,16 @@ Agent Prompt Templates for Invoice Extraction Workflow
 Standardized prompts for each agent type in the subagent orchestration system
 """
 
-def get_property_extraction_prompt(property_name, units, invoice_folder, expected_invoices):
-    """
-    Generate prompt for property-specific invoice extraction agent
-
-    Args:
-        property_name: Name of the property
-        units: Number of units at the property
-        invoice_folder: Path to invoice folder
-        expected_invoices: Expected number of invoices
-
-    Returns:
-        Formatted prompt string
-    """
-    return f"""
-You are a property-specific invoice extraction agent for the Orion Portfolio.
-
-## ASSIGNMENT
-
-**Property:** {property_name}
-**Units:** {units}
-**Invoice Folder:** {invoice_folder}
-**Expected Invoices:** {expected_invoices}
+# Static part of the property extraction prompt. It is identical for every
+# property, so it can be sent as a cached prompt prefix
+# (vision_client.cached_system) with only the short assignment varying.
+PROPERTY_EXTRACTION_INSTRUCTIONS = """You are a property-specific invoice extraction agent for the Orion Portfolio.
 
 ## YOUR TASK
 
 Extract structured data from all PDF invoices in the assigned folder.
+Your property, unit count, folder and expected invoice count are given in
+the ASSIGNMENT section at the end of this prompt.
 
 ## EXTRACTION PROCESS
 
@@ -71,16 +55,16 @@ For each invoice PDF:
 
 ## OUTPUT FORMAT
 
-Save results as JSON array to: `extraction_results/{property_name}_invoices.json`
+Save results as JSON array to: `extraction_results/<Property Name>_invoices.json` (property name from the ASSIGNMENT)
 
 ```json
 [
-  {{
+  {
     "filename": "invoice.pdf",
-    "property": "{property_name}",
-    "units": {units},
+    "property": "<Property Name>",
+    "units": <Units>,
     "extraction_timestamp": "2025-10-23T10:30:00",
-    "invoice_data": {{
+    "invoice_data": {
       "invoice_number": "2024-12345",
       "invoice_date": "October 1, 2024",
       "month": "10-2024",
@@ -97,12 +81,12 @@ Save results as JSON array to: `extraction_results/{property_name}_invoices.json
       "container_size_yd3": 8,
       "pickups_per_week": 3,
       "service_description": "4x 8-yd, 1x 6-yd, 1x 4-yd (4x/week)"
-    }},
-    "calculated_fields": {{
+    },
+    "calculated_fields": {
       "cost_per_door": 10.68,
       "controllable_charges": 266.20,
       "controllable_percentage": 3.49
-    }},
+    },
     "confidence": 0.95,
     "extraction_notes": [
       "All required fields extracted successfully",
@@ -110,7 +94,7 @@ Save results as JSON array to: `extraction_results/{property_name}_invoices.json
       "Service configuration identified"
     ],
     "warnings": []
-  }},
+  },
   ...
 ]
 ```
@@ -147,11 +131,51 @@ Before finalizing:
 3. All CPD values are within 5-40 range
 4. JSON is valid and properly formatted
 5. Output file saved to correct location
+"""
+
+
+def get_property_extraction_assignment(property_name, units, invoice_folder, expected_invoices):
+    """
+    Per-property tail of the extraction prompt (the only part that varies)
+
+    Returns:
+        Formatted assignment string
+    """
+    return f"""
+## ASSIGNMENT
+
+**Property:** {property_name}
+**Units:** {units}
+**Invoice Folder:** {invoice_folder}
+**Expected Invoices:** {expected_invoices}
+
+Save results to: `extraction_results/{property_name}_invoices.json`
 
 Begin extraction now. Process all {expected_invoices} invoices efficiently and accurately.
 """
 
 
+def get_property_extraction_prompt(property_name, units, invoice_folder, expected_invoices):
+    """
+    Generate prompt for property-specific invoice extraction agent
+
+    The static instructions come first and the property assignment last, so
+    the instructions form a shared prefix that prompt caching can reuse.
+
+    Args:
+        property_name: Name of the property
+        units: Number of units at the property
+        invoice_folder: Path to invoice folder
+        expected_invoices: Expected number of invoices
+
+    Returns:
+        Formatted prompt string
+    """
+    return PROPERTY_EXTRACTION_INSTRUCTIONS + get_property_extraction_assignment(
+        property_name, units, invoice_folder, expected_invoices
+    )
+
+
 def get_validation_prompt():
     """Generate prompt for validation agent"""
     return """
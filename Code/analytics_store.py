@@ -0,0 +1,583 @@
+"""
+SQLite Analytics Store
+Indexed invoices, line items, services, contracts and properties with a prepared-query layer
+
+Questions like "all line items for Orion McKinney in 2025-03", "does invoice
+0615-002287935 already exist" or "category totals per property" used to load
+whole sheets into pandas and boolean-filter them. The store keeps the same
+data in an embedded SQLite database, indexed on property, invoice month,
+invoice number and category, so those lookups are index seeks that stay in
+milliseconds at millions of line items. Amounts are stored as integer cents
+so totals add up exactly.
+
+Imports replace everything previously loaded from the same source file, so
+re-importing the master workbook or an extraction JSON is idempotent:
+    import_master()     Property Overview, Service Details, Contract Terms
+                        and every line-item tab (read through invoice_ledger)
+    import_extraction() Extraction_Data_*.json from batch_extract_all_invoices
+
+Layout:
+    Extraction_Output/analytics.sqlite
+
+Environment:
+    ANALYTICS_DB_PATH=<path>   Override database location
+
+USAGE:
+    python Code/analytics_store.py import-master
+    python Code/analytics_store.py import-json Extraction_Output/Extraction_Data_20251109_120000.json
+    python Code/analytics_store.py lines "Orion McKinney" --month 2025-03
+    python Code/analytics_store.py exists 0615-002287935
+    python Code/analytics_store.py totals
+
+    from analytics_store import open_store
+
+    store = open_store()
+    store.line_items("Orion McKinney", month="2025-03")
+    store.invoice_exists("0615-002287935")
+    store.category_totals()
+"""
+
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from invoice_ledger import MASTER_FILE, is_line_item_sheet, read_master_sheet
+from line_item_table import cents_to_dollars, to_cents
+from master_workbook import MasterWorkbook
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_STORE_PATH = BASE_DIR / "Extraction_Output" / "analytics.sqlite"
+STORE_PATH = Path(os.environ.get("ANALYTICS_DB_PATH", DEFAULT_STORE_PATH))
+
+# Line-item tabs name the same things differently depending on how they were built
+AMOUNT_COLUMNS = ("Extended Amount", "Line Item Amount", "Invoice Amount")
+INVOICE_AMOUNT_COLUMNS = ("Invoice Amount", "Total Amount")
+CATEGORY_COLUMNS = ("Category", "Service Type")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS properties (
+    property_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    state TEXT,
+    unit_count INTEGER,
+    service_type TEXT,
+    property_type TEXT
+);
+
+CREATE TABLE IF NOT EXISTS invoices (
+    invoice_id INTEGER PRIMARY KEY,
+    property_id INTEGER NOT NULL REFERENCES properties(property_id),
+    vendor TEXT,
+    account_number TEXT,
+    invoice_number TEXT,
+    invoice_date TEXT,
+    invoice_month TEXT,
+    due_date TEXT,
+    amount_cents INTEGER,
+    source_file TEXT,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_invoices_number ON invoices(invoice_number);
+CREATE INDEX IF NOT EXISTS idx_invoices_property_date ON invoices(property_id, invoice_date);
+CREATE INDEX IF NOT EXISTS idx_invoices_source ON invoices(source);
+
+CREATE TABLE IF NOT EXISTS line_items (
+    line_item_id INTEGER PRIMARY KEY,
+    invoice_id INTEGER NOT NULL REFERENCES invoices(invoice_id) ON DELETE CASCADE,
+    property_id INTEGER NOT NULL,
+    invoice_month TEXT,
+    service_date TEXT,
+    description TEXT,
+    category TEXT,
+    quantity REAL,
+    unit_rate_cents INTEGER,
+    amount_cents INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_line_items_property_month ON line_items(property_id, invoice_month, invoice_id, amount_cents);
+CREATE INDEX IF NOT EXISTS idx_line_items_property_category ON line_items(property_id, category, amount_cents);
+CREATE INDEX IF NOT EXISTS idx_line_items_invoice ON line_items(invoice_id);
+
+CREATE TABLE IF NOT EXISTS services (
+    service_id INTEGER PRIMARY KEY,
+    property_id INTEGER NOT NULL REFERENCES properties(property_id),
+    container_type TEXT,
+    container_size TEXT,
+    quantity REAL,
+    frequency TEXT,
+    total_yards REAL,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_services_property ON services(property_id);
+
+CREATE TABLE IF NOT EXISTS contracts (
+    contract_id INTEGER PRIMARY KEY,
+    property_id INTEGER NOT NULL REFERENCES properties(property_id),
+    vendor TEXT,
+    contract_start TEXT,
+    contract_term TEXT,
+    contract_end TEXT,
+    auto_renewal TEXT,
+    notice_period TEXT,
+    notice_deadline TEXT,
+    contract_file TEXT,
+    status TEXT,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_contracts_property ON contracts(property_id);
+"""
+
+# Every query the store runs; sqlite3 keeps the compiled statements in its per-connection cache.
+# Optional filters get their own statement so the planner can always use the index.
+QUERIES = {
+    "property_id": "SELECT property_id FROM properties WHERE name = ?",
+    "line_items": """
+        SELECT p.name AS property, i.vendor, i.invoice_number, i.invoice_date, li.service_date,
+               li.description, li.category, li.quantity, li.unit_rate_cents, li.amount_cents, i.source_file
+        FROM line_items li
+        JOIN invoices i ON i.invoice_id = li.invoice_id
+        JOIN properties p ON p.property_id = li.property_id
+        WHERE li.property_id = (SELECT property_id FROM properties WHERE name = ?)
+        ORDER BY i.invoice_date, li.line_item_id""",
+    "line_items_month": """
+        SELECT p.name AS property, i.vendor, i.invoice_number, i.invoice_date, li.service_date,
+               li.description, li.category, li.quantity, li.unit_rate_cents, li.amount_cents, i.source_file
+        FROM line_items li
+        JOIN invoices i ON i.invoice_id = li.invoice_id
+        JOIN properties p ON p.property_id = li.property_id
+        WHERE li.property_id = (SELECT property_id FROM properties WHERE name = ?) AND li.invoice_month = ?
+        ORDER BY i.invoice_date, li.line_item_id""",
+    "invoice_exists": """
+        SELECT EXISTS(SELECT 1 FROM invoices WHERE invoice_number = ?)""",
+    "property_invoice_exists": """
+        SELECT EXISTS(
+            SELECT 1 FROM invoices
+            WHERE invoice_number = ? AND property_id = (SELECT property_id FROM properties WHERE name = ?))""",
+    "invoices": """
+        SELECT p.name AS property, i.vendor, i.account_number, i.invoice_number, i.invoice_date,
+               i.due_date, i.amount_cents, i.source_file, i.source
+        FROM invoices i JOIN properties p ON p.property_id = i.property_id
+        WHERE i.property_id = (SELECT property_id FROM properties WHERE name = ?)
+          AND (? IS NULL OR i.invoice_date >= ?)
+          AND (? IS NULL OR i.invoice_date <= ?)
+        ORDER BY i.invoice_date""",
+    "category_totals": """
+        SELECT p.name AS property, li.category, COUNT(*) AS line_items, SUM(li.amount_cents) AS total_cents
+        FROM line_items li JOIN properties p ON p.property_id = li.property_id
+        GROUP BY li.property_id, li.category
+        ORDER BY p.name, li.category""",
+    "property_category_totals": """
+        SELECT p.name AS property, li.category, COUNT(*) AS line_items, SUM(li.amount_cents) AS total_cents
+        FROM line_items li JOIN properties p ON p.property_id = li.property_id
+        WHERE li.property_id = (SELECT property_id FROM properties WHERE name = ?)
+        GROUP BY li.category
+        ORDER BY li.category""",
+    "monthly_totals": """
+        SELECT li.invoice_month, COUNT(DISTINCT li.invoice_id) AS invoices, SUM(li.amount_cents) AS total_cents
+        FROM line_items li
+        WHERE li.property_id = (SELECT property_id FROM properties WHERE name = ?)
+        GROUP BY li.invoice_month
+        ORDER BY li.invoice_month""",
+    "services": """
+        SELECT s.container_type, s.container_size, s.quantity, s.frequency, s.total_yards
+        FROM services s WHERE s.property_id = (SELECT property_id FROM properties WHERE name = ?)""",
+    "contracts": """
+        SELECT c.vendor, c.contract_start, c.contract_term, c.contract_end, c.auto_renewal,
+               c.notice_period, c.notice_deadline, c.contract_file, c.status
+        FROM contracts c WHERE c.property_id = (SELECT property_id FROM properties WHERE name = ?)""",
+    "insert_invoice": """
+        INSERT INTO invoices (property_id, vendor, account_number, invoice_number, invoice_date,
+                              invoice_month, due_date, amount_cents, source_file, source)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+    "insert_line_item": """
+        INSERT INTO line_items (invoice_id, property_id, invoice_month, service_date, description,
+                                category, quantity, unit_rate_cents, amount_cents)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+}
+
+
+def _iso_date(value):
+    """YYYY-MM-DD text (or None) from a date, timestamp or date string"""
+    if value is None or value is pd.NaT or (isinstance(value, float) and value != value) or value == "":
+        return None
+    parsed = pd.to_datetime(value, errors="coerce")
+    return None if pd.isna(parsed) else parsed.strftime("%Y-%m-%d")
+
+
+def _clean(value):
+    """None for NaN/blank cells, plain Python values otherwise"""
+    if value is None or (isinstance(value, float) and value != value) or value is pd.NaT:
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    if isinstance(value, str) and not value.strip():
+        return None
+    return value
+
+
+def _text(value):
+    value = _clean(value)
+    return None if value is None else str(value)
+
+
+def _identifier(value):
+    """Invoice/account number as text; a number read as float ("71009.0") keeps its integer form"""
+    value = _clean(value)
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    text = str(value).strip()
+    if text.endswith(".0") and text[:-2].isdigit():
+        return text[:-2]
+    return text or None
+
+
+def _number(value):
+    value = _clean(value)
+    try:
+        return None if value is None else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _first_column(columns, candidates):
+    return next((column for column in candidates if column in columns), None)
+
+
+class AnalyticsStore:
+    """Embedded SQLite store of the portfolio's invoice data"""
+
+    def __init__(self, db_path=STORE_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False,
+                                     cached_statements=len(QUERIES) * 4)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, name, params=()):
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(QUERIES[name], params)]
+
+    # -- import ------------------------------------------------------------
+
+    def _property_id(self, name, **details):
+        """Id for a property name, creating the row (or filling in details) as needed"""
+        row = self._conn.execute(QUERIES["property_id"], (name,)).fetchone()
+        if row is None:
+            cursor = self._conn.execute(
+                "INSERT INTO properties (name, state, unit_count, service_type, property_type) VALUES (?, ?, ?, ?, ?)",
+                (name, details.get("state"), details.get("unit_count"), details.get("service_type"),
+                 details.get("property_type"))
+            )
+            return cursor.lastrowid
+        if details:
+            self._conn.execute(
+                """UPDATE properties SET state = COALESCE(?, state), unit_count = COALESCE(?, unit_count),
+                       service_type = COALESCE(?, service_type), property_type = COALESCE(?, property_type)
+                   WHERE property_id = ?""",
+                (details.get("state"), details.get("unit_count"), details.get("service_type"),
+                 details.get("property_type"), row[0])
+            )
+        return row[0]
+
+    def _replace_source(self, source):
+        """Drop everything an earlier import of this source loaded"""
+        # Line items go with their invoices (ON DELETE CASCADE)
+        self._conn.execute("DELETE FROM invoices WHERE source = ?", (source,))
+        self._conn.execute("DELETE FROM services WHERE source = ?", (source,))
+        self._conn.execute("DELETE FROM contracts WHERE source = ?", (source,))
+
+    def _insert_invoice(self, property_id, invoice, line_items, source):
+        invoice_date = invoice.get("invoice_date")
+        invoice_month = invoice_date[:7] if invoice_date else None
+        cursor = self._conn.execute(QUERIES["insert_invoice"], (
+            property_id, invoice.get("vendor"), invoice.get("account_number"), invoice.get("invoice_number"),
+            invoice_date, invoice_month, invoice.get("due_date"), invoice.get("amount_cents"),
+            invoice.get("source_file"), source
+        ))
+        self._conn.executemany(QUERIES["insert_line_item"], [
+            (cursor.lastrowid, property_id, invoice_month, item.get("service_date"), item.get("description"),
+             item.get("category"), item.get("quantity"), item.get("unit_rate_cents"), item.get("amount_cents"))
+            for item in line_items
+        ])
+
+    def import_master(self, master_path=MASTER_FILE):
+        """
+        Load properties, services, contracts and every line-item tab of a master workbook
+
+        Returns:
+            Dict of counts: properties, invoices, line_items, services, contracts, seconds
+        """
+        started = time.perf_counter()
+        master_path = Path(master_path).resolve()
+        source = f"master:{master_path.name}"
+        stats = {"properties": 0, "invoices": 0, "line_items": 0, "services": 0, "contracts": 0}
+        sheet_names = MasterWorkbook.open(master_path).sheet_names
+
+        with self._lock, self._conn:
+            self._replace_source(source)
+
+            if "Property Overview" in sheet_names:
+                for _, row in read_master_sheet("Property Overview", master_path).iterrows():
+                    name = _text(row.get("Property Name"))
+                    # Skip the PORTFOLIO TOTAL roll-up row
+                    if name is None or name.upper().endswith("TOTAL"):
+                        continue
+                    unit_count = _number(row.get("Unit Count"))
+                    self._property_id(
+                        name, state=_text(row.get("State")),
+                        unit_count=int(unit_count) if unit_count is not None else None,
+                        service_type=_text(row.get("Service Type")), property_type=_text(row.get("Property Type"))
+                    )
+                    stats["properties"] += 1
+
+            if "Service Details" in sheet_names:
+                rows = [
+                    (self._property_id(_text(row["Property"])), _text(row.get("Container Type")),
+                     _text(row.get("Container Size")), _number(row.get("Quantity")), _text(row.get("Frequency")),
+                     _number(row.get("Total Yards")), source)
+                    for _, row in read_master_sheet("Service Details", master_path).iterrows()
+                    if _text(row.get("Property"))
+                ]
+                self._conn.executemany(
+                    """INSERT INTO services (property_id, container_type, container_size, quantity, frequency,
+                                             total_yards, source) VALUES (?, ?, ?, ?, ?, ?, ?)""", rows)
+                stats["services"] = len(rows)
+
+            if "Contract Terms" in sheet_names:
+                rows = [
+                    (self._property_id(_text(row["Property"])), _text(row.get("Vendor")),
+                     _iso_date(row.get("Contract Start")) or _text(row.get("Contract Start")),
+                     _text(row.get("Contract Term")),
+                     _iso_date(row.get("Contract End")) or _text(row.get("Contract End")),
+                     _text(row.get("Auto Renewal")), _text(row.get("Notice Period")),
+                     _iso_date(row.get("Notice Deadline")) or _text(row.get("Notice Deadline")),
+                     _text(row.get("Contract File")), _text(row.get("Status")), source)
+                    for _, row in read_master_sheet("Contract Terms", master_path).iterrows()
+                    if _text(row.get("Property"))
+                ]
+                self._conn.executemany(
+                    """INSERT INTO contracts (property_id, vendor, contract_start, contract_term, contract_end,
+                                              auto_renewal, notice_period, notice_deadline, contract_file, status,
+                                              source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+                stats["contracts"] = len(rows)
+
+            for sheet_name in sheet_names:
+                df = read_master_sheet(sheet_name, master_path)
+                if not is_line_item_sheet(df):
+                    continue
+                invoices, line_items = self._import_line_item_sheet(sheet_name, df, source)
+                stats["invoices"] += invoices
+                stats["line_items"] += line_items
+
+        self._optimize()
+        stats["seconds"] = time.perf_counter() - started
+        return stats
+
+    def _import_line_item_sheet(self, property_name, df, source):
+        property_id = self._property_id(property_name)
+        amount_column = _first_column(df.columns, AMOUNT_COLUMNS)
+        invoice_amount_column = _first_column(df.columns, INVOICE_AMOUNT_COLUMNS)
+        category_column = _first_column(df.columns, CATEGORY_COLUMNS)
+
+        invoices = {}
+        for _, row in df.iterrows():
+            invoice_date = _iso_date(row.get("Invoice Date"))
+            key = (_identifier(row.get("Invoice Number")), invoice_date, _text(row.get("Vendor")),
+                   _text(row.get("Source File")))
+            if key not in invoices:
+                invoices[key] = ({
+                    "vendor": key[2],
+                    "account_number": _identifier(row.get("Account Number")),
+                    "invoice_number": key[0],
+                    "invoice_date": invoice_date,
+                    "due_date": _iso_date(row.get("Due Date")),
+                    "amount_cents": to_cents(_clean(row.get(invoice_amount_column))) if invoice_amount_column else None,
+                    "source_file": key[3]
+                }, [])
+            invoices[key][1].append({
+                "service_date": _iso_date(row.get("Service Date")),
+                "description": _text(row.get("Description")),
+                "category": _text(row.get(category_column)) if category_column else None,
+                "quantity": _number(row.get("Quantity")),
+                "unit_rate_cents": to_cents(_clean(row.get("Unit Rate"))),
+                "amount_cents": to_cents(_clean(row.get(amount_column))) if amount_column else None
+            })
+
+        for invoice, line_items in invoices.values():
+            self._insert_invoice(property_id, invoice, line_items, source)
+        return len(invoices), sum(len(line_items) for _, line_items in invoices.values())
+
+    def import_extraction(self, json_path):
+        """
+        Load an Extraction_Data_*.json written by batch_extract_all_invoices
+
+        Returns:
+            Dict of counts: invoices, line_items, seconds
+        """
+        started = time.perf_counter()
+        json_path = Path(json_path).resolve()
+        source = f"extraction:{json_path.name}"
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        stats = {"invoices": 0, "line_items": 0}
+        with self._lock, self._conn:
+            self._replace_source(source)
+            for property_name, property_data in data.get("by_property", {}).items():
+                property_id = self._property_id(property_name)
+                for extraction in property_data.get("invoices", []):
+                    invoice = extraction.get("invoice") or {}
+                    line_items = [
+                        {
+                            "service_date": _iso_date(item.get("date")),
+                            "description": item.get("description"),
+                            "category": item.get("category"),
+                            "quantity": _number(item.get("quantity")),
+                            "unit_rate_cents": to_cents(item.get("unit_rate")),
+                            "amount_cents": to_cents(item.get("extended_amount"))
+                        }
+                        for item in invoice.get("line_items") or []
+                    ]
+                    self._insert_invoice(property_id, {
+                        "vendor": extraction.get("vendor_name"),
+                        "account_number": _identifier(extraction.get("vendor_account_number")),
+                        "invoice_number": _identifier(invoice.get("invoice_number")),
+                        "invoice_date": _iso_date(invoice.get("invoice_date")),
+                        "due_date": _iso_date(invoice.get("due_date")),
+                        "amount_cents": to_cents(invoice.get("amount_due")),
+                        "source_file": extraction.get("source_file")
+                    }, line_items, source)
+                    stats["invoices"] += 1
+                    stats["line_items"] += len(line_items)
+
+        self._optimize()
+        stats["seconds"] = time.perf_counter() - started
+        return stats
+
+    def _optimize(self):
+        """Refresh planner statistics after a bulk load"""
+        with self._lock:
+            self._conn.execute("PRAGMA optimize")
+
+    # -- queries -----------------------------------------------------------
+
+    def line_items(self, property_name, month=None):
+        """Line items of one property, optionally one invoice month ("YYYY-MM")"""
+        if month:
+            return self._query("line_items_month", (property_name, month))
+        return self._query("line_items", (property_name,))
+
+    def invoice_exists(self, invoice_number, property_name=None):
+        """True when an invoice with this number is already loaded (optionally for one property)"""
+        if property_name:
+            row = self._query("property_invoice_exists", (_identifier(invoice_number), property_name))[0]
+        else:
+            row = self._query("invoice_exists", (_identifier(invoice_number),))[0]
+        return bool(next(iter(row.values())))
+
+    def invoices(self, property_name, start=None, end=None):
+        """Invoices of one property, optionally between two YYYY-MM-DD dates (inclusive)"""
+        return self._query("invoices", (property_name, start, start, end, end))
+
+    def category_totals(self, property_name=None):
+        """Line-item count and total per property and category (total in dollars)"""
+        if property_name:
+            rows = self._query("property_category_totals", (property_name,))
+        else:
+            rows = self._query("category_totals")
+        for row in rows:
+            row["total"] = cents_to_dollars(row.pop("total_cents"))
+        return rows
+
+    def monthly_totals(self, property_name):
+        """Invoice count and line-item total per invoice month for one property"""
+        rows = self._query("monthly_totals", (property_name,))
+        for row in rows:
+            row["total"] = cents_to_dollars(row.pop("total_cents"))
+        return rows
+
+    def services(self, property_name):
+        return self._query("services", (property_name,))
+
+    def contracts(self, property_name):
+        return self._query("contracts", (property_name,))
+
+    def summary(self):
+        with self._lock:
+            counts = {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("properties", "invoices", "line_items", "services", "contracts")
+            }
+        return (f"Analytics store: {counts['properties']} properties, {counts['invoices']} invoices, "
+                f"{counts['line_items']} line items, {counts['services']} services, "
+                f"{counts['contracts']} contracts ({self.db_path})")
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def open_store():
+    """Process-wide shared AnalyticsStore"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = AnalyticsStore()
+        return _default_store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analytics store - Orion Portfolio")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    master_parser = subparsers.add_parser("import-master", help="Load the master workbook")
+    master_parser.add_argument("--master", type=Path, default=MASTER_FILE)
+    json_parser = subparsers.add_parser("import-json", help="Load extraction JSON files")
+    json_parser.add_argument("paths", nargs="+", type=Path)
+    lines_parser = subparsers.add_parser("lines", help="Line items for a property")
+    lines_parser.add_argument("property")
+    lines_parser.add_argument("--month", default=None, help="YYYY-MM")
+    exists_parser = subparsers.add_parser("exists", help="Is an invoice number already loaded")
+    exists_parser.add_argument("invoice_number")
+    exists_parser.add_argument("--property", default=None)
+    totals_parser = subparsers.add_parser("totals", help="Category totals per property")
+    totals_parser.add_argument("--property", default=None)
+    args = parser.parse_args()
+
+    store = open_store()
+    if args.command == "import-master":
+        stats = store.import_master(args.master)
+        print(f"OK: Imported {args.master.name}: {stats['invoices']} invoices, {stats['line_items']} line items "
+              f"in {stats['seconds']:.1f}s")
+    elif args.command == "import-json":
+        for path in args.paths:
+            stats = store.import_extraction(path)
+            print(f"OK: Imported {path.name}: {stats['invoices']} invoices, {stats['line_items']} line items")
+    elif args.command == "lines":
+        for row in store.line_items(args.property, args.month):
+            amount = cents_to_dollars(row["amount_cents"])
+            print(f"{row['invoice_date'] or '':10} | {row['invoice_number'] or '':18} | {row['category'] or '':15} | "
+                  f"{'' if amount is None else f'${amount:,.2f}':>12} | {row['description'] or ''}")
+    elif args.command == "exists":
+        found = store.invoice_exists(args.invoice_number, args.property)
+        print(f"{args.invoice_number}: {'already loaded' if found else 'not found'}")
+    elif args.command == "totals":
+        for row in store.category_totals(args.property):
+            print(f"{row['property']:25} | {row['category'] or 'uncategorized':15} | "
+                  f"${row['total'] or 0:>12,.2f} | {row['line_items']:4} items")
+    print(store.summary())
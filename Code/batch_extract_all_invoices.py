@@ -5,12 +5,28 @@ Extracts data from all invoices using Claude Vision API and exports to Excel
 
 import os
 import json
-import base64
+import time
+import argparse
 from pathlib import Path
 from datetime import datetime
-import anthropic
 import pandas as pd
 
+from document_classifier import EXTRACTABLE_CLASSES, classify_documents
+from bulk_extraction import BulkJob, batch_call_record
+from extraction_cache import ExtractionCache, prompt_fingerprint
+from extraction_engine import run_extractions
+from extraction_metrics import ExtractionMetrics, generate_metrics_report, metrics_summary, new_metrics_path, share_calls
+from extraction_journal import ExtractionJournal, latest_journal_path, new_journal_path
+from file_catalog import scan_paths
+from file_hashing import cached_sha256
+from invoice_packing import ENABLED as PACKING_ENABLED, InvoicePack, document_label, match_documents, plan_packs
+from tiered_extraction import extract_invoice_tiered, mark_vision_result, tier_summary, try_text_tier
+from page_pruning import prepare_pdf_for_vision, selection_summary
+from statement_segments import page_range_label, reassemble_statements, split_into_units, statements_summary
+from structured_output import (EXTRACTION_TOOL_NAME, MAX_OUTPUT_TOKENS, packed_schema, read_structured, request_structured,
+                               schema_from_template, structured_params, validate)
+from vision_client import VisionClient, document_request, documents_request
+
 # Configuration
 INVOICES_FOLDER = Path("../Invoices")
 ROOT_FOLDER = Path("..")
@@ -23,7 +39,15 @@ if not ANTHROPIC_API_KEY:
     print("WARNING: WARNING: ANTHROPIC_API_KEY not set. Extraction will fail.")
     print("Set it with: export ANTHROPIC_API_KEY='your-key-here'")
 
-client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+client = VisionClient(api_key=ANTHROPIC_API_KEY)
+
+MODEL = "claude-sonnet-4-20250514"
+
+# Persistent cache of extractions keyed by PDF hash + model + prompt version
+extraction_cache = ExtractionCache()
+
+# Per-invoice tokens/latency/cost for this run
+run_metrics = ExtractionMetrics(new_metrics_path(OUTPUT_FOLDER), model=MODEL)
 
 
 def categorize_pdfs():
@@ -36,12 +60,13 @@ def categorize_pdfs():
     contract_keywords = ["agreement", "contract", "bulk agreement", "wci bulk"]
 
     # Scan Invoices folder
+    invoice_folder_files = set()
     if INVOICES_FOLDER.exists():
-        for pdf_file in INVOICES_FOLDER.rglob("*.pdf"):
-            invoices.append(pdf_file)
+        invoice_folder_files.update(scan_paths(INVOICES_FOLDER, ext=".pdf"))
+        invoices.extend(sorted(invoice_folder_files))
 
     # Scan root folder
-    for pdf_file in ROOT_FOLDER.glob("*.pdf"):
+    for pdf_file in scan_paths(ROOT_FOLDER, ext=".pdf", recursive=False):
         filename_lower = pdf_file.name.lower()
 
         # Check if it's a contract
@@ -50,48 +75,59 @@ def categorize_pdfs():
         elif "invoice" in filename_lower or "trash" in filename_lower:
             invoices.append(pdf_file)
 
+    # Confirm by first-page content before anything reaches the vision API
+    # (relative_path lets scanned PDFs fall back to the folder rules)
+    root = ROOT_FOLDER.resolve()
+    candidates = [
+        {"path": str(pdf_file), "relative_path": os.path.relpath(pdf_file, root), "sha256": cached_sha256(pdf_file)}
+        for pdf_file in invoices
+    ]
+    classifications = classify_documents(candidates)
+    confirmed = []
+    for pdf_file, candidate in zip(invoices, candidates):
+        doc_class = classifications[candidate["sha256"]]["classification"]
+        if doc_class == "contract":
+            contracts.append(pdf_file)
+        elif doc_class in EXTRACTABLE_CLASSES or pdf_file in invoice_folder_files:
+            # Anything filed under Invoices is an invoice unless its content says otherwise
+            confirmed.append(pdf_file)
+        else:
+            print(f"   Skipping unclassified PDF: {pdf_file.name}")
+    invoices = confirmed
+
     print(f"\n>> Found {len(invoices)} invoices and {len(contracts)} contracts")
     print(f"   Invoices will be extracted, contracts will be skipped.\n")
 
     return invoices, contracts
 
 
-def extract_invoice_with_vision(pdf_path):
-    """Extract invoice data using Claude Vision API"""
-
-    print(f"   Extracting: {pdf_path.name}...")
-
-    # Read PDF as base64
-    with open(pdf_path, "rb") as f:
-        pdf_data = base64.b64encode(f.read()).decode("utf-8")
-
-    # Extraction schema
-    extraction_schema = {
-        "source_file": "",
-        "document_type": "invoice",
-        "property_name": None,
-        "property_address": None,
-        "vendor_name": None,
-        "vendor_account_number": None,
-        "billing_period": {
-            "start_date": None,
-            "end_date": None,
-            "raw": None
-        },
-        "invoice": {
-            "invoice_number": None,
-            "invoice_date": None,
-            "due_date": None,
-            "amount_due": None,
-            "subtotal": None,
-            "line_items": []
-        }
+# Extraction schema (shared by single and packed requests)
+INVOICE_EXTRACTION_SCHEMA = {
+    "source_file": "",
+    "document_type": "invoice",
+    "property_name": None,
+    "property_address": None,
+    "vendor_name": None,
+    "vendor_account_number": None,
+    "billing_period": {
+        "start_date": None,
+        "end_date": None,
+        "raw": None
+    },
+    "invoice": {
+        "invoice_number": None,
+        "invoice_date": None,
+        "due_date": None,
+        "amount_due": None,
+        "subtotal": None,
+        "line_items": []
     }
+}
 
-    prompt = f"""Extract all information from this waste management invoice into structured JSON.
+INVOICE_EXTRACTION_PROMPT = f"""Extract all information from this waste management invoice and record it with the {EXTRACTION_TOOL_NAME} tool.
 
-Return ONLY valid JSON in this exact format:
-{json.dumps(extraction_schema, indent=2)}
+The tool input follows this structure:
+{json.dumps(INVOICE_EXTRACTION_SCHEMA, indent=2)}
 
 For line_items, include:
 - date: Service date (YYYY-MM-DD)
@@ -115,46 +151,53 @@ CRITICAL RULES:
 - For vendor name, use the company name (Republic Services, Frontier Waste, Community Waste, etc.)
 - For category, classify charges appropriately
 
-Return ONLY the JSON, no explanations."""
+Call {EXTRACTION_TOOL_NAME} once with the complete extraction; do not answer in text."""
 
-    try:
-        # Call Claude Vision API
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=4000,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "document",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "application/pdf",
-                                "data": pdf_data
-                            }
-                        },
-                        {
-                            "type": "text",
-                            "text": prompt
-                        }
-                    ]
-                }
-            ]
-        )
 
-        # Parse response
-        response_text = message.content[0].text
+def invoice_cache_key(pdf_path, pages=None):
+    """Extraction cache key for one invoice (or statement segment) under the current prompt"""
+    return extraction_cache.key(
+        pdf_path, MODEL, prompt_fingerprint(INVOICE_EXTRACTION_PROMPT, INVOICE_EXTRACTION_SCHEMA, pages)
+    )
+
+
+def extract_invoice_with_vision(pdf_path, pages=None):
+    """Extract invoice data using Claude Vision API (pages: one segment of a multi-invoice statement)"""
 
-        # Clean markdown code blocks if present
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
+    # Unchanged PDF + unchanged prompt -> reuse the previous extraction
+    cache_key = invoice_cache_key(pdf_path, pages)
+    cached = extraction_cache.get(cache_key)
+    if cached is not None:
+        print(f"   Cached: {pdf_path.name}")
+        cached["source_file"] = pdf_path.name
+        return cached, None
+
+    print(f"   Extracting: {pdf_path.name}...")
 
-        extracted_data = json.loads(response_text)
+    # Only pages with line items/totals are sent (remittance stubs, T&Cs dropped)
+    pdf_data, page_selection = prepare_pdf_for_vision(pdf_path, pages)
+    if page_selection:
+        print(f"      Page pruning: {selection_summary(page_selection)}")
+
+    try:
+        # Forced tool call: the answer arrives as schema-checked JSON
+        extracted_data, problems = request_structured(
+            client,
+            schema_from_template(INVOICE_EXTRACTION_SCHEMA),
+            model=MODEL,
+            max_tokens=4000,
+            **document_request(pdf_data, INVOICE_EXTRACTION_PROMPT)
+        )
+        if extracted_data is None:
+            raise ValueError(problems[0])
+        if problems:
+            extracted_data["schema_warnings"] = problems
+        if page_selection:
+            extracted_data["page_selection"] = page_selection
         extracted_data["source_file"] = pdf_path.name
 
+        extraction_cache.put(cache_key, extracted_data, source_file=pdf_path.name, model=MODEL)
+
         return extracted_data, None
 
     except Exception as e:
@@ -163,6 +206,60 @@ Return ONLY the JSON, no explanations."""
         return None, error_msg
 
 
+def extract_invoices_packed(pdf_paths):
+    """
+    Extract several small invoices with one Claude Vision request
+
+    Returns:
+        (extractions, problems) - extracted_data per PDF in pdf_paths order,
+        None where the result did not map back cleanly; problems describes
+        those (they need a single-document call)
+    """
+    names = [pdf_path.name for pdf_path in pdf_paths]
+    # File names repeat across folders, so documents are labelled by position
+    labels = [document_label(position, pdf_path) for position, pdf_path in enumerate(pdf_paths)]
+    print(f"   Extracting pack: {', '.join(names)}...")
+
+    documents = []
+    page_selections = {}
+    for label, pdf_path in zip(labels, pdf_paths):
+        pdf_data, page_selection = prepare_pdf_for_vision(pdf_path)
+        documents.append((label, pdf_data))
+        if page_selection:
+            page_selections[label] = page_selection
+
+    document_schema = schema_from_template(INVOICE_EXTRACTION_SCHEMA)
+    try:
+        packed, problems = request_structured(
+            client,
+            packed_schema(document_schema),
+            model=MODEL,
+            max_tokens=min(MAX_OUTPUT_TOKENS, 4000 * len(pdf_paths)),
+            **documents_request(documents, INVOICE_EXTRACTION_PROMPT)
+        )
+    except Exception as e:
+        return [None] * len(pdf_paths), [f"packed request failed: {e}"]
+    if packed is None:
+        return [None] * len(pdf_paths), problems
+
+    by_label, mapping_problems = match_documents(packed.get("documents") or [], labels)
+    extractions = []
+    for label, pdf_path in zip(labels, pdf_paths):
+        extracted_data = by_label.get(label)
+        if extracted_data is not None:
+            # Per-document schema check so warnings land on the right invoice
+            extracted_data, schema_problems = validate(extracted_data, document_schema)
+            if schema_problems:
+                extracted_data["schema_warnings"] = schema_problems
+            if label in page_selections:
+                extracted_data["page_selection"] = page_selections[label]
+            extracted_data["source_file"] = pdf_path.name
+            extracted_data["pack"] = {"size": len(pdf_paths), "files": names}
+        extractions.append(extracted_data)
+
+    return extractions, mapping_problems
+
+
 def validate_extraction(extracted_data):
     """Validate extraction quality and calculate confidence score"""
 
@@ -222,6 +319,12 @@ def validate_extraction(extracted_data):
         except:
             pass
 
+    # Output that did not match the extraction schema (see structured_output)
+    schema_warnings = extracted_data.get("schema_warnings", [])
+    if schema_warnings:
+        validation["warnings"].extend(f"Schema: {warning}" for warning in schema_warnings)
+        validation["confidence_score"] -= 0.10
+
     # Determine if review needed
     validation["confidence_score"] = round(max(0, validation["confidence_score"]), 2)
     validation["needs_review"] = (
@@ -232,6 +335,200 @@ def validate_extraction(extracted_data):
     return validation
 
 
+def process_invoice(unit):
+    """Extract and validate a single invoice - a whole PDF or one statement segment (one unit of concurrent work)"""
+
+    # Local text parser first; vision only when the text result is not trustworthy
+    started = time.monotonic()
+    with client.track_calls() as calls:
+        extraction, error = extract_invoice_tiered(
+            unit.path,
+            lambda pdf_path: extract_invoice_with_vision(pdf_path, unit.pages),
+            validate_extraction,
+            pages=unit.pages
+        )
+    run_metrics.record(unit.path, extraction, error, calls, time.monotonic() - started, pages=unit.page_numbers)
+    return finish_invoice(unit, extraction, error)
+
+
+def finish_invoice(unit, extraction, error=None):
+    """Provenance + validation for one extracted invoice -> (extraction, validation, error)"""
+
+    unit.attach_provenance(extraction)
+    validation = validate_extraction(extraction)
+    if unit.segmented:
+        validation["source_pages"] = page_range_label(unit.page_numbers)
+    return extraction, validation, error
+
+
+def resolve_locally(unit):
+    """Text tier or extraction cache result for an invoice, None when it needs the vision API"""
+
+    extraction = try_text_tier(unit.path, validate_extraction, pages=unit.pages)
+    if extraction is None:
+        extraction = extraction_cache.get(invoice_cache_key(unit.path, unit.pages))
+        if extraction is not None:
+            extraction["source_file"] = unit.path.name
+            mark_vision_result(extraction)
+    return extraction
+
+
+def run_bulk(units, journal):
+    """
+    Extract invoices through message batches, journaling each result as its batch lands
+
+    Invoices the text tier or cache can answer are journaled immediately;
+    the rest are submitted as batch jobs (see bulk_extraction). Jobs left
+    running by an interrupted run are reattached instead of resubmitted.
+
+    Returns:
+        Units whose batch request failed, was truncated or came back
+        unusable - the caller extracts those synchronously
+    """
+    by_key = {unit.key: unit for unit in units}
+    job = BulkJob(client, journal.path.with_suffix(".batches.json"))
+    outstanding = job.outstanding_keys()
+    schema = schema_from_template(INVOICE_EXTRACTION_SCHEMA)
+
+    requests = []
+    for unit in units:
+        if unit.key in outstanding:
+            continue
+
+        started = time.monotonic()
+        extraction = resolve_locally(unit)
+        if extraction is not None:
+            run_metrics.record(unit.path, extraction, None, [], time.monotonic() - started, pages=unit.page_numbers)
+            journal.append(unit.key, *finish_invoice(unit, extraction))
+            continue
+
+        pdf_data, page_selection = prepare_pdf_for_vision(unit.path, unit.pages)
+        params = structured_params(schema, 4000, model=MODEL, **document_request(pdf_data, INVOICE_EXTRACTION_PROMPT))
+        requests.append((unit.key, params, {"page_selection": page_selection, "document_bytes": len(pdf_data) * 3 // 4}))
+
+    if outstanding:
+        print(f"   Reattaching to {len(outstanding)} requests already submitted")
+    if requests:
+        job.submit(requests)
+
+    fallback = []
+
+    def on_result(key, message, error, meta):
+        unit = by_key.get(key)
+        if unit is None:
+            return
+        if message is None:
+            print(f"      {unit.name}: {error} - will extract synchronously")
+            fallback.append(unit)
+            return
+
+        client.record_batch_result(message)
+        extraction, problems = read_structured(message, schema)
+        if extraction is None or message.stop_reason == "max_tokens":
+            # Truncated or empty: the synchronous path retries with a larger budget
+            print(f"      {unit.name}: {problems[-1]} - will extract synchronously")
+            fallback.append(unit)
+            return
+
+        if problems:
+            extraction["schema_warnings"] = problems
+        if meta.get("page_selection"):
+            extraction["page_selection"] = meta["page_selection"]
+        extraction["source_file"] = unit.path.name
+        mark_vision_result(extraction)
+        extraction_cache.put(invoice_cache_key(unit.path, unit.pages), extraction,
+                             source_file=unit.path.name, model=MODEL)
+
+        run_metrics.record(unit.path, extraction, None,
+                           [batch_call_record(message, meta.get("document_bytes", 0), meta["seconds"])],
+                           meta["seconds"], pages=unit.page_numbers, batch=True)
+        journal.append(unit.key, *finish_invoice(unit, extraction))
+
+    job.wait(on_result)
+    return fallback
+
+
+def process_pack(pack):
+    """
+    Extract a pack of small same-vendor invoices with one request (one unit of concurrent work)
+
+    Text-tier and cached invoices are resolved first; the rest share one
+    vision request. A document that does not map back to its file or fails
+    validate_extraction is re-extracted on its own via process_invoice().
+
+    Returns:
+        List of (extraction, validation, error), one per invoice in the pack
+    """
+    results = [None] * len(pack.units)
+    pending = []
+
+    for position, unit in enumerate(pack.units):
+        started = time.monotonic()
+        extraction = try_text_tier(unit.path, validate_extraction)
+        if extraction is None:
+            extraction = extraction_cache.get(invoice_cache_key(unit.path))
+            if extraction is not None:
+                extraction["source_file"] = unit.path.name
+                mark_vision_result(extraction)
+        if extraction is None:
+            pending.append(position)
+            continue
+        run_metrics.record(unit.path, extraction, None, [], time.monotonic() - started)
+        results[position] = (extraction, validate_extraction(extraction), None)
+
+    if len(pending) >= 2:
+        started = time.monotonic()
+        with client.track_calls() as calls:
+            extractions, problems = extract_invoices_packed([pack.units[position].path for position in pending])
+        for problem in problems:
+            print(f"      Pack: {problem}")
+
+        # Tokens and time of the shared request are split evenly across its invoices
+        shared_calls = share_calls(calls, len(pending))
+        shared_seconds = (time.monotonic() - started) / len(pending)
+
+        for position, extraction in zip(pending, extractions):
+            unit = pack.units[position]
+            if extraction is None:
+                continue
+            extraction["source_file"] = unit.path.name
+            validation = validate_extraction(extraction)
+            if validation["needs_review"]:
+                print(f"      Pack: {unit.path.name} failed validation, extracting it on its own")
+                continue
+
+            mark_vision_result(extraction)
+            extraction_cache.put(invoice_cache_key(unit.path), extraction, source_file=unit.path.name, model=MODEL)
+            run_metrics.record(unit.path, extraction, None, shared_calls, shared_seconds)
+            results[position] = (extraction, validation, None)
+
+    for position, unit in enumerate(pack.units):
+        if results[position] is None:
+            results[position] = process_invoice(unit)
+    return results
+
+
+def process_work_item(item):
+    """Worker for run_extractions: one invoice, statement segment or pack"""
+
+    if isinstance(item, InvoicePack):
+        return process_pack(item)
+    return process_invoice(item)
+
+
+def invoice_status(result):
+    """Progress status line for a processed invoice (or a pack of them)"""
+
+    if isinstance(result, list):
+        ok = sum(1 for _, validation, _ in result if not validation["needs_review"])
+        return f"{ok}/{len(result)} OK"
+
+    _, validation, _ = result
+    if validation["needs_review"]:
+        return f"WARNING: Needs Review (Confidence: {validation['confidence_score']})"
+    return f"OK: OK (Confidence: {validation['confidence_score']})"
+
+
 def organize_by_property(all_extractions, all_validations):
     """Organize extracted data by property name"""
 
@@ -311,6 +608,8 @@ def export_to_excel(by_property, output_path):
                 # Base row
                 base_row = {
                     "Source File": invoice_data.get("source_file"),
+                    "Source Pages": page_range_label(invoice_data["provenance"]["pages"])
+                                    if invoice_data.get("provenance") else "",
                     "Property": invoice_data.get("property_name"),
                     "Vendor": invoice_data.get("vendor_name"),
                     "Account #": invoice_data.get("vendor_account_number"),
@@ -318,6 +617,10 @@ def export_to_excel(by_property, output_path):
                     "Invoice Date": invoice.get("invoice_date"),
                     "Due Date": invoice.get("due_date"),
                     "Amount Due": invoice.get("amount_due"),
+                    "Extraction Tier": invoice_data.get("extraction_tier"),
+                    "Pages Dropped": ", ".join(
+                        str(dropped["page"]) for dropped in (invoice_data.get("page_selection") or {}).get("dropped_pages", [])
+                    ),
                 }
 
                 # Expand line items
@@ -365,6 +668,7 @@ def export_to_excel(by_property, output_path):
                 validation_rows.append({
                     "Property": property_name,
                     "Source File": val["source_file"],
+                    "Source Pages": val.get("source_pages", ""),
                     "Confidence": val["confidence_score"],
                     "Needs Review": "YES" if val["needs_review"] else "NO",
                     "Missing Fields": "; ".join(val["critical_missing"]) if val["critical_missing"] else "",
@@ -449,7 +753,26 @@ def generate_validation_report(all_validations, by_property, output_path):
     print(f"   OK: Validation report: {output_path}")
 
 
-def main():
+def load_results_from_journal(journal, units):
+    """Rebuild per-invoice extraction/validation lists (in scan order) from the journal"""
+
+    records = journal.records()
+    all_extractions = []
+    all_validations = []
+
+    for unit in units:
+        record = records.get(unit.key)
+        if record is None:
+            all_extractions.append(None)
+            all_validations.append(validate_extraction(None))
+        else:
+            all_extractions.append(record["extraction"])
+            all_validations.append(record["validation"])
+
+    return all_extractions, all_validations
+
+
+def main(resume=False, journal_path=None, max_workers=None, pack=PACKING_ENABLED, bulk=False):
     """Main extraction workflow"""
 
     print("=" * 70)
@@ -466,27 +789,65 @@ def main():
 
     print(f"OK: Found {len(invoices)} invoices to process")
 
+    # Multi-invoice statements become one extraction unit per invoice
+    units = split_into_units(invoices)
+
+    # Checkpoint journal - each finished invoice is written as it lands
+    if resume and journal_path is None:
+        journal_path = latest_journal_path(OUTPUT_FOLDER)
+        if journal_path is None:
+            print("WARNING: No journal found to resume - starting a fresh run")
+    journal = ExtractionJournal(journal_path or new_journal_path(OUTPUT_FOLDER))
+
+    pending = units
+    if resume:
+        completed = journal.completed_paths()
+        pending = [unit for unit in units if unit.key not in completed]
+        print(f"OK: Resuming {journal.path.name}: {len(units) - len(pending)} already extracted, "
+              f"{len(pending)} remaining")
+    print(f"   Journal: {journal.path}")
+
+    def record_result(index, item, result):
+        units = item.units if isinstance(item, InvoicePack) else [item]
+        results = result if isinstance(item, InvoicePack) else [result]
+        for unit, unit_result in zip(units, results or [None] * len(units)):
+            extraction, validation, error = unit_result or (None, validate_extraction(None), "Worker failed")
+            journal.append(unit.key, extraction, validation, error=error)
+
     # Step 2: Extract with Vision API
-    print(f"\n STEP 2: Extracting data from {len(invoices)} invoices...")
+    print(f"\n STEP 2: Extracting data from {len(pending)} invoices...")
     print("   (This may take several minutes...)\n")
 
-    all_extractions = []
-    all_validations = []
-
-    for i, invoice_path in enumerate(invoices, 1):
-        print(f"[{i}/{len(invoices)}]", end=" ")
+    if bulk:
+        # Message batches; anything the batches could not deliver goes through the normal path
+        work_items = run_bulk(pending, journal)
+        if work_items:
+            print(f"\n   Extracting {len(work_items)} invoices synchronously after batch failures")
+    else:
+        # Optional packing: several small same-vendor invoices per request
+        work_items = plan_packs(pending) if pack else pending
+
+    run_extractions(
+        work_items,
+        process_work_item,
+        max_workers=max_workers,
+        describe=lambda item: item.name,
+        status=invoice_status,
+        on_result=record_result,
+        label="Invoice extraction"
+    )
 
-        extraction, error = extract_invoice_with_vision(invoice_path)
-        validation = validate_extraction(extraction)
+    all_extractions, all_validations = load_results_from_journal(journal, units)
+    statements = reassemble_statements(units, all_extractions)
 
-        all_extractions.append(extraction)
-        all_validations.append(validation)
-
-        # Show status
-        if validation["needs_review"]:
-            print(f"      WARNING: Needs Review (Confidence: {validation['confidence_score']})")
-        else:
-            print(f"      OK: OK (Confidence: {validation['confidence_score']})")
+    print(f"   {tier_summary()}")
+    print(f"   {statements_summary(statements)}")
+    print(f"   {extraction_cache.summary()}")
+    print(f"   {client.summary()}")
+    print(f"   {metrics_summary(run_metrics.records())}")
+    evicted = extraction_cache.evict()
+    if evicted:
+        print(f"   Cache eviction: removed {evicted} stale entries")
 
     # Step 3: Organize by property
     print(f"\n STEP 3: Organizing by property...")
@@ -502,6 +863,8 @@ def main():
     print(f"\n STEP 5: Generating validation report...")
     report_output = OUTPUT_FOLDER / f"Validation_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
     generate_validation_report(all_validations, by_property, report_output)
+    metrics_output = OUTPUT_FOLDER / f"Metrics_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+    generate_metrics_report(run_metrics.records(), metrics_output)
 
     # Step 6: Save raw JSON
     print(f"\n STEP 6: Saving raw JSON data...")
@@ -509,7 +872,8 @@ def main():
     with open(json_output, "w", encoding="utf-8") as f:
         json.dump({
             "extraction_date": datetime.now().isoformat(),
-            "total_invoices": len(invoices),
+            "total_invoices": len(units),
+            "statements": statements,
             "by_property": {
                 prop: {
                     "invoice_count": len(data["invoices"]),
@@ -527,7 +891,9 @@ def main():
     print(f"\n Output Files:")
     print(f"   - Excel: {excel_output}")
     print(f"   - Validation Report: {report_output}")
+    print(f"   - Metrics: {metrics_output} ({run_metrics.path.name})")
     print(f"   - Raw JSON: {json_output}")
+    print(f"   - Journal: {journal.path}")
 
     needs_review = sum(1 for v in all_validations if v["needs_review"])
     if needs_review > 0:
@@ -537,4 +903,21 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Batch invoice extraction - Orion Portfolio")
+    parser.add_argument("--resume", nargs="?", const=True, default=False, metavar="JOURNAL",
+                        help="Skip invoices already in the latest (or given) extraction journal")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Concurrent extraction calls (default EXTRACTION_MAX_WORKERS or 8)")
+    parser.add_argument("--pack", action="store_true", default=PACKING_ENABLED,
+                        help="Pack small same-vendor invoices into shared requests (INVOICE_PACKING)")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Submit the backlog as message batches (half price, results within 24h)")
+    args = parser.parse_args()
+
+    main(
+        resume=bool(args.resume),
+        journal_path=Path(args.resume) if isinstance(args.resume, str) else None,
+        max_workers=args.workers,
+        pack=args.pack,
+        bulk=args.bulk
+    )
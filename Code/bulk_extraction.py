@@ -0,0 +1,189 @@
+"""
+Bulk Extraction with Message Batches
+Submit a month-end backlog as asynchronous batch jobs, poll, and journal results as they land
+
+For overnight backlogs latency does not matter but throughput and cost do:
+Message Batches are billed at half the synchronous price and do not count
+against the per-minute request cap. The pending set is split into batch
+jobs of BULK_BATCH_SIZE requests, all submitted up front; each job's
+results are streamed to the caller as soon as that job ends, so the
+checkpoint journal fills job by job instead of all at the end.
+
+Submitted jobs are saved next to the journal (<journal>.batches.json), so
+--resume after a crash or Ctrl-C reattaches to jobs still running on the
+server instead of paying for them twice.
+
+Test locally against Code/fake_vision_server.py, which also implements the
+batch create / retrieve / results endpoints:
+
+    python Code/fake_vision_server.py --port 8765 --batch-seconds 10
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=fake BULK_POLL_SECONDS=2 \\
+        python Code/batch_extract_all_invoices.py --bulk
+
+Batch calls go through the VisionClient's backoff and Retry-After handling;
+a job that is still unreachable after that is polled again later rather
+than failing the run.
+
+Environment:
+    BULK_BATCH_SIZE=100        Requests per batch job
+    BULK_POLL_SECONDS=60       Seconds between status polls
+    BULK_MAX_WAIT_HOURS=24     Stop polling after this long (resume later)
+
+USAGE:
+    from bulk_extraction import BulkJob
+
+    job = BulkJob(client, journal.path.with_suffix(".batches.json"))
+    job.submit([(unit.key, params, meta), ...])
+    job.wait(on_result)   # on_result(key, message, error, meta)
+"""
+
+import os
+import json
+import time
+from pathlib import Path
+from datetime import datetime
+
+from file_hashing import sha256_text
+from vision_client import USAGE_FIELDS, is_retryable
+
+BATCH_SIZE = int(os.environ.get("BULK_BATCH_SIZE", "100"))
+POLL_SECONDS = float(os.environ.get("BULK_POLL_SECONDS", "60"))
+MAX_WAIT_SECONDS = float(os.environ.get("BULK_MAX_WAIT_HOURS", "24")) * 3600
+
+
+def custom_id(key):
+    """Batch custom_id for a work key (the API allows 1-64 of [A-Za-z0-9_-])"""
+    return sha256_text(key)[:48]
+
+
+def batch_call_record(message, document_bytes=0, seconds=0.0):
+    """A VisionClient.track_calls()-style record for a batch result (for extraction_metrics)"""
+    usage = getattr(message, "usage", None)
+    record = {
+        "latency_seconds": round(seconds, 3),
+        "retries": 0,
+        "throttled": 0,
+        "document_bytes": document_bytes,
+        "stop_reason": getattr(message, "stop_reason", None),
+        "error": None
+    }
+    record.update({field: (getattr(usage, field, None) or 0) for field in USAGE_FIELDS})
+    return record
+
+
+def _describe_failure(result):
+    error = getattr(result, "error", None)
+    inner = getattr(error, "error", None)
+    detail = getattr(inner, "message", None) or getattr(error, "type", None)
+    return f"batch request {result.type}" + (f": {detail}" if detail else "")
+
+
+class BulkJob:
+    """The batch jobs of one extraction run, persisted beside its journal"""
+
+    def __init__(self, client, state_path):
+        self.client = client
+        self.state_path = Path(state_path)
+        self.batches = self._load()
+
+    def _load(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)["batches"]
+        except (OSError, KeyError, json.JSONDecodeError):
+            return []
+
+    def _save(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.state_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"batches": self.batches}, f, indent=2)
+        os.replace(temp_path, self.state_path)
+
+    def outstanding_keys(self):
+        """Work keys already submitted in jobs whose results have not been collected"""
+        return {
+            entry["key"]
+            for batch in self.batches if not batch["collected"]
+            for entry in batch["entries"].values()
+        }
+
+    def submit(self, requests, batch_size=BATCH_SIZE):
+        """
+        Submit requests as batch jobs of batch_size
+
+        Args:
+            requests: List of (key, params, meta) - params are messages.create
+                kwargs, meta is any JSON-able dict handed back with the result
+        """
+        for start in range(0, len(requests), batch_size):
+            chunk = requests[start:start + batch_size]
+            batch = self.client.batches.create(requests=[
+                {"custom_id": custom_id(key), "params": params} for key, params, _ in chunk
+            ])
+            self.batches.append({
+                "id": batch.id,
+                "submitted_at": time.time(),
+                "collected": False,
+                "entries": {custom_id(key): {"key": key, "meta": meta} for key, _, meta in chunk}
+            })
+            self._save()
+            print(f"   Submitted batch {batch.id}: {len(chunk)} requests")
+
+    def wait(self, on_result, poll_seconds=POLL_SECONDS, max_wait_seconds=MAX_WAIT_SECONDS):
+        """
+        Poll until every job has ended, handing each result over as its job lands
+
+        on_result(key, message, error, meta) is called once per request:
+        message is the response for succeeded requests, otherwise None with
+        error describing why (errored / canceled / expired).
+
+        Returns:
+            True when every job was collected, False when max_wait_seconds
+            ran out first (the rest can be collected with --resume)
+        """
+        deadline = time.monotonic() + max_wait_seconds
+
+        while True:
+            processing = 0
+            for batch in self.batches:
+                if batch["collected"]:
+                    continue
+
+                # The client already retried; a job that is still unreachable
+                # is checked again next poll instead of ending the run
+                try:
+                    status = self.client.batches.retrieve(batch["id"])
+                    processing += status.request_counts.processing
+                    if status.processing_status != "ended":
+                        continue
+                    results = self.client.batches.results(batch["id"])
+                except Exception as e:
+                    if not is_retryable(e):
+                        raise
+                    print(f"   WARNING: Batch {batch['id']} unreachable ({type(e).__name__}) - will poll again")
+                    continue
+
+                for entry in results:
+                    submitted = batch["entries"].get(entry.custom_id)
+                    if submitted is None:
+                        continue
+                    meta = dict(submitted["meta"], seconds=time.time() - batch["submitted_at"])
+                    if entry.result.type == "succeeded":
+                        on_result(submitted["key"], entry.result.message, None, meta)
+                    else:
+                        on_result(submitted["key"], None, _describe_failure(entry.result), meta)
+
+                batch["collected"] = True
+                self._save()
+
+            open_batches = sum(1 for batch in self.batches if not batch["collected"])
+            print(f"   Bulk [{datetime.now().strftime('%H:%M:%S')}]: "
+                  f"{len(self.batches) - open_batches}/{len(self.batches)} batches collected, "
+                  f"{processing} requests processing")
+            if not open_batches:
+                return True
+            if time.monotonic() >= deadline:
+                print(f"   WARNING: {open_batches} batches still running - collect them later with --resume")
+                return False
+            time.sleep(poll_seconds)
@@ -2,9 +2,10 @@
 Check master file for missing service details and YPD calculations
 """
 
-import pandas as pd
 from pathlib import Path
 
+from invoice_ledger import read_master_sheet
+
 print('=' * 80)
 print('MASTER FILE DATA QUALITY CHECK')
 print('=' * 80)
@@ -33,7 +34,7 @@ for prop in properties:
     print('-' * 80)
     
     try:
-        df = pd.read_excel(master_file, sheet_name=prop)
+        df = read_master_sheet(prop, master_file)
         
         print(f'  Total Rows: {len(df)}')
         print(f'  Columns: {len(df.columns)}')
@@ -5,12 +5,24 @@ Scans entire folder structure and extracts ALL PDFs (invoices + contracts)
 
 import os
 import json
+import time
 import base64
 from pathlib import Path
 from datetime import datetime
-import anthropic
 import pandas as pd
 
+from extraction_cache import ExtractionCache, prompt_fingerprint
+from extraction_engine import run_extractions
+from extraction_metrics import ExtractionMetrics, generate_metrics_report, metrics_summary, new_metrics_path
+from document_classifier import classification_summary, classify_documents
+from file_catalog import scan_files
+from file_dedup import collapse_duplicates
+from tiered_extraction import extract_invoice_tiered, tier_summary
+from page_pruning import prepare_pdf_for_vision, selection_summary
+from statement_segments import page_range_label, reassemble_statements, split_into_units, statements_summary
+from structured_output import EXTRACTION_TOOL_NAME, request_structured, schema_from_template
+from vision_client import VisionClient, document_request
+
 # Configuration
 ROOT_FOLDER = Path("..")
 OUTPUT_FOLDER = Path("../Extraction_Output")
@@ -21,85 +33,72 @@ ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
 if not ANTHROPIC_API_KEY:
     print("WARNING: ANTHROPIC_API_KEY not set")
 
-client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+client = VisionClient(api_key=ANTHROPIC_API_KEY)
+
+MODEL = "claude-sonnet-4-20250514"
+
+# Persistent cache of extractions keyed by PDF hash + model + prompt version
+extraction_cache = ExtractionCache()
+
+# Per-document tokens/latency/cost for this run
+run_metrics = ExtractionMetrics(new_metrics_path(OUTPUT_FOLDER), model=MODEL)
+
+
+# Document class -> comprehensive_scan() result key (statements hold invoices)
+SCAN_BUCKETS = {"invoice": "invoices", "statement": "invoices", "contract": "contracts", "unknown": "unknown"}
 
 
 def comprehensive_scan():
-    """Scan entire folder structure for ALL PDFs"""
+    """Scan entire folder structure for ALL PDFs, collapse byte-identical copies and classify by content"""
 
     all_pdfs = {
         "invoices": [],
         "contracts": [],
-        "unknown": []
+        "unknown": [],
+        "duplicates": []
     }
 
-    # Keywords for classification
-    invoice_keywords = [
-        "invoice", "statement", "bill", "trash bills",
-        "republic services", "frontier waste", "community waste",
-        "city of mckinney", "tcam"
-    ]
-
-    contract_keywords = [
-        "agreement", "contract", "bulk agreement"
-    ]
-
     print("\nScanning all folders for PDFs...")
 
-    for root, dirs, files in os.walk(ROOT_FOLDER):
-        for file in files:
-            if file.lower().endswith('.pdf'):
-                full_path = Path(root) / file
-                rel_path = full_path.relative_to(ROOT_FOLDER)
-
-                file_lower = file.lower()
-                folder_lower = str(rel_path.parent).lower()
-
-                file_info = {
-                    "path": str(full_path),
-                    "filename": file,
-                    "relative_path": str(rel_path),
-                    "folder": str(rel_path.parent)
-                }
-
-                # Classify by folder and filename
-                is_invoice = False
-                is_contract = False
-
-                # Check folder structure
-                if "trash bills" in folder_lower or folder_lower == "invoices":
-                    is_invoice = True
-                elif "contracts" in folder_lower:
-                    is_contract = True
-
-                # Check filename
-                if any(kw in file_lower for kw in invoice_keywords):
-                    is_invoice = True
-                if any(kw in file_lower for kw in contract_keywords):
-                    is_contract = True
-
-                # Classify (invoice takes precedence)
-                if is_invoice:
-                    all_pdfs["invoices"].append(file_info)
-                elif is_contract:
-                    all_pdfs["contracts"].append(file_info)
-                else:
-                    all_pdfs["unknown"].append(file_info)
+    # Incremental catalog: only new/changed files are stat'd into the index and hashed
+    found = []
+    for row in scan_files(ROOT_FOLDER, ext=".pdf", hashed=True):
+        rel_path = Path(row["relative_path"])
+        found.append({
+            "path": row["path"],
+            "filename": row["name"],
+            "relative_path": str(rel_path),
+            "folder": str(rel_path.parent),
+            "sha256": row["sha256"]
+        })
 
-    print(f"\nFound {len(all_pdfs['invoices'])} invoices")
+    # Same invoice in Properties/ and Archive/ is extracted once
+    unique, duplicates = collapse_duplicates(found)
+    all_pdfs["duplicates"] = duplicates
+
+    # Route by first-page content (cached per hash); scans fall back to folder/filename
+    classifications = classify_documents(unique)
+    for file_info in unique:
+        result = classifications.get(file_info["sha256"]) or {"classification": "unknown", "confidence": None}
+        file_info["document_class"] = result["classification"]
+        file_info["class_confidence"] = result["confidence"]
+        all_pdfs[SCAN_BUCKETS[result["classification"]]].append(file_info)
+
+    print(f"\nFound {len(found)} PDFs, {len(unique)} unique by content")
+    if duplicates:
+        copies = sum(dup["copies"] - 1 for dup in duplicates)
+        saved_mb = sum(dup["bytes_saved"] for dup in duplicates) / (1024 * 1024)
+        print(f"Skipped {copies} duplicate copies across {len(duplicates)} documents ({saved_mb:.1f} MB)")
+    print(f"Found {len(all_pdfs['invoices'])} invoices")
     print(f"Found {len(all_pdfs['contracts'])} contracts")
-    print(f"Found {len(all_pdfs['unknown'])} unknown PDFs")
+    print(f"Found {len(all_pdfs['unknown'])} unknown PDFs (not sent for extraction)")
+    print(classification_summary(classifications))
 
     return all_pdfs
 
 
-def extract_invoice_with_vision(pdf_path, filename):
-    """Extract invoice data using Claude Vision API"""
-
-    print(f"   Extracting: {filename}...")
-
-    with open(pdf_path, "rb") as f:
-        pdf_data = base64.b64encode(f.read()).decode("utf-8")
+def extract_invoice_with_vision(pdf_path, filename, pages=None):
+    """Extract invoice data using Claude Vision API (pages: one segment of a multi-invoice statement)"""
 
     extraction_schema = {
         "source_file": "",
@@ -126,9 +125,9 @@ def extract_invoice_with_vision(pdf_path, filename):
         }
     }
 
-    prompt = f"""Extract all information from this waste management invoice/bill into structured JSON.
+    prompt = f"""Extract all information from this waste management invoice/bill and record it with the {EXTRACTION_TOOL_NAME} tool.
 
-Return ONLY valid JSON in this exact format:
+The tool input follows this structure:
 {json.dumps(extraction_schema, indent=2)}
 
 For line_items, include:
@@ -154,44 +153,41 @@ CRITICAL EXTRACTION RULES:
 7. For billing period, extract the service month/period
 8. Categorize charges appropriately
 
-Return ONLY the JSON, no explanations or markdown."""
+Call {EXTRACTION_TOOL_NAME} once with the complete extraction; do not answer in text."""
 
-    try:
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=4000,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "document",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "application/pdf",
-                                "data": pdf_data
-                            }
-                        },
-                        {
-                            "type": "text",
-                            "text": prompt
-                        }
-                    ]
-                }
-            ]
-        )
+    cache_key = extraction_cache.key(pdf_path, MODEL, prompt_fingerprint(prompt, extraction_schema, pages))
+    cached = extraction_cache.get(cache_key)
+    if cached is not None:
+        print(f"   Cached: {filename}")
+        cached["source_file"] = filename
+        return cached, None
 
-        response_text = message.content[0].text
+    print(f"   Extracting: {filename}...")
 
-        # Clean markdown
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
+    # Only pages with line items/totals are sent (remittance stubs, T&Cs dropped)
+    pdf_data, page_selection = prepare_pdf_for_vision(pdf_path, pages)
+    if page_selection:
+        print(f"      Page pruning: {selection_summary(page_selection)}")
 
-        extracted_data = json.loads(response_text)
+    try:
+        # Forced tool call: the answer arrives as schema-checked JSON
+        extracted_data, problems = request_structured(
+            client,
+            schema_from_template(extraction_schema),
+            model=MODEL,
+            max_tokens=4000,
+            **document_request(pdf_data, prompt)
+        )
+        if extracted_data is None:
+            raise ValueError(problems[0])
+        if problems:
+            extracted_data["schema_warnings"] = problems
+        if page_selection:
+            extracted_data["page_selection"] = page_selection
         extracted_data["source_file"] = filename
 
+        extraction_cache.put(cache_key, extracted_data, source_file=filename, model=MODEL)
+
         return extracted_data, None
 
     except Exception as e:
@@ -201,11 +197,6 @@ Return ONLY the JSON, no explanations or markdown."""
 def extract_contract_with_vision(pdf_path, filename):
     """Extract contract data using Claude Vision API"""
 
-    print(f"   Extracting: {filename}...")
-
-    with open(pdf_path, "rb") as f:
-        pdf_data = base64.b64encode(f.read()).decode("utf-8")
-
     extraction_schema = {
         "source_file": "",
         "document_type": "contract",
@@ -231,9 +222,9 @@ def extract_contract_with_vision(pdf_path, filename):
         }
     }
 
-    prompt = f"""Extract all contract information into structured JSON.
+    prompt = f"""Extract all contract information and record it with the {EXTRACTION_TOOL_NAME} tool.
 
-Return ONLY valid JSON in this format:
+The tool input follows this structure:
 {json.dumps(extraction_schema, indent=2)}
 
 For service_schedules, include:
@@ -250,44 +241,37 @@ CRITICAL:
 4. Look for auto-renewal and termination clauses
 5. If field not found, use null
 
-Return ONLY JSON, no explanations."""
+Call {EXTRACTION_TOOL_NAME} once with the complete extraction; do not answer in text."""
 
-    try:
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=4000,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "document",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "application/pdf",
-                                "data": pdf_data
-                            }
-                        },
-                        {
-                            "type": "text",
-                            "text": prompt
-                        }
-                    ]
-                }
-            ]
-        )
+    cache_key = extraction_cache.key(pdf_path, MODEL, prompt_fingerprint(prompt, extraction_schema))
+    cached = extraction_cache.get(cache_key)
+    if cached is not None:
+        print(f"   Cached: {filename}")
+        cached["source_file"] = filename
+        return cached, None
 
-        response_text = message.content[0].text
+    print(f"   Extracting: {filename}...")
 
-        # Clean markdown
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
+    with open(pdf_path, "rb") as f:
+        pdf_data = base64.b64encode(f.read()).decode("utf-8")
 
-        extracted_data = json.loads(response_text)
+    try:
+        # Forced tool call: the answer arrives as schema-checked JSON
+        extracted_data, problems = request_structured(
+            client,
+            schema_from_template(extraction_schema),
+            model=MODEL,
+            max_tokens=4000,
+            **document_request(pdf_data, prompt)
+        )
+        if extracted_data is None:
+            raise ValueError(problems[0])
+        if problems:
+            extracted_data["schema_warnings"] = problems
         extracted_data["source_file"] = filename
 
+        extraction_cache.put(cache_key, extracted_data, source_file=filename, model=MODEL)
+
         return extracted_data, None
 
     except Exception as e:
@@ -317,6 +301,11 @@ def validate_extraction(extracted_data, doc_type="invoice"):
             errors.append("Missing amount")
             confidence -= 0.15
 
+    # Output that did not match the extraction schema (see structured_output)
+    if extracted_data.get("schema_warnings"):
+        errors.extend(f"Schema: {warning}" for warning in extracted_data["schema_warnings"])
+        confidence -= 0.10
+
     return {
         "needs_review": confidence < 0.70,
         "confidence": round(max(0, confidence), 2),
@@ -324,6 +313,41 @@ def validate_extraction(extracted_data, doc_type="invoice"):
     }
 
 
+def process_document(pdf_info, doc_type, unit=None):
+    """Extract and validate one scanned PDF or statement segment (one unit of concurrent work)"""
+
+    started = time.monotonic()
+    with client.track_calls() as calls:
+        if doc_type == "contract":
+            extraction, error = extract_contract_with_vision(pdf_info['path'], pdf_info['filename'])
+        else:
+            pages = unit.pages if unit else None
+            extraction, error = extract_invoice_tiered(
+                pdf_info['path'],
+                lambda pdf_path: extract_invoice_with_vision(pdf_path, pdf_info['filename'], pages),
+                lambda data: validate_extraction(data, "invoice"),
+                pages=pages
+            )
+    run_metrics.record(pdf_info['path'], extraction, error, calls, time.monotonic() - started,
+                       pages=unit.page_numbers if unit else None)
+    if unit:
+        unit.attach_provenance(extraction)
+
+    if extraction is not None and pdf_info.get("aliases"):
+        extraction["source_aliases"] = pdf_info["aliases"]
+
+    validation = validate_extraction(extraction, doc_type)
+    return extraction, validation
+
+
+def document_status(result):
+    """Progress status line for a processed document"""
+
+    _, validation = result
+    status = "OK" if not validation["needs_review"] else "NEEDS REVIEW"
+    return f"{status} (Confidence: {validation['confidence']})"
+
+
 def export_comprehensive_excel(all_invoices, all_contracts, output_path):
     """Export everything to Excel"""
 
@@ -388,12 +412,18 @@ def export_comprehensive_excel(all_invoices, all_contracts, output_path):
                 invoice = inv_data.get("invoice", {})
                 base_row = {
                     "Source File": inv_data.get("source_file"),
+                    "Source Pages": page_range_label(inv_data["provenance"]["pages"])
+                                    if inv_data.get("provenance") else "",
                     "Property": inv_data.get("property_name"),
                     "Vendor": inv_data.get("vendor_name"),
                     "Invoice #": invoice.get("invoice_number"),
                     "Invoice Date": invoice.get("invoice_date"),
                     "Amount Due": invoice.get("amount_due"),
-                    "Billing Period": inv_data.get("billing_period", {}).get("month_year")
+                    "Billing Period": inv_data.get("billing_period", {}).get("month_year"),
+                    "Extraction Tier": inv_data.get("extraction_tier"),
+                    "Pages Dropped": ", ".join(
+                        str(dropped["page"]) for dropped in (inv_data.get("page_selection") or {}).get("dropped_pages", [])
+                    )
                 }
 
                 line_items = invoice.get("line_items", [])
@@ -432,31 +462,38 @@ def main():
     # Step 1: Scan everything
     all_pdfs = comprehensive_scan()
 
-    # Step 2: Extract invoices
-    print(f"\nExtracting {len(all_pdfs['invoices'])} invoices...")
-    all_invoices = []
-
-    for i, pdf_info in enumerate(all_pdfs['invoices'], 1):
-        print(f"[{i}/{len(all_pdfs['invoices'])}]", end=" ")
-        extraction, error = extract_invoice_with_vision(pdf_info['path'], pdf_info['filename'])
-        validation = validate_extraction(extraction, "invoice")
-        all_invoices.append((extraction, validation))
-
-        status = "OK" if not validation["needs_review"] else "NEEDS REVIEW"
-        print(f"      {status} (Confidence: {validation['confidence']})")
+    # Step 2: Extract invoices (multi-invoice statements as one unit per invoice)
+    invoice_units = split_into_units(all_pdfs['invoices'], path=lambda pdf_info: pdf_info['path'])
+    print(f"\nExtracting {len(invoice_units)} invoices...")
+    all_invoices = run_extractions(
+        invoice_units,
+        lambda unit: process_document(unit.item, "invoice", unit),
+        describe=lambda unit: unit.name,
+        status=document_status,
+        label="Invoice extraction"
+    )
+    all_invoices = [result or (None, validate_extraction(None)) for result in all_invoices]
+    statements = reassemble_statements(invoice_units, [inv for inv, _ in all_invoices])
 
     # Step 3: Extract contracts
     print(f"\nExtracting {len(all_pdfs['contracts'])} contracts...")
-    all_contracts = []
-
-    for i, pdf_info in enumerate(all_pdfs['contracts'], 1):
-        print(f"[{i}/{len(all_pdfs['contracts'])}]", end=" ")
-        extraction, error = extract_contract_with_vision(pdf_info['path'], pdf_info['filename'])
-        validation = validate_extraction(extraction, "contract")
-        all_contracts.append((extraction, validation))
-
-        status = "OK" if not validation["needs_review"] else "NEEDS REVIEW"
-        print(f"      {status} (Confidence: {validation['confidence']})")
+    all_contracts = run_extractions(
+        all_pdfs['contracts'],
+        lambda pdf_info: process_document(pdf_info, "contract"),
+        describe=lambda pdf_info: pdf_info['filename'],
+        status=document_status,
+        label="Contract extraction"
+    )
+    all_contracts = [result or (None, validate_extraction(None)) for result in all_contracts]
+
+    print(f"\n{tier_summary()}")
+    print(f"{statements_summary(statements)}")
+    print(f"{extraction_cache.summary()}")
+    print(f"{client.summary()}")
+    print(f"{metrics_summary(run_metrics.records())}")
+    evicted = extraction_cache.evict()
+    if evicted:
+        print(f"Cache eviction: removed {evicted} stale entries")
 
     # Step 4: Export
     print("\nExporting to Excel...")
@@ -470,16 +507,23 @@ def main():
             "extraction_date": datetime.now().isoformat(),
             "total_invoices": len(all_invoices),
             "total_contracts": len(all_contracts),
+            "duplicates": all_pdfs["duplicates"],
+            "statements": statements,
             "invoices": [inv for inv, _ in all_invoices if inv],
             "contracts": [con for con, _ in all_contracts if con]
         }, f, indent=2)
 
+    # Step 6: Token/latency/cost roll-up per vendor and property
+    metrics_output = OUTPUT_FOLDER / f"Metrics_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+    generate_metrics_report(run_metrics.records(), metrics_output)
+
     print("\n" + "=" * 80)
     print("EXTRACTION COMPLETE!")
     print("=" * 80)
     print(f"\nFiles:")
     print(f"  - Excel: {excel_output}")
     print(f"  - JSON: {json_output}")
+    print(f"  - Metrics: {metrics_output}")
     print(f"\nExtracted:")
     print(f"  - {len(all_invoices)} invoices")
     print(f"  - {len(all_contracts)} contracts")
@@ -0,0 +1,190 @@
+"""
+Content-Based Document Classifier
+Classifies PDFs as invoice / statement / contract from the first page text layer
+
+Filename and folder keywords misroute documents ("invoice (7).pdf" saved in
+a contracts folder, "TCAM 6.15.25.pdf" which is really a statement), and a
+misrouted 20-page agreement costs 20 pages of vision calls. This classifier
+reads only page 1 of the text layer (via the pdf_text sidecar cache),
+scores weighted invoice/statement/contract features, and caches the result
+in the file catalog keyed by the PDF's SHA-256, so each document is
+classified once.
+
+PDFs with no usable text layer fall back to the path-based classification
+and are marked method="path": scans with no text at all, scans whose text
+layer is only a short stamp ("AA261626010220259-022025") and any page that
+scores below MIN_SCORE. Invoice and statement are extracted alike, so a
+document split between the two counts as extractable, not as "unknown".
+
+USAGE:
+    from document_classifier import classify_documents, EXTRACTABLE_CLASSES
+
+    results = classify_documents(file_infos)   # sha256 -> result
+"""
+
+import re
+
+from file_catalog import classify_path, open_catalog
+from pdf_text import get_pdf_texts
+
+# Bump when features or weights change so cached results are recomputed
+CLASSIFIER_VERSION = "first-page-v3"
+
+# Minimum winning score and winner/total share to accept a text classification
+MIN_SCORE = 3.0
+MIN_CONFIDENCE = 0.55
+
+# Shorter first-page text is a stamp or OCR fragment, not a text layer
+MIN_TEXT_CHARS = 100
+
+# Classes that go on to (vision) invoice extraction
+EXTRACTABLE_CLASSES = ("invoice", "statement")
+
+FEATURES = {
+    "invoice": [
+        (re.compile(r"invoice\s*(?:number|no\.?|#)", re.IGNORECASE), 2.0),
+        (re.compile(r"invoice\s*date", re.IGNORECASE), 1.5),
+        (re.compile(r"(?:amount|total|balance)\s*due|please\s*pay", re.IGNORECASE), 2.0),
+        (re.compile(r"due\s*date|pay\s*by", re.IGNORECASE), 1.0),
+        (re.compile(r"account\s*(?:number|no\.?|#)", re.IGNORECASE), 1.0),
+        (re.compile(r"remit|payment\s*stub|detach|return\s*this\s*portion", re.IGNORECASE), 1.0),
+        (re.compile(r"(?:service|billing)\s*period", re.IGNORECASE), 1.0),
+    ],
+    "statement": [
+        (re.compile(r"\bstatement\b(?!\s*of\s*work)", re.IGNORECASE), 2.0),
+        (re.compile(r"statement\s*date|account\s*statement", re.IGNORECASE), 1.5),
+        (re.compile(r"balance\s*forward|beginning\s*balance", re.IGNORECASE), 1.5),
+        (re.compile(r"\b(?:1-30|31-60|61-90|over\s*90)\b|30\s*days.*60\s*days", re.IGNORECASE), 1.5),
+    ],
+    "contract": [
+        (re.compile(r"\bagreement\b", re.IGNORECASE), 2.0),
+        (re.compile(r"this\s*agreement|hereby|hereinafter|whereas", re.IGNORECASE), 2.0),
+        (re.compile(r"\bterm\s*of\b|initial\s*term|renew", re.IGNORECASE), 1.0),
+        (re.compile(r"terminat", re.IGNORECASE), 1.0),
+        (re.compile(r"indemnif|liabilit|governing\s*law", re.IGNORECASE), 1.5),
+        (re.compile(r"effective\s*date", re.IGNORECASE), 1.0),
+        (re.compile(r"\bpart(?:y|ies)\b|in\s*witness\s*whereof|signature", re.IGNORECASE), 1.0),
+    ],
+}
+
+# Invoice table rows on a statement: date, document number, amount
+STATEMENT_ROW = re.compile(r"^\s*\d{1,2}/\d{1,2}/\d{2,4}\s+\S*\d{4,}\S*\s.*\$?[\d,]+\.\d{2}\s*$", re.MULTILINE)
+DOLLAR_AMOUNT = re.compile(r"\$\s?[\d,]+\.\d{2}")
+
+
+def classify_text(first_page_text, total_pages=1):
+    """
+    Score one document's first page
+
+    Returns:
+        {"classification", "confidence", "details": {"method", "scores", "matched"}}
+        classification is "invoice", "statement", "contract" or "unknown"
+    """
+    scores = {}
+    matched = {}
+    for doc_class, features in FEATURES.items():
+        hits = [(pattern.pattern, weight) for pattern, weight in features if pattern.search(first_page_text)]
+        matched[doc_class] = [pattern for pattern, _ in hits]
+        scores[doc_class] = sum(weight for _, weight in hits)
+
+    # Structural signals the keyword lists miss
+    statement_rows = len(STATEMENT_ROW.findall(first_page_text))
+    if statement_rows >= 3:
+        scores["statement"] += 2.0
+    if len(DOLLAR_AMOUNT.findall(first_page_text)) >= 3:
+        scores["invoice"] += 1.0
+    if total_pages >= 6:
+        scores["contract"] += 1.0
+
+    # A statement is also invoice-like; count its invoice features towards it
+    if scores["statement"] >= MIN_SCORE:
+        scores["statement"] += scores["invoice"] / 2
+
+    best = max(scores, key=scores.get)
+    total = sum(scores.values())
+    # Invoice and statement go the same way, so their shares count together
+    winning = scores[best]
+    if best in EXTRACTABLE_CLASSES:
+        winning = sum(scores[doc_class] for doc_class in EXTRACTABLE_CLASSES)
+    confidence = winning / total if total else 0.0
+
+    classification = best
+    if scores[best] < MIN_SCORE or confidence < MIN_CONFIDENCE:
+        classification = "unknown"
+
+    return {
+        "classification": classification,
+        "confidence": round(confidence, 3),
+        "details": {
+            "method": "text",
+            "scores": {doc_class: round(score, 2) for doc_class, score in scores.items()},
+            "matched": matched,
+            "statement_rows": statement_rows,
+            "total_pages": total_pages
+        }
+    }
+
+
+def _classify_by_path(file_info):
+    """Fallback for scans: best path-based class over the file and its aliases"""
+    order = ["invoice", "contract", "unknown"]
+    candidates = [file_info.get("relative_path", file_info["path"])] + list(file_info.get("aliases", []))
+    classification = min((classify_path(path) for path in candidates), key=order.index)
+    return {
+        "classification": classification,
+        "confidence": None,
+        "details": {"method": "path"}
+    }
+
+
+def classify_documents(file_infos, catalog=None):
+    """
+    Classify PDFs by content, reusing cached results from the file catalog
+
+    Args:
+        file_infos: Dicts with "path" and "sha256" (as returned by the scan /
+            collapse_duplicates); "relative_path" and "aliases" are used for
+            the no-text-layer fallback
+        catalog: FileCatalog for the result cache (default: shared catalog)
+
+    Returns:
+        Dict of sha256 -> {"classification", "confidence", "details"}
+    """
+    catalog = catalog or open_catalog()
+    by_hash = {info["sha256"]: info for info in file_infos if info.get("sha256")}
+
+    results = catalog.get_content_classes(by_hash.keys(), CLASSIFIER_VERSION)
+    pending = [info for digest, info in by_hash.items() if digest not in results]
+
+    if pending:
+        print(f"   Classifying {len(pending)} PDFs by first-page content "
+              f"({len(results)} cached)...")
+        docs = get_pdf_texts([info["path"] for info in pending], max_pages=1)
+
+        classified = {}
+        for info in pending:
+            doc = docs[str(info["path"])]
+            result = None
+            if len(doc.first_page.strip()) >= MIN_TEXT_CHARS:
+                result = classify_text(doc.first_page, doc.total_pages)
+                if max(result["details"]["scores"].values()) < MIN_SCORE:
+                    result = None
+            classified[info["sha256"]] = result or _classify_by_path(info)
+
+        # Path fallbacks are not cached: they depend on where the file sits, not its content
+        catalog.put_content_classes(
+            {digest: result for digest, result in classified.items() if result["details"]["method"] == "text"},
+            CLASSIFIER_VERSION
+        )
+        results.update(classified)
+
+    return results
+
+
+def classification_summary(results):
+    """One-line count of documents per class"""
+    counts = {}
+    for result in results.values():
+        counts[result["classification"]] = counts.get(result["classification"], 0) + 1
+    parts = [f"{counts[doc_class]} {doc_class}" for doc_class in sorted(counts)]
+    return "Classification: " + ", ".join(parts) if parts else "Classification: nothing to classify"
@@ -1,10 +1,31 @@
 """
 Extract property addresses from invoice PDFs
+
+Reads the cached page-1 text (pdf_text sidecars) of each property's invoices
+and matches a precompiled address pattern against the header region only,
+one property per worker. Each result is stored with its confidence and the
+file/page it came from in Portfolio_Reports/addresses_data.json, which
+update_reference_sheet_addresses.py reads instead of re-parsing PDFs.
+
+Confidence:
+    1.0  Invoice address agrees with the known address (same street number)
+    0.9  Property-specific pattern on the invoice confirms the known address
+    0.8  Invoice address that differs from the known address (check it)
+    0.5  No usable address on the invoices - known address used
+    0.0  Nothing found
 """
 
-import pdfplumber
-from pathlib import Path
+import json
 import re
+from pathlib import Path
+
+from extraction_engine import run_extractions
+from pdf_text import get_pdf_texts
+
+BASE_DIR = Path(__file__).parent.parent
+REPORTS_DIR = BASE_DIR / "Portfolio_Reports"
+ADDRESS_DATA_FILE = REPORTS_DIR / "addresses_data.json"
+ADDRESS_TEXT_FILE = REPORTS_DIR / "extracted_addresses.txt"
 
 properties = {
     'Orion Prosper': 'Properties/Orion_Prosper',
@@ -33,125 +54,175 @@ KNOWN_ADDRESSES = {
     'Tempe Vista': '1035 E Baseline Rd, Tempe, AZ 85283'
 }
 
-# Post-processing: ensure extracted addresses have complete zip codes
-def normalize_address(address, prop_name):
-    """Ensure address has complete zip code"""
-    if not address:
-        return KNOWN_ADDRESSES.get(prop_name, None)
+# Invoices checked per property
+MAX_PDFS_PER_PROPERTY = 3
+
+# Service/billing addresses sit in the invoice header; lines below are line items and remit-to stubs
+HEADER_LINES = 30
+
+# Street number + street name + suffix, city, state, zip
+ADDRESS_PATTERN = re.compile(
+    r'\d+\s+[NSEW]?\s*[A-Za-z\s]+(?:St|Street|Ave|Avenue|Rd|Road|Dr|Drive|Pkwy|Parkway|Blvd|Boulevard|Way|Lane|Ln|Ct|Court|Circle|Cir|Trail|Pl|Place),?\s+[A-Za-z\s]+,?\s+[A-Z]{2}\s+\d{5}',
+    re.IGNORECASE
+)
+
+# Property-specific fallbacks for invoices that print the address without a full city/zip
+PROPERTY_HINTS = {
+    'Orion McKinney': ('COLLIN MCKINNEY', re.compile(r'(\d+\s+COLLIN MCKINNEY\s+PKWY.*?TX)', re.IGNORECASE)),
+    'Springs at Alta Mesa': ('HIGLEY', re.compile(r'(\d+\s+N\.?\s+Higley\s+Rd.*?AZ\s+\d{5})', re.IGNORECASE)),
+}
+
+ZIP_PATTERN = re.compile(r'\d{5}')
+STREET_NUMBER = re.compile(r'^\s*(\d+)')
 
-    # If address is missing zip code, use known address
-    import re
-    if not re.search(r'\d{5}', address):
-        return KNOWN_ADDRESSES.get(prop_name, address)
 
-    return address
+def header_lines(doc, max_lines=HEADER_LINES):
+    """Top lines of page 1"""
+    return doc.first_page.split('\n')[:max_lines]
 
-def extract_address_from_pdf(pdf_path, property_name):
-    """Extract address from PDF invoice"""
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            page = pdf.pages[0]
-            text = page.extract_text()
 
-            # Look for common address patterns
-            lines = text.split('\n')
+def find_address(doc, property_name):
+    """
+    Address in one invoice's page-1 header
 
-            # Pattern 1: Look for street addresses (numbers + street name + city + state + zip)
-            address_pattern = r'\d+\s+[NSEW]?\s*[A-Za-z\s]+(?:St|Street|Ave|Avenue|Rd|Road|Dr|Drive|Pkwy|Parkway|Blvd|Boulevard|Way|Lane|Ln|Ct|Court|Circle|Cir|Trail|Pl|Place),?\s+[A-Za-z\s]+,?\s+[A-Z]{2}\s+\d{5}'
+    Returns:
+        (address, method) - method is "invoice" for a full address match,
+        "invoice_hint" for a property-specific partial match; (None, None)
+        when nothing matched
+    """
+    lines = header_lines(doc)
 
-            for line in lines[:50]:  # Check first 50 lines
-                match = re.search(address_pattern, line, re.IGNORECASE)
-                if match:
-                    return match.group(0)
-
-            # Pattern 2: Look for property-specific strings
-            if property_name == 'Orion McKinney':
-                for line in lines[:50]:
-                    if 'COLLIN MCKINNEY' in line.upper():
-                        # Extract the full address from this line
-                        match = re.search(r'(\d+\s+COLLIN MCKINNEY\s+PKWY.*?TX)', line, re.IGNORECASE)
-                        if match:
-                            return match.group(1)
-
-            elif property_name == 'Springs at Alta Mesa':
-                for line in lines[:50]:
-                    if 'HIGLEY' in line.upper():
-                        match = re.search(r'(\d+\s+N\.?\s+Higley\s+Rd.*?AZ\s+\d{5})', line, re.IGNORECASE)
-                        if match:
-                            return match.group(1)
-
-            elif property_name == 'Bella Mirage':
-                for line in lines[:50]:
-                    if 'INDIAN SCHOOL' in line.upper() or 'AVONDALE' in line.upper():
-                        return None  # Will use known address
-
-            # If no address found, return None
-            return None
-
-    except Exception as e:
-        return None
-
-print("=" * 80)
-print("EXTRACTING ADDRESSES FROM INVOICES")
-print("=" * 80)
-
-extracted_addresses = {}
-
-for prop_name, prop_path in properties.items():
-    print(f"\n{prop_name}:")
-
-    # Find invoice PDFs
-    pdf_files = list(Path(prop_path).glob('*.pdf'))
-
-    if pdf_files:
-        # Try first few invoices
-        address_found = None
-
-        for pdf_file in pdf_files[:3]:
-            print(f"  Checking: {pdf_file.name}")
-            address = extract_address_from_pdf(pdf_file, prop_name)
-
-            if address:
-                address_found = address
-                print(f"  [FOUND] {address}")
-                break
-
-        if not address_found:
-            # Use known address
-            if prop_name in KNOWN_ADDRESSES:
-                address_found = KNOWN_ADDRESSES[prop_name]
-                print(f"  [USING KNOWN] {address_found}")
-
-        # Normalize the address to ensure complete zip code
-        address_found = normalize_address(address_found, prop_name)
-        extracted_addresses[prop_name] = address_found
-    else:
-        print(f"  No PDFs found, using known address")
-        if prop_name in KNOWN_ADDRESSES:
-            extracted_addresses[prop_name] = KNOWN_ADDRESSES[prop_name]
-
-print("\n" + "=" * 80)
-print("EXTRACTED ADDRESSES SUMMARY")
-print("=" * 80)
-
-for prop_name, address in extracted_addresses.items():
-    status = "[OK]" if address else "[MISSING]"
-    print(f"{status} {prop_name}: {address or 'TBD'}")
-
-# Save to file for reference
-with open('Portfolio_Reports/extracted_addresses.txt', 'w') as f:
-    f.write("Property Addresses Extracted from Invoices\n")
-    f.write("=" * 80 + "\n\n")
-
-    for prop_name, address in extracted_addresses.items():
-        f.write(f"{prop_name}: {address or 'TBD'}\n")
-
-print(f"\n[OK] Addresses saved to: Portfolio_Reports/extracted_addresses.txt")
-print("=" * 80)
-
-# Return the addresses dictionary for use in update script
-import json
-with open('Portfolio_Reports/addresses_data.json', 'w') as f:
-    json.dump(extracted_addresses, f, indent=2)
+    for line in lines:
+        match = ADDRESS_PATTERN.search(line)
+        if match:
+            return match.group(0), "invoice"
 
-print(f"[OK] Address data saved to: Portfolio_Reports/addresses_data.json")
+    hint = PROPERTY_HINTS.get(property_name)
+    if hint:
+        marker, pattern = hint
+        for line in lines:
+            if marker in line.upper():
+                match = pattern.search(line)
+                if match:
+                    return match.group(1), "invoice_hint"
+
+    return None, None
+
+
+def _street_number(address):
+    match = STREET_NUMBER.match(address or '')
+    return match.group(1) if match else None
+
+
+def address_result(prop_name, address=None, method=None, source_file=None, page=None):
+    """Stored result for one property, falling back to the known address"""
+    known = KNOWN_ADDRESSES.get(prop_name)
+
+    # Partial matches (no zip) confirm the known address rather than replace it
+    if address and not ZIP_PATTERN.search(address):
+        if known and _street_number(address) == _street_number(known):
+            return {"address": known, "confidence": 0.9, "method": method,
+                    "source_file": source_file, "page": page}
+        address = None
+
+    if address:
+        confidence = 1.0 if known and _street_number(address) == _street_number(known) else 0.8
+        return {"address": address, "confidence": confidence, "method": method,
+                "source_file": source_file, "page": page}
+
+    if known:
+        return {"address": known, "confidence": 0.5, "method": "known",
+                "source_file": None, "page": None}
+    return {"address": None, "confidence": 0.0, "method": None, "source_file": None, "page": None}
+
+
+def extract_property_address(prop):
+    """Address result for one (property name, folder) pair"""
+    prop_name, prop_path = prop
+    pdf_files = sorted((BASE_DIR / prop_path).glob('*.pdf'))[:MAX_PDFS_PER_PROPERTY]
+
+    docs = get_pdf_texts(pdf_files, max_pages=1)
+    for pdf_file in pdf_files:
+        doc = docs[str(pdf_file)]
+        if doc.error:
+            continue
+        address, method = find_address(doc, prop_name)
+        if address:
+            return address_result(prop_name, address, method, pdf_file.name, page=1)
+
+    return address_result(prop_name)
+
+
+def address_status(result):
+    if result["method"] in ("invoice", "invoice_hint"):
+        return f"[FOUND] {result['address']} ({result['source_file']} p{result['page']}, confidence {result['confidence']})"
+    if result["address"]:
+        return f"[USING KNOWN] {result['address']}"
+    return "[MISSING]"
+
+
+def load_addresses(path=ADDRESS_DATA_FILE):
+    """
+    Stored address results by property name
+
+    Older files mapped property name to a plain address string; those are
+    returned as known-address results.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {
+        prop_name: entry if isinstance(entry, dict) else
+        {"address": entry, "confidence": 0.5, "method": "known", "source_file": None, "page": None}
+        for prop_name, entry in data.items()
+    }
+
+
+def main():
+    print("=" * 80)
+    print("EXTRACTING ADDRESSES FROM INVOICES")
+    print("=" * 80)
+
+    items = list(properties.items())
+    results = run_extractions(
+        items,
+        extract_property_address,
+        describe=lambda prop: prop[0],
+        status=address_status,
+        label="Address extraction"
+    )
+    extracted_addresses = {
+        prop_name: result or address_result(prop_name)
+        for (prop_name, _), result in zip(items, results)
+    }
+
+    print("\n" + "=" * 80)
+    print("EXTRACTED ADDRESSES SUMMARY")
+    print("=" * 80)
+
+    for prop_name, result in extracted_addresses.items():
+        status = "[OK]" if result["address"] else "[MISSING]"
+        print(f"{status} {prop_name}: {result['address'] or 'TBD'} "
+              f"(confidence {result['confidence']}, {result['method'] or 'not found'})")
+
+    # Save to file for reference
+    with open(ADDRESS_TEXT_FILE, 'w') as f:
+        f.write("Property Addresses Extracted from Invoices\n")
+        f.write("=" * 80 + "\n\n")
+
+        for prop_name, result in extracted_addresses.items():
+            source = f"{result['source_file']} page {result['page']}" if result["source_file"] else result["method"]
+            f.write(f"{prop_name}: {result['address'] or 'TBD'} "
+                    f"[confidence {result['confidence']}, {source or 'not found'}]\n")
+
+    print(f"\n[OK] Addresses saved to: {ADDRESS_TEXT_FILE}")
+    print("=" * 80)
+
+    # Address, confidence and source for update_reference_sheet_addresses.py
+    with open(ADDRESS_DATA_FILE, 'w', encoding='utf-8') as f:
+        json.dump(extracted_addresses, f, indent=2)
+
+    print(f"[OK] Address data saved to: {ADDRESS_DATA_FILE}")
+
+
+if __name__ == "__main__":
+    main()
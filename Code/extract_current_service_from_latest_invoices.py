@@ -12,25 +12,25 @@ from datetime import datetime
 from openpyxl import load_workbook
 from openpyxl.utils.dataframe import dataframe_to_rows
 
+from file_catalog import scan_files
+
 def find_latest_invoice(property_folder):
     """Find the most recent invoice PDF in a property folder"""
     folder = Path(property_folder)
     if not folder.exists():
         return None
 
-    pdf_files = list(folder.glob('*.pdf'))
+    # Catalog rows come back most recently modified first
+    pdf_files = scan_files(folder, ext='.pdf', recursive=False, order_by='mtime')
     if not pdf_files:
         return None
 
-    # Sort by modification time, most recent first
-    pdf_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-
     # Look for invoice files (exclude contracts)
     for pdf in pdf_files:
-        filename = pdf.name.lower()
+        filename = pdf['name'].lower()
         if 'invoice' in filename or 'bill' in filename or 'trash' in filename:
             if 'contract' not in filename and 'agreement' not in filename:
-                return pdf
+                return Path(pdf['path'])
 
     return None
 
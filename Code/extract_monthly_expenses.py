@@ -12,6 +12,12 @@ from datetime import datetime
 from collections import defaultdict
 import numpy as np
 
+from invoice_ledger import read_master_sheet
+from line_item_table import cents_column, format_cents, line_item_table, to_cents
+
+# Extracted vs expected total spend, in cents
+TOTAL_TOLERANCE_CENTS = 100
+
 class ExpenseExtractor:
     """Universal expense extraction engine with pattern detection and validation"""
 
@@ -46,7 +52,7 @@ class ExpenseExtractor:
 
         # Load property data from master file
         try:
-            df = pd.read_excel(self.master_file_path, sheet_name=property_name)
+            df = read_master_sheet(property_name, self.master_file_path)
             print(f"Loaded {len(df)} records from master file")
         except Exception as e:
             raise Exception(f"Failed to load property data: {str(e)}")
@@ -55,6 +61,9 @@ class ExpenseExtractor:
         detected_pattern = self._detect_pattern(df, prop_config)
         print(f"Data Pattern: {detected_pattern}")
 
+        # Amounts to integer cents, once - every sum below is exact
+        df = line_item_table(df)
+
         # Extract based on pattern
         if detected_pattern == 'A':
             monthly_df = self._extract_pattern_a(df, property_name, prop_config)
@@ -64,6 +73,7 @@ class ExpenseExtractor:
             monthly_df = self._extract_pattern_c(df, property_name, prop_config)
         else:
             raise ValueError(f"Unknown data pattern: {detected_pattern}")
+        monthly_df['Amount'] = monthly_df['Amount Cents'] / 100
 
         # Post-processing
         monthly_df = self._standardize_vendor_names(monthly_df, property_name)
@@ -75,7 +85,7 @@ class ExpenseExtractor:
         validation_result = self._validate_extraction(monthly_df, df, prop_config)
 
         print(f"\n[OK] Extraction complete: {len(monthly_df)} months extracted")
-        print(f"Total spend: ${monthly_df['Amount'].sum():,.2f}")
+        print(f"Total spend: {format_cents(int(monthly_df['Amount Cents'].sum()))}")
         print(f"Validation: {validation_result['status']}")
 
         return monthly_df, validation_result
@@ -110,7 +120,8 @@ class ExpenseExtractor:
         df['Invoice Date'] = pd.to_datetime(df['Invoice Date'], errors='coerce')
 
         # Drop rows with no amount
-        df_clean = df[df['Extended Amount'].notna()].copy()
+        amount = cents_column('Extended Amount')
+        df_clean = df[df[amount].notna()].copy()
         print(f"  Records with amounts: {len(df_clean)}")
 
         # Handle missing invoice numbers
@@ -126,12 +137,12 @@ class ExpenseExtractor:
 
         # Group by invoice and sum amounts
         agg_dict = {
-            'Extended Amount': 'sum'
+            amount: 'sum'
         }
         if 'Category' in df_clean.columns:
             agg_dict['Category'] = lambda x: ', '.join(x.dropna().unique()) if len(x.dropna().unique()) > 0 else 'Service'
 
-        invoice_groups = df_clean.groupby(['Invoice Number', 'Invoice Date', 'Vendor']).agg(agg_dict).reset_index()
+        invoice_groups = df_clean.groupby(['Invoice Number', 'Invoice Date', 'Vendor'], observed=True).agg(agg_dict).reset_index()
 
         if 'Category' not in invoice_groups.columns:
             invoice_groups['Category'] = 'Service'
@@ -146,7 +157,7 @@ class ExpenseExtractor:
             'Invoice Number': lambda x: ', '.join(x.astype(str)),
             'Invoice Date': 'first',  # Use first invoice date in month
             'Vendor': lambda x: ', '.join(x.unique()),
-            'Extended Amount': 'sum'
+            amount: 'sum'
         }
         if 'Category' in invoice_groups.columns:
             agg_monthly['Category'] = lambda x: ', '.join(x.unique())
@@ -157,7 +168,7 @@ class ExpenseExtractor:
             monthly_df['Category'] = 'Service'
 
         # Rename columns to standard format
-        monthly_df = monthly_df.rename(columns={'Extended Amount': 'Amount'})
+        monthly_df = monthly_df.rename(columns={amount: 'Amount Cents'})
         monthly_df['Month'] = monthly_df['Month'].astype(str)
 
         # Sort by date
@@ -176,11 +187,12 @@ class ExpenseExtractor:
         df['Invoice Date'] = pd.to_datetime(df['Invoice Date'], errors='coerce')
 
         # Drop rows with no amount
-        df_clean = df[df['Total Amount'].notna()].copy()
+        amount = cents_column('Total Amount')
+        df_clean = df[df[amount].notna()].copy()
         print(f"  Records with amounts: {len(df_clean)}")
 
         # For each invoice, take first record's Total Amount
-        invoice_groups = df_clean.groupby(['Invoice Number', 'Vendor']).first().reset_index()
+        invoice_groups = df_clean.groupby(['Invoice Number', 'Vendor'], observed=True).first().reset_index()
 
         print(f"  Unique invoices: {len(invoice_groups)}")
 
@@ -192,7 +204,7 @@ class ExpenseExtractor:
             'Invoice Number': lambda x: ', '.join(x.astype(str)),
             'Invoice Date': 'first',
             'Vendor': lambda x: ', '.join(x.unique()),
-            'Total Amount': 'sum'
+            amount: 'sum'
         }
         if 'Category' in invoice_groups.columns:
             agg_monthly['Category'] = lambda x: ', '.join(x.dropna().unique())
@@ -203,7 +215,7 @@ class ExpenseExtractor:
             monthly_df['Category'] = 'Service'
 
         # Rename columns
-        monthly_df = monthly_df.rename(columns={'Total Amount': 'Amount'})
+        monthly_df = monthly_df.rename(columns={amount: 'Amount Cents'})
         monthly_df['Month'] = monthly_df['Month'].astype(str)
 
         # Sort by date
@@ -223,7 +235,8 @@ class ExpenseExtractor:
         df['Invoice Date'] = pd.to_datetime(df['Invoice Date'], errors='coerce')
 
         # Drop rows with no amount
-        df_clean = df[df['Invoice Amount'].notna()].copy()
+        amount = cents_column('Invoice Amount')
+        df_clean = df[df[amount].notna()].copy()
         print(f"  Records with amounts: {len(df_clean)}")
 
         # Create month column
@@ -243,11 +256,11 @@ class ExpenseExtractor:
             print(f"  Processing records with invoice numbers...")
 
             # Group by invoice number first
-            agg_dict = {'Invoice Amount': 'sum'}
+            agg_dict = {amount: 'sum'}
             if 'Category' in df_with_inv.columns:
                 agg_dict['Category'] = lambda x: ', '.join(x.dropna().unique())
 
-            invoice_groups = df_with_inv.groupby(['Invoice Number', 'Invoice Date', 'Vendor', 'Month']).agg(agg_dict).reset_index()
+            invoice_groups = df_with_inv.groupby(['Invoice Number', 'Invoice Date', 'Vendor', 'Month'], observed=True).agg(agg_dict).reset_index()
 
             if 'Category' not in invoice_groups.columns:
                 invoice_groups['Category'] = 'Service'
@@ -256,11 +269,11 @@ class ExpenseExtractor:
             agg_monthly = {
                 'Invoice Number': lambda x: ', '.join(x.astype(str)),
                 'Invoice Date': 'first',
-                'Invoice Amount': 'sum',
+                amount: 'sum',
                 'Category': lambda x: ', '.join(x.unique())
             }
 
-            monthly_with_inv = invoice_groups.groupby(['Month', 'Vendor']).agg(agg_monthly).reset_index()
+            monthly_with_inv = invoice_groups.groupby(['Month', 'Vendor'], observed=True).agg(agg_monthly).reset_index()
             all_monthly_data.append(monthly_with_inv)
             print(f"    Extracted {len(monthly_with_inv)} month-vendor combinations")
 
@@ -270,12 +283,12 @@ class ExpenseExtractor:
 
             agg_no_inv = {
                 'Invoice Date': 'first',
-                'Invoice Amount': 'sum'
+                amount: 'sum'
             }
             if 'Category' in df_without_inv.columns:
                 agg_no_inv['Category'] = lambda x: ', '.join(x.dropna().unique())
 
-            monthly_no_inv = df_without_inv.groupby(['Month', 'Vendor']).agg(agg_no_inv).reset_index()
+            monthly_no_inv = df_without_inv.groupby(['Month', 'Vendor'], observed=True).agg(agg_no_inv).reset_index()
 
             if 'Category' not in monthly_no_inv.columns:
                 monthly_no_inv['Category'] = 'Service'
@@ -302,22 +315,22 @@ class ExpenseExtractor:
             'Invoice Number': lambda x: ', '.join(sorted(set(x.astype(str)))),
             'Invoice Date': 'first',
             'Vendor': lambda x: ', '.join(sorted(set(x))),
-            'Invoice Amount': 'sum',
+            amount: 'sum',
             'Category': lambda x: ', '.join(sorted(set(x)))
         }
 
         monthly_df = monthly_df.groupby('Month').agg(agg_by_month).reset_index()
 
         # Rename columns
-        monthly_df = monthly_df.rename(columns={'Invoice Amount': 'Amount'})
+        monthly_df = monthly_df.rename(columns={amount: 'Amount Cents'})
         monthly_df['Month'] = monthly_df['Month'].astype(str)
 
         # Sort by date
         monthly_df = monthly_df.sort_values('Invoice Date')
 
-        total_extracted = monthly_df['Amount'].sum()
+        total_extracted = int(monthly_df['Amount Cents'].sum())
         print(f"  Months extracted: {len(monthly_df)}")
-        print(f"  Total amount: ${total_extracted:,.2f}")
+        print(f"  Total amount: {format_cents(total_extracted)}")
 
         return monthly_df
 
@@ -413,17 +426,17 @@ class ExpenseExtractor:
             'checks': {}
         }
 
-        # Check 1: Total spend match
-        extracted_total = monthly_df['Amount'].sum()
-        expected_total = prop_config['total_spend']
-        difference = abs(extracted_total - expected_total)
+        # Check 1: Total spend match (integer cents - no float drift)
+        extracted_cents = int(monthly_df['Amount Cents'].sum())
+        expected_cents = to_cents(prop_config['total_spend'])
+        difference_cents = abs(extracted_cents - expected_cents)
 
         validation['checks']['total_spend'] = {
-            'extracted': float(extracted_total),
-            'expected': float(expected_total),
-            'difference': float(difference),
-            'tolerance': 1.00,
-            'passed': bool(difference <= 1.00)
+            'extracted': extracted_cents / 100,
+            'expected': expected_cents / 100,
+            'difference': difference_cents / 100,
+            'tolerance': TOTAL_TOLERANCE_CENTS / 100,
+            'passed': bool(difference_cents <= TOTAL_TOLERANCE_CENTS)
         }
 
         # Check 2: Month count
@@ -457,7 +470,7 @@ class ExpenseExtractor:
 
         # Print validation summary
         print(f"\n  VALIDATION RESULTS:")
-        print(f"    Total Spend: ${extracted_total:,.2f} vs ${expected_total:,.2f} (diff: ${difference:.2f}) - {'[OK]' if validation['checks']['total_spend']['passed'] else '[FAIL]'}")
+        print(f"    Total Spend: {format_cents(extracted_cents)} vs {format_cents(expected_cents)} (diff: {format_cents(difference_cents)}) - {'[OK]' if validation['checks']['total_spend']['passed'] else '[FAIL]'}")
         print(f"    Month Count: {extracted_months} vs {expected_months} - {'[OK]' if validation['checks']['month_count']['passed'] else '[FAIL]'}")
         print(f"    Date Range: {min_date.strftime('%Y-%m')} to {max_date.strftime('%Y-%m')} - {'[OK]' if validation['checks']['date_range']['passed'] else '[FAIL]'}")
 
@@ -4,18 +4,12 @@ Orion Prosper Invoice Extraction Script
 Extracts structured data from all PDF invoices for Orion Prosper property.
 """
 
-import os
 import json
 import re
 from pathlib import Path
 from datetime import datetime
 
-try:
-    import pdfplumber
-except ImportError:
-    print("Installing pdfplumber...")
-    os.system("pip install pdfplumber")
-    import pdfplumber
+from pdf_text import get_pdf_text
 
 # Constants
 PROPERTY_NAME = "Orion Prosper"
@@ -31,17 +25,11 @@ CONTROLLABLE_KEYWORDS = [
 
 
 def extract_text_from_pdf(pdf_path):
-    """Extract all text from PDF file."""
-    text = ""
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-    except Exception as e:
-        print(f"Error extracting text from {pdf_path}: {e}")
-    return text
+    """Extract all text from PDF file (parsed once, then served from the pdf_text sidecar cache)."""
+    doc = get_pdf_text(pdf_path)
+    if doc.error:
+        print(f"Error extracting text from {pdf_path}: {doc.error}")
+    return doc.text
 
 
 def parse_invoice_number(text, filename):
@@ -6,11 +6,12 @@ the master Excel file with complete service information.
 """
 
 import pandas as pd
-import pdfplumber
 import re
 from pathlib import Path
 from datetime import datetime
 
+from pdf_text import get_pdf_text
+
 # Paths
 BASE_DIR = Path(__file__).parent.parent
 MASTER_FILE = BASE_DIR / "Portfolio_Reports" / "MASTER_Portfolio_Complete_Data.xlsx"
@@ -190,24 +191,21 @@ def extract_orion_prosper_from_invoices():
         print(f'Checking: {pdf_file.name}')
         
         try:
-            with pdfplumber.open(pdf_file) as pdf:
-                text = ''
-                for page in pdf.pages:
-                    text += page.extract_text() + '\n'
-                
-                # Look for service details
-                if 'COMPACTOR' in text.upper():
-                    print('  ✓ Found: COMPACTOR')
-                
-                # Look for container sizes
-                sizes = re.findall(r'(\d+)\s*(?:YD|YARD)', text, re.IGNORECASE)
-                if sizes:
-                    print(f'  ✓ Found sizes: {set(sizes)} YD')
-                
-                # Look for frequencies
-                freqs = re.findall(r'(\d+)x?\s*(?:per|/)\s*week', text, re.IGNORECASE)
-                if freqs:
-                    print(f'  ✓ Found frequency: {freqs}')
+            text = get_pdf_text(pdf_file).text
+            
+            # Look for service details
+            if 'COMPACTOR' in text.upper():
+                print('  ✓ Found: COMPACTOR')
+            
+            # Look for container sizes
+            sizes = re.findall(r'(\d+)\s*(?:YD|YARD)', text, re.IGNORECASE)
+            if sizes:
+                print(f'  ✓ Found sizes: {set(sizes)} YD')
+            
+            # Look for frequencies
+            freqs = re.findall(r'(\d+)x?\s*(?:per|/)\s*week', text, re.IGNORECASE)
+            if freqs:
+                print(f'  ✓ Found frequency: {freqs}')
         
         except Exception as e:
             print(f'  ✗ Error: {e}')
@@ -243,43 +241,38 @@ def extract_bella_mirage_from_contract():
         return
     
     try:
-        with pdfplumber.open(contract_path) as pdf:
-            text = ''
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + '\n'
+        text = get_pdf_text(contract_path).text
+        
+        if len(text.strip()) > 100:
+            print('Contract text extracted successfully')
+            print()
+            
+            # Look for container types
+            if 'COMPACTOR' in text.upper():
+                print('✓ Container Type: COMPACTOR')
+            elif 'DUMPSTER' in text.upper():
+                print('✓ Container Type: DUMPSTER')
+            elif 'FRONT END' in text.upper() or 'FEL' in text.upper():
+                print('✓ Container Type: FRONT END LOADER')
+            
+            # Look for container sizes
+            sizes = re.findall(r'(\d+)\s*(?:YD|YARD)', text, re.IGNORECASE)
+            if sizes:
+                print(f'✓ Container Sizes: {set(sizes)} YD')
+            
+            # Look for frequencies
+            freqs = re.findall(r'(\d+)x?\s*(?:per|/)\s*week', text, re.IGNORECASE)
+            if freqs:
+                print(f'✓ Frequency: {freqs}x/week')
             
-            if len(text.strip()) > 100:
-                print('Contract text extracted successfully')
-                print()
-                
-                # Look for container types
-                if 'COMPACTOR' in text.upper():
-                    print('✓ Container Type: COMPACTOR')
-                elif 'DUMPSTER' in text.upper():
-                    print('✓ Container Type: DUMPSTER')
-                elif 'FRONT END' in text.upper() or 'FEL' in text.upper():
-                    print('✓ Container Type: FRONT END LOADER')
-                
-                # Look for container sizes
-                sizes = re.findall(r'(\d+)\s*(?:YD|YARD)', text, re.IGNORECASE)
-                if sizes:
-                    print(f'✓ Container Sizes: {set(sizes)} YD')
-                
-                # Look for frequencies
-                freqs = re.findall(r'(\d+)x?\s*(?:per|/)\s*week', text, re.IGNORECASE)
-                if freqs:
-                    print(f'✓ Frequency: {freqs}x/week')
-                
-                # Show sample text
-                print()
-                print('Contract sample (first 1000 chars):')
-                print('-' * 80)
-                print(text[:1000])
-            else:
-                print('Contract appears to be image-based (no extractable text)')
-                print('Action Required: OCR or manual review')
+            # Show sample text
+            print()
+            print('Contract sample (first 1000 chars):')
+            print('-' * 80)
+            print(text[:1000])
+        else:
+            print('Contract appears to be image-based (no extractable text)')
+            print('Action Required: OCR or manual review')
     
     except Exception as e:
         print(f'Error: {e}')
@@ -6,15 +6,16 @@ Uses Claude Vision API for extraction and adds TCAM data to existing workbook.
 import os
 import sys
 import json
-import base64
-import re
 from datetime import datetime
 from pathlib import Path
-import anthropic
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl.styles import Alignment
+
+from extraction_engine import run_extractions
+from page_pruning import prepare_pdf_for_vision, selection_summary
+from structured_output import EXTRACTION_TOOL_NAME, request_structured, schema_from_template
+from vision_client import VisionClient, document_request
+from workbook_changes import WorkbookChanges
 
 # Set UTF-8 encoding for Windows console
 if sys.platform == "win32":
@@ -25,6 +26,37 @@ PROPERTY_NAME = "The Club at Millenia"
 MODEL = "claude-sonnet-4-20250514"
 MAX_TOKENS = 4000
 
+# Example of the structured result (also shown to the model in the prompt)
+TCAM_EXTRACTION_TEMPLATE = {
+    "invoice_number": "INV-XXXXX",
+    "invoice_date": "2025-04-15",
+    "service_period_start": "2025-04-01",
+    "service_period_end": "2025-04-30",
+    "total_amount": 1234.56,
+    "property_name": PROPERTY_NAME,
+    "service_provider": "Provider Name",
+    "account_number": "ACCT-XXXXX",
+    "due_date": "2025-05-15",
+    "previous_balance": 0.00,
+    "payments": 0.00,
+    "line_items": [
+        {
+            "description": "Service description",
+            "quantity": 1,
+            "unit_price": 100.00,
+            "amount": 100.00,
+            "service_type": "Base Service"
+        }
+    ],
+    "validation_flags": [],
+    "extraction_confidence": "high"
+}
+
+TCAM_SCHEMA = schema_from_template(
+    TCAM_EXTRACTION_TEMPLATE,
+    array_items={"line_items": schema_from_template(TCAM_EXTRACTION_TEMPLATE["line_items"][0])}
+)
+
 # Invoice file patterns - ONLY TCAM-named files
 TCAM_INVOICE_PATTERNS = [
     "TCAM 4.15.25.pdf",
@@ -55,9 +87,11 @@ def get_api_key():
 
 
 def encode_pdf_to_base64(pdf_path):
-    """Encode PDF file to base64."""
-    with open(pdf_path, "rb") as pdf_file:
-        return base64.standard_b64encode(pdf_file.read()).decode("utf-8")
+    """Encode PDF file to base64, keeping only pages with charges/totals."""
+    pdf_base64, page_selection = prepare_pdf_for_vision(pdf_path)
+    if page_selection:
+        print(f"    Page pruning: {selection_summary(page_selection)}")
+    return pdf_base64, page_selection
 
 
 def extract_invoice_data(client, pdf_path):
@@ -69,7 +103,7 @@ def extract_invoice_data(client, pdf_path):
     print(f"  Processing: {pdf_path.name}")
 
     # Encode PDF
-    pdf_base64 = encode_pdf_to_base64(pdf_path)
+    pdf_base64, page_selection = encode_pdf_to_base64(pdf_path)
 
     # Extraction prompt
     extraction_prompt = f"""You are analyzing a waste management invoice for {PROPERTY_NAME}.
@@ -103,74 +137,34 @@ VALIDATION:
 - If any CRITICAL field is missing, flag it with "MISSING: [field name]"
 - If dates are ambiguous, flag with "AMBIGUOUS: [field name]"
 
-Return the data as a JSON object with this structure:
-{{
-  "invoice_number": "INV-XXXXX",
-  "invoice_date": "2025-04-15",
-  "service_period_start": "2025-04-01",
-  "service_period_end": "2025-04-30",
-  "total_amount": 1234.56,
-  "property_name": "{PROPERTY_NAME}",
-  "service_provider": "Provider Name",
-  "account_number": "ACCT-XXXXX",
-  "due_date": "2025-05-15",
-  "previous_balance": 0.00,
-  "payments": 0.00,
-  "line_items": [
-    {{
-      "description": "Service description",
-      "quantity": 1,
-      "unit_price": 100.00,
-      "amount": 100.00,
-      "service_type": "Base Service"
-    }}
-  ],
-  "validation_flags": [],
-  "extraction_confidence": "high"
-}}
+Record the data with the {EXTRACTION_TOOL_NAME} tool; its input follows this structure:
+{json.dumps(TCAM_EXTRACTION_TEMPLATE, indent=2)}
 
 If you cannot extract a field with confidence, use null for that field and add a flag to validation_flags.
 Be precise with numbers - extract exact amounts without $ symbols or commas."""
 
     try:
         # Call Claude API
-        response = client.messages.create(
+        invoice_data, problems = request_structured(
+            client,
+            TCAM_SCHEMA,
             model=MODEL,
             max_tokens=MAX_TOKENS,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "document",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "application/pdf",
-                                "data": pdf_base64,
-                            },
-                        },
-                        {
-                            "type": "text",
-                            "text": extraction_prompt,
-                        },
-                    ],
-                }
-            ],
+            **document_request(pdf_base64, extraction_prompt)
         )
 
-        # Extract JSON from response
-        response_text = response.content[0].text
-
-        # Try to find JSON in response
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-        if json_match:
-            invoice_data = json.loads(json_match.group())
-            invoice_data['source_file'] = pdf_path.name
-            return invoice_data
-        else:
-            print(f"  ⚠️  No JSON found in response for {pdf_path.name}")
+        if invoice_data is None:
+            print(f"  ⚠️  No extraction returned for {pdf_path.name}")
             return None
 
+        # Schema problems are surfaced with the other validation flags
+        invoice_data.setdefault('validation_flags', [])
+        invoice_data['validation_flags'].extend(f"SCHEMA: {problem}" for problem in problems)
+        if page_selection:
+            invoice_data['page_selection'] = page_selection
+        invoice_data['source_file'] = pdf_path.name
+        return invoice_data
+
     except Exception as e:
         print(f"  ❌ Error extracting {pdf_path.name}: {str(e)}")
         return None
@@ -184,7 +178,7 @@ def extract_all_tcam_invoices():
 
     # Initialize API client
     api_key = get_api_key()
-    client = anthropic.Anthropic(api_key=api_key)
+    client = VisionClient(api_key=api_key)
 
     # Collect all invoice files (ONLY TCAM-named files)
     invoice_files = []
@@ -203,10 +197,16 @@ def extract_all_tcam_invoices():
     failed_files = []
     skipped_files = []
 
-    for i, pdf_path in enumerate(invoice_files, 1):
-        print(f"[{i}/{len(invoice_files)}]", end=" ")
+    results = run_extractions(
+        invoice_files,
+        lambda pdf_path: extract_invoice_data(client, pdf_path),
+        describe=lambda pdf_path: pdf_path.name,
+        status=lambda invoice_data: "extracted" if invoice_data else "failed",
+        label="TCAM extraction"
+    )
 
-        invoice_data = extract_invoice_data(client, pdf_path)
+    for i, (pdf_path, invoice_data) in enumerate(zip(invoice_files, results), 1):
+        print(f"[{i}/{len(invoice_files)}] {pdf_path.name}", end=" ")
 
         if invoice_data:
             # Check for property mismatch
@@ -237,6 +237,7 @@ def extract_all_tcam_invoices():
     print(f"  ✓ Successfully extracted: {len(extracted_data)} invoices")
     print(f"  ⚠️  Skipped (property mismatch): {len(skipped_files)} invoices")
     print(f"  ❌ Failed: {len(failed_files)} invoices")
+    print(f"  {client.summary()}")
 
     if skipped_files:
         print(f"\nSkipped files (wrong property):")
@@ -320,7 +321,7 @@ def create_tcam_dataframe(extracted_data):
 
 
 def update_excel_file(tcam_df):
-    """Update existing Excel file with TCAM data."""
+    """Write the TCAM tab (and a Portfolio Summary row) into a copy of the Excel file."""
     print(f"\n{'='*80}")
     print(f"UPDATING EXCEL FILE")
     print(f"{'='*80}\n")
@@ -331,53 +332,22 @@ def update_excel_file(tcam_df):
 
     print(f"Reading existing Excel file: {EXCEL_FILE.name}")
 
-    # Load existing workbook
-    wb = load_workbook(EXCEL_FILE)
-
-    # Check if TCAM sheet already exists
-    if PROPERTY_NAME in wb.sheetnames:
-        print(f"⚠️  Sheet '{PROPERTY_NAME}' already exists. Removing old version...")
-        wb.remove(wb[PROPERTY_NAME])
-
-    # Create new sheet for TCAM
-    ws = wb.create_sheet(PROPERTY_NAME)
-
-    # Write DataFrame to sheet
-    for r in dataframe_to_rows(tcam_df, index=False, header=True):
-        ws.append(r)
-
-    # Format header row
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
+    # One workbook session; the source file is left untouched
+    changes = WorkbookChanges(EXCEL_FILE, output_path=OUTPUT_FILE)
+    sheet_op = changes.replace_sheet(PROPERTY_NAME, tcam_df)
+    summary_op = changes.append_rows(
+        "Portfolio Summary",
+        [portfolio_summary_row(tcam_df)],
+        alignment=Alignment(horizontal="left", vertical="center")
+    )
 
-    for cell in ws[1]:
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-
-    # Auto-adjust column widths
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-
-    # Update Portfolio Summary sheet if it exists
-    if "Portfolio Summary" in wb.sheetnames:
-        print(f"Updating Portfolio Summary to include {PROPERTY_NAME}...")
-        update_portfolio_summary(wb, tcam_df)
-
-    # Save updated workbook
     print(f"Saving updated Excel file: {OUTPUT_FILE.name}")
-    wb.save(OUTPUT_FILE)
+    changes.commit()
+
+    if sheet_op.replaced:
+        print(f"⚠️  Sheet '{PROPERTY_NAME}' already existed - replaced with the new extraction")
+    if summary_op.result:
+        print(f"Updated Portfolio Summary to include {PROPERTY_NAME}")
 
     print(f"\n✓ Excel file updated successfully!")
     print(f"  - Added sheet: {PROPERTY_NAME}")
@@ -388,30 +358,20 @@ def update_excel_file(tcam_df):
     return True
 
 
-def update_portfolio_summary(wb, tcam_df):
-    """Update Portfolio Summary sheet with TCAM data."""
-    ws = wb["Portfolio Summary"]
-
+def portfolio_summary_row(tcam_df):
+    """Portfolio Summary row for TCAM."""
     # Calculate TCAM summary metrics
     total_invoices = tcam_df['Invoice Number'].nunique()
     total_amount = tcam_df.groupby('Invoice Number')['Total Amount'].first().sum()
     avg_invoice = total_amount / total_invoices if total_invoices > 0 else 0
 
-    # Find next empty row
-    next_row = ws.max_row + 1
-
-    # Add TCAM summary row
-    ws.append([
+    return [
         PROPERTY_NAME,
         total_invoices,
         f"${total_amount:,.2f}",
         f"${avg_invoice:,.2f}",
         "See property sheet for details"
-    ])
-
-    # Format the new row
-    for cell in ws[next_row]:
-        cell.alignment = Alignment(horizontal="left", vertical="center")
+    ]
 
 
 def main():
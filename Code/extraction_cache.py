@@ -0,0 +1,164 @@
+"""
+Content-Addressed Extraction Cache
+Persists vision extraction results keyed by PDF bytes + model + prompt/schema version
+
+A cache key is SHA-256(pdf sha256, model, prompt fingerprint). Re-running an
+extraction on an unchanged invoice with an unchanged prompt is a local file
+read instead of an API call. Editing the prompt, the extraction_schema, the
+tool schema it is sent as (structured_output, including LINE_ITEM_SCHEMA) or
+the per-document instructions (vision_client) changes the fingerprint, so old entries simply stop matching and are aged out
+by the eviction policy.
+
+Layout:
+    Extraction_Output/.extraction_cache/<key[:2]>/<key>.json
+
+Environment:
+    EXTRACTION_CACHE=off              Disable cache reads/writes
+    EXTRACTION_CACHE_DIR=<path>       Override cache location
+    EXTRACTION_CACHE_MAX_AGE_DAYS=180 Entries older than this are evicted
+    EXTRACTION_CACHE_MAX_SIZE_MB=500  Least recently used entries evicted above this
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from datetime import datetime
+
+from file_hashing import cached_sha256, sha256_text
+from structured_output import extraction_tool, schema_from_template
+from vision_client import DOCUMENT_INSTRUCTION, PACKED_DOCUMENTS_INSTRUCTION
+
+# Bump when the cache entry layout changes
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / "Extraction_Output" / ".extraction_cache"
+CACHE_DIR = Path(os.environ.get("EXTRACTION_CACHE_DIR", DEFAULT_CACHE_DIR))
+MAX_AGE_DAYS = float(os.environ.get("EXTRACTION_CACHE_MAX_AGE_DAYS", "180"))
+MAX_SIZE_MB = float(os.environ.get("EXTRACTION_CACHE_MAX_SIZE_MB", "500"))
+ENABLED = os.environ.get("EXTRACTION_CACHE", "on").lower() not in ("0", "off", "false", "no")
+
+
+def prompt_fingerprint(prompt, schema=None, pages=None):
+    """
+    Version hash of everything that shapes an extraction request
+
+    The prompt text, the extraction_schema template as the tool definition
+    actually sent (list item schemas included), the document instructions and
+    the page range for statement segments.
+    """
+    schema_text = ""
+    if schema is not None:
+        schema_text = json.dumps(extraction_tool(schema_from_template(schema)), sort_keys=True)
+    parts = [CACHE_FORMAT_VERSION, prompt, schema_text, DOCUMENT_INSTRUCTION, PACKED_DOCUMENTS_INSTRUCTION]
+    if pages is not None:
+        parts.append(",".join(str(page) for page in pages))
+    return sha256_text(*parts)
+
+
+class ExtractionCache:
+    """On-disk cache of extracted_data dicts with age and size eviction"""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_age_days=MAX_AGE_DAYS,
+                 max_size_mb=MAX_SIZE_MB, enabled=ENABLED):
+        self.cache_dir = Path(cache_dir)
+        self.max_age_seconds = max_age_days * 86400
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, pdf_path, model, prompt_version):
+        """Cache key for one (document, model, prompt) combination"""
+        return sha256_text(cached_sha256(pdf_path), model, prompt_version)
+
+    def _entry_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """Return cached extracted_data, or None on miss/expiry"""
+        if not self.enabled:
+            return None
+
+        entry_path = self._entry_path(key)
+        try:
+            age = time.time() - entry_path.stat().st_mtime
+            if age > self.max_age_seconds:
+                entry_path.unlink()
+                raise FileNotFoundError(entry_path)
+
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+
+            # Touch so size eviction treats this entry as recently used
+            os.utime(entry_path, None)
+        except (OSError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return entry["extracted_data"]
+
+    def put(self, key, extracted_data, **metadata):
+        """Store extracted_data under key (atomic write)"""
+        if not self.enabled or extracted_data is None:
+            return
+
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+
+        entry = {
+            "format_version": CACHE_FORMAT_VERSION,
+            "key": key,
+            "cached_at": datetime.now().isoformat(),
+            **metadata,
+            "extracted_data": extracted_data
+        }
+
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, entry_path)
+
+    def evict(self):
+        """Apply the age and size policy; returns number of entries removed"""
+        if not self.cache_dir.exists():
+            return 0
+
+        now = time.time()
+        removed = 0
+        entries = []
+
+        for entry_path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+
+            if now - stat.st_mtime > self.max_age_seconds:
+                entry_path.unlink(missing_ok=True)
+                removed += 1
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+        # Least recently used first
+        entries.sort()
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            entry_path.unlink(missing_ok=True)
+            total_size -= size
+            removed += 1
+
+        return removed
+
+    def summary(self):
+        """One-line hit/miss summary for run output"""
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0
+        return f"Cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)"
@@ -0,0 +1,120 @@
+"""
+Extraction Checkpoint Journal
+Append-only JSONL record of every finished extraction + validation
+
+Each line is written and flushed as soon as a document finishes, so a run
+that dies at invoice 700 of 900 keeps the 700 results. Re-running with
+--resume skips documents already journaled successfully and the final
+Excel/Markdown/JSON outputs are rebuilt from the journal. A torn final line
+left by a crash mid-write is cut off before the first append, so it cannot
+swallow the next record.
+
+Line format:
+    {"source_path": "...", "source_file": "...", "completed_at": "...",
+     "extraction": {...} | null, "validation": {...}, "error": null | "..."}
+"""
+
+import os
+import json
+import threading
+from pathlib import Path
+from datetime import datetime
+
+JOURNAL_PREFIX = "Extraction_Journal_"
+
+# Read size when looking back for the end of the last complete record
+TAIL_CHUNK_BYTES = 64 * 1024
+
+
+def new_journal_path(output_folder):
+    """Timestamped journal path for a fresh run"""
+    return Path(output_folder) / f"{JOURNAL_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+
+
+def latest_journal_path(output_folder):
+    """Most recent journal in output_folder, or None"""
+    journals = sorted(Path(output_folder).glob(f"{JOURNAL_PREFIX}*.jsonl"))
+    return journals[-1] if journals else None
+
+
+class ExtractionJournal:
+    """Append-only checkpoint journal for one extraction run"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._repaired = False
+
+    def records(self):
+        """All journaled records keyed by source_path (latest entry wins)"""
+        records = {}
+        if not self.path.exists():
+            return records
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn final line from a crash mid-write
+                    continue
+                records[record["source_path"]] = record
+
+        return records
+
+    def completed_paths(self):
+        """Source paths that finished with a usable extraction"""
+        return {
+            source_path
+            for source_path, record in self.records().items()
+            if record.get("extraction") is not None
+        }
+
+    def append(self, source_path, extraction, validation, error=None):
+        """Durably record one finished document"""
+        record = {
+            "source_path": str(source_path),
+            "source_file": Path(source_path).name,
+            "completed_at": datetime.now().isoformat(),
+            "extraction": extraction,
+            "validation": validation,
+            "error": error
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if not self._repaired:
+                self._truncate_torn_line()
+                self._repaired = True
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _truncate_torn_line(self):
+        """Cut the file back to its last newline when a crash left a partial record"""
+        try:
+            f = open(self.path, "r+b")
+        except FileNotFoundError:
+            return
+        with f:
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(0, position - TAIL_CHUNK_BYTES)
+                f.seek(start)
+                chunk = f.read(position - start)
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position < end:
+                print(f"   WARNING: {self.path.name}: dropping {end - position} bytes of a torn final record")
+                f.truncate(position)
+                f.flush()
+                os.fsync(f.fileno())
@@ -0,0 +1,272 @@
+"""
+Extraction Call Metrics
+Per-invoice tokens, latency, retries and cost in a run metrics file, rolled up per vendor/property
+
+extract_invoice_with_vision used to throw away the response usage and
+timing, so nobody could say which vendors or properties dominate extraction
+time and cost. Every processed invoice now appends one JSONL record (file,
+pages and bytes sent, input/output/cached tokens, API latency, retries,
+tier) next to the run's other outputs, and generate_metrics_report() writes
+the per-vendor / per-property roll-up with p50/p95 latency as Markdown,
+alongside the validation report.
+
+Line format:
+    {"source_file", "source_path", "pages", "pages_sent", "bytes_sent",
+     "tier", "vendor", "property", "calls", "retries", "throttled",
+     "input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens",
+     "output_tokens", "api_seconds", "total_seconds", "cost_usd", "error"}
+
+USAGE:
+    from extraction_metrics import ExtractionMetrics, new_metrics_path
+
+    metrics = ExtractionMetrics(new_metrics_path(OUTPUT_FOLDER), model=MODEL)
+    with client.track_calls() as calls:
+        extraction, error = extract(...)
+    metrics.record(pdf_path, extraction, error, calls, elapsed)
+"""
+
+import json
+import math
+import threading
+from pathlib import Path
+from datetime import datetime
+
+from pdf_text import get_pdf_text
+from vision_client import USAGE_FIELDS
+
+METRICS_PREFIX = "Extraction_Metrics_"
+
+# USD per million tokens: (input, output). Cache writes bill at 1.25x input, cache reads at 0.1x
+MODEL_PRICING = {
+    "claude-sonnet-4-20250514": (3.00, 15.00),
+    "claude-3-5-sonnet-20241022": (3.00, 15.00),
+}
+DEFAULT_PRICING = (3.00, 15.00)
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.10
+# Message Batches (bulk_extraction) bill at half price
+BATCH_PRICE_MULTIPLIER = 0.50
+
+
+def new_metrics_path(output_folder):
+    """Timestamped metrics file for a run"""
+    return Path(output_folder) / f"{METRICS_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+
+
+def call_cost(tokens, model=None):
+    """USD cost of a token tally (dict with USAGE_FIELDS)"""
+    input_price, output_price = MODEL_PRICING.get(model, DEFAULT_PRICING)
+    cost = (
+        tokens.get("input_tokens", 0) * input_price
+        + tokens.get("cache_creation_input_tokens", 0) * input_price * CACHE_WRITE_MULTIPLIER
+        + tokens.get("cache_read_input_tokens", 0) * input_price * CACHE_READ_MULTIPLIER
+        + tokens.get("output_tokens", 0) * output_price
+    )
+    return cost / 1_000_000
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile (pct 0-100) of a list of numbers, None if empty"""
+    values = sorted(values)
+    if not values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def share_calls(calls, count):
+    """Per-document share of calls made for a packed request of count documents"""
+    shared = []
+    for call in calls:
+        share = dict(call, shared_by=count)
+        for field in USAGE_FIELDS + ("document_bytes", "latency_seconds"):
+            share[field] = call.get(field, 0) / count
+        shared.append(share)
+    return shared
+
+
+def _tier_used(extraction, calls):
+    if extraction is None:
+        return "failed"
+    tier = extraction.get("extraction_tier") or "vision"
+    # Vision tier without an API call came out of the extraction cache
+    if tier == "vision" and not calls:
+        return "cache"
+    return tier
+
+
+class ExtractionMetrics:
+    """Append-only per-invoice metrics file for one extraction run"""
+
+    def __init__(self, path, model=None):
+        self.path = Path(path)
+        self.model = model
+        self._lock = threading.Lock()
+
+    def record(self, source_path, extraction=None, error=None, calls=(), total_seconds=0.0, pages=None,
+               batch=False):
+        """
+        Write one invoice's record
+
+        Args:
+            source_path: PDF that was processed
+            extraction: extracted_data (None when extraction failed)
+            error: Error message, if any
+            calls: Call records from VisionClient.track_calls()
+            total_seconds: Wall time for the whole invoice (text tier included)
+            pages: 1-based pages of a statement segment (None for a whole PDF)
+            batch: Result came from a message batch (tier "batch", batch pricing)
+
+        Returns:
+            The record dict
+        """
+        extraction = extraction or {}
+        page_selection = extraction.get("page_selection") or {}
+        tokens = {field: sum(call.get(field, 0) for call in calls) for field in USAGE_FIELDS}
+
+        if not calls:
+            pages_sent = 0
+        elif page_selection:
+            pages_sent = len(page_selection.get("kept_pages", []))
+        elif pages:
+            pages_sent = len(pages)
+        else:
+            # Whole PDF sent; the page count comes from the cached text layer
+            pages_sent = get_pdf_text(source_path).total_pages
+
+        record = {
+            "recorded_at": datetime.now().isoformat(),
+            "source_file": Path(source_path).name,
+            "source_path": str(source_path),
+            "pages": pages,
+            "pages_sent": pages_sent,
+            "bytes_sent": sum(call.get("document_bytes", 0) for call in calls),
+            "tier": "batch" if batch else _tier_used(extraction or None, calls),
+            "vendor": extraction.get("vendor_name"),
+            "property": extraction.get("property_name"),
+            "calls": round(sum(1 / call.get("shared_by", 1) for call in calls), 3),
+            "retries": sum(call.get("retries", 0) for call in calls),
+            "throttled": sum(call.get("throttled", 0) for call in calls),
+            **tokens,
+            "api_seconds": round(sum(call.get("latency_seconds", 0.0) for call in calls), 3),
+            "total_seconds": round(total_seconds, 3),
+            "cost_usd": round(call_cost(tokens, self.model) * (BATCH_PRICE_MULTIPLIER if batch else 1.0), 6),
+            "error": error
+        }
+
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        return record
+
+    def records(self):
+        """All records written so far"""
+        if not self.path.exists():
+            return []
+        records = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        return records
+
+
+def _rollup(records):
+    latencies = [record["total_seconds"] for record in records]
+    return {
+        "invoices": len(records),
+        "calls": round(sum(record["calls"] for record in records), 2),
+        "batched": round(sum(record["calls"] for record in records if record["tier"] == "batch"), 2),
+        "retries": sum(record["retries"] for record in records),
+        "input_tokens": sum(record["input_tokens"] + record["cache_read_input_tokens"]
+                            + record["cache_creation_input_tokens"] for record in records),
+        "cache_read_input_tokens": sum(record["cache_read_input_tokens"] for record in records),
+        "output_tokens": sum(record["output_tokens"] for record in records),
+        "cost_usd": sum(record["cost_usd"] for record in records),
+        "seconds": sum(latencies),
+        "p50_seconds": percentile(latencies, 50),
+        "p95_seconds": percentile(latencies, 95)
+    }
+
+
+def summarize(records, by="vendor"):
+    """Roll-up per vendor or property, most expensive first"""
+    groups = {}
+    for record in records:
+        groups.setdefault(record.get(by) or "Unknown", []).append(record)
+    rollups = {name: _rollup(group) for name, group in groups.items()}
+    return dict(sorted(rollups.items(), key=lambda item: (-item[1]["cost_usd"], -item[1]["seconds"])))
+
+
+def metrics_summary(records):
+    """One-line run total for console output"""
+    if not records:
+        return "Metrics: no invoices recorded"
+    total = _rollup(records)
+    return (f"Metrics: {total['invoices']} invoices, {_calls_text(total)}, "
+            f"${total['cost_usd']:.2f}, latency p50 {total['p50_seconds']:.1f}s / p95 {total['p95_seconds']:.1f}s")
+
+
+def _calls_text(rollup):
+    """'15 API calls (15 batched)' - batch requests are calls, as in VisionClient.summary()"""
+    text = f"{rollup['calls']:g} API calls"
+    return text + (f" ({rollup['batched']:g} batched)" if rollup["batched"] else "")
+
+
+def _table(title, rollups):
+    lines = [
+        f"\n## {title}\n",
+        "| Name | Invoices | Calls | Retries | Input Tokens | Cached | Output Tokens | Cost | p50 | p95 |",
+        "|---|---:|---:|---:|---:|---:|---:|---:|---:|---:|"
+    ]
+    for name, rollup in rollups.items():
+        cached_pct = (rollup["cache_read_input_tokens"] / rollup["input_tokens"] * 100) if rollup["input_tokens"] else 0
+        lines.append(
+            f"| {name} | {rollup['invoices']} | {rollup['calls']} | {rollup['retries']} | "
+            f"{rollup['input_tokens']:,} | {cached_pct:.0f}% | {rollup['output_tokens']:,} | "
+            f"${rollup['cost_usd']:.2f} | {rollup['p50_seconds']:.1f}s | {rollup['p95_seconds']:.1f}s |"
+        )
+    return lines
+
+
+def generate_metrics_report(records, output_path, slowest=10):
+    """Markdown roll-up of a run's metrics: totals, per tier, per vendor, per property, slowest invoices"""
+
+    report = []
+    report.append("# EXTRACTION METRICS REPORT")
+    report.append(f"\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    report.append("\n## SUMMARY\n")
+
+    total = _rollup(records) if records else None
+    if total is None:
+        report.append("No invoices recorded.")
+    else:
+        report.append(f"- **Invoices**: {total['invoices']}")
+        report.append(f"- **API Calls**: {_calls_text(total)}, {total['retries']} retries")
+        report.append(f"- **Input Tokens**: {total['input_tokens']:,} "
+                      f"({total['cache_read_input_tokens']:,} read from cache)")
+        report.append(f"- **Output Tokens**: {total['output_tokens']:,}")
+        report.append(f"- **Estimated Cost**: ${total['cost_usd']:.2f}")
+        report.append(f"- **Latency per Invoice**: p50 {total['p50_seconds']:.1f}s, p95 {total['p95_seconds']:.1f}s")
+
+        report.extend(_table("BY TIER", summarize(records, by="tier")))
+        report.extend(_table("BY VENDOR", summarize(records, by="vendor")))
+        report.extend(_table("BY PROPERTY", summarize(records, by="property")))
+
+        report.append("\n## SLOWEST INVOICES\n")
+        for record in sorted(records, key=lambda record: -record["total_seconds"])[:slowest]:
+            pages = f" pages {record['pages'][0]}-{record['pages'][-1]}" if record.get("pages") else ""
+            report.append(f"- **{record['source_file']}**{pages}: {record['total_seconds']:.1f}s, "
+                          f"{record['calls']} calls, {record['retries']} retries, ${record['cost_usd']:.3f} "
+                          f"({record['vendor'] or 'Unknown vendor'})")
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(report))
+
+    print(f"   OK: Metrics report: {output_path}")
@@ -0,0 +1,285 @@
+"""
+Fake Vision API Server (local development)
+Minimal stand-in for the /v1/messages endpoint that injects throttling
+
+Used to exercise vision_client.VisionClient retry, Retry-After and adaptive
+concurrency behaviour without network access or an API key. Also stands in
+for the Message Batches endpoints (create / retrieve / results) used by
+bulk_extraction: a batch's requests finish one by one over --batch-seconds,
+and --overload-rate of them come back errored (the batch endpoints themselves
+answer 529 at the same rate).
+
+USAGE:
+    python Code/fake_vision_server.py --port 8765 --throttle-rate 0.2 --max-in-flight 4
+
+    # in another shell
+    export ANTHROPIC_BASE_URL=http://127.0.0.1:8765
+    export ANTHROPIC_API_KEY=fake
+    python Code/batch_extract_all_invoices.py
+"""
+
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Canned extraction returned for every successful call
+CANNED_EXTRACTION = {
+    "source_file": "",
+    "document_type": "invoice",
+    "property_name": "Fake Property",
+    "property_address": None,
+    "vendor_name": "Fake Waste Services",
+    "vendor_account_number": "000-000",
+    "billing_period": {"start_date": "2025-01-01", "end_date": "2025-01-31", "raw": None},
+    "invoice": {
+        "invoice_number": "FAKE-0001",
+        "invoice_date": "2025-01-31",
+        "due_date": "2025-02-28",
+        "amount_due": "100.00",
+        "subtotal": "100.00",
+        "line_items": [
+            {"date": "2025-01-31", "description": "Fake base service", "category": "base",
+             "quantity": 1, "uom": "month", "container_size_yd": 8, "container_type": "FEL",
+             "frequency_per_week": 3, "unit_rate": "100.00", "extended_amount": "100.00", "notes": None}
+        ]
+    }
+}
+
+
+def canned_tool_input(request):
+    """CANNED_EXTRACTION, or one copy per labelled document for packed requests"""
+    tool = (request.get("tools") or [{}])[0]
+    if "documents" not in tool.get("input_schema", {}).get("properties", {}):
+        return CANNED_EXTRACTION
+
+    labels = []
+    for message in request.get("messages", []):
+        for block in message.get("content", []) if isinstance(message.get("content"), list) else []:
+            text = block.get("text", "") if block.get("type") == "text" else ""
+            if text.startswith("Document source_file: "):
+                labels.append(text[len("Document source_file: "):])
+    return {"documents": [dict(CANNED_EXTRACTION, source_file=label) for label in labels]}
+
+
+class FakeVisionState:
+    """Shared counters/settings for the request handler threads"""
+
+    def __init__(self, throttle_rate, overload_rate, max_in_flight, retry_after, latency, batch_seconds=5.0):
+        self.throttle_rate = throttle_rate
+        self.overload_rate = overload_rate
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.latency = latency
+        self.in_flight = 0
+        self.counts = {"ok": 0, "429": 0, "529": 0}
+        self.cached_prefixes = set()
+        self.batch_seconds = batch_seconds
+        self.batches = {}
+        self.lock = threading.Lock()
+
+    def usage_for(self, request):
+        """Fake usage: a cache_control system prefix is written once, then read"""
+        system = request.get("system")
+        if not isinstance(system, list) or not any("cache_control" in block for block in system):
+            return {"input_tokens": 1500, "output_tokens": 400}
+
+        prefix = json.dumps([request.get("model"), system], sort_keys=True)
+        prefix_tokens = len(prefix) // 4
+        with self.lock:
+            seen = prefix in self.cached_prefixes
+            self.cached_prefixes.add(prefix)
+        return {
+            "input_tokens": 1500,
+            "cache_creation_input_tokens": 0 if seen else prefix_tokens,
+            "cache_read_input_tokens": prefix_tokens if seen else 0,
+            "output_tokens": 400
+        }
+
+
+def fake_message(state, request):
+    """Successful /v1/messages response body for a request"""
+    # Forced tool call (structured_output) -> answer as tool input
+    tool_choice = request.get("tool_choice") or {}
+    if tool_choice.get("type") == "tool":
+        content = [{"type": "tool_use", "id": "toolu_fake", "name": tool_choice["name"],
+                    "input": canned_tool_input(request)}]
+        stop_reason = "tool_use"
+    else:
+        content = [{"type": "text", "text": json.dumps(CANNED_EXTRACTION)}]
+        stop_reason = "end_turn"
+
+    return {
+        "id": "msg_fake",
+        "type": "message",
+        "role": "assistant",
+        "model": request.get("model", "fake"),
+        "content": content,
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": state.usage_for(request)
+    }
+
+
+def _timestamp(seconds):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(seconds))
+
+
+def create_batch(state, body):
+    """Accept a Message Batches create call; each request finishes at its own time"""
+    batch_id = f"msgbatch_fake_{uuid.uuid4().hex[:12]}"
+    created = time.time()
+    requests = body.get("requests", [])
+
+    entries = []
+    for position, entry in enumerate(requests):
+        if random.random() < state.overload_rate:
+            result = {"type": "errored",
+                      "error": {"type": "error", "error": {"type": "overloaded_error", "message": "Fake batch: overloaded"}}}
+        else:
+            result = {"type": "succeeded", "message": fake_message(state, entry["params"])}
+        entries.append({
+            "custom_id": entry["custom_id"],
+            "done_at": created + state.batch_seconds * (position + 1) / max(1, len(requests)),
+            "result": result
+        })
+
+    with state.lock:
+        state.batches[batch_id] = {"created": created, "entries": entries}
+    return batch_id
+
+
+def batch_body(state, batch_id, base_url):
+    """MessageBatch object as returned by create / retrieve"""
+    with state.lock:
+        batch = state.batches[batch_id]
+    now = time.time()
+    done = [entry for entry in batch["entries"] if entry["done_at"] <= now]
+    ended = len(done) == len(batch["entries"])
+    return {
+        "id": batch_id,
+        "type": "message_batch",
+        "processing_status": "ended" if ended else "in_progress",
+        "request_counts": {
+            "processing": len(batch["entries"]) - len(done),
+            "succeeded": sum(1 for entry in done if entry["result"]["type"] == "succeeded"),
+            "errored": sum(1 for entry in done if entry["result"]["type"] == "errored"),
+            "canceled": 0,
+            "expired": 0
+        },
+        "created_at": _timestamp(batch["created"]),
+        "expires_at": _timestamp(batch["created"] + 86400),
+        "ended_at": _timestamp(now) if ended else None,
+        "archived_at": None,
+        "cancel_initiated_at": None,
+        "results_url": f"{base_url}/v1/messages/batches/{batch_id}/results" if ended else None
+    }
+
+
+def make_handler(state):
+    class FakeVisionHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body, headers=None):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _error(self, status, error_type, message):
+            with state.lock:
+                state.counts[str(status)] += 1
+            self._send_json(status, {"type": "error", "error": {"type": error_type, "message": message}},
+                            {"retry-after": str(state.retry_after)} if status == 429 else None)
+
+        def _base_url(self):
+            return f"http://{self.headers.get('Host', '127.0.0.1')}"
+
+        def do_GET(self):
+            parts = self.path.split("?")[0].strip("/").split("/")
+            # v1/messages/batches/<id>[/results]
+            if parts[:3] != ["v1", "messages", "batches"] or len(parts) < 4 or parts[3] not in state.batches:
+                return self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+            batch_id = parts[3]
+            if random.random() < state.overload_rate:
+                return self._error(529, "overloaded_error", "Fake server: overloaded")
+            if len(parts) == 4:
+                return self._send_json(200, batch_body(state, batch_id, self._base_url()))
+
+            lines = [json.dumps({"custom_id": entry["custom_id"], "result": entry["result"]})
+                     for entry in state.batches[batch_id]["entries"]]
+            payload = ("\n".join(lines) + "\n").encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/binary")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            if self.path.split("?")[0].rstrip("/").endswith("/messages/batches"):
+                if random.random() < state.overload_rate:
+                    return self._error(529, "overloaded_error", "Fake server: overloaded")
+                batch_id = create_batch(state, request)
+                return self._send_json(200, batch_body(state, batch_id, self._base_url()))
+
+            with state.lock:
+                state.in_flight += 1
+                too_many = state.max_in_flight and state.in_flight > state.max_in_flight
+
+            try:
+                if too_many or random.random() < state.throttle_rate:
+                    return self._error(429, "rate_limit_error", "Fake server: rate limited")
+                if random.random() < state.overload_rate:
+                    return self._error(529, "overloaded_error", "Fake server: overloaded")
+
+                time.sleep(state.latency)
+                with state.lock:
+                    state.counts["ok"] += 1
+
+                self._send_json(200, fake_message(state, request))
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+    return FakeVisionHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake vision API server with injected throttling")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--throttle-rate", type=float, default=0.2, help="Fraction of calls answered 429")
+    parser.add_argument("--overload-rate", type=float, default=0.05, help="Fraction of calls answered 529")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="429 when more calls than this are open (0 = off)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per successful call")
+    parser.add_argument("--batch-seconds", type=float, default=5.0, help="Seconds for a message batch to finish")
+    args = parser.parse_args()
+
+    state = FakeVisionState(args.throttle_rate, args.overload_rate, args.max_in_flight,
+                            args.retry_after, args.latency, args.batch_seconds)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+
+    print(f"Fake vision server on http://{args.host}:{args.port} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"\nResponses: {state.counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+"""
+Incremental File Catalog
+Persistent SQLite index of the document tree, refreshed by comparing size + mtime
+
+Every scan script used to os.walk / rglob the whole share and stat every
+file. The catalog keeps one row per file (path, size, mtime, sha256,
+classification, property). A refresh walks the tree with os.scandir, compares
+each entry against its stored size/mtime, and only writes rows that were
+added, changed or removed. Hashes are computed only for new or changed files,
+and only when asked for.
+
+Layout:
+    Extraction_Output/.file_catalog.sqlite
+
+Environment:
+    FILE_CATALOG_PATH=<path>   Override database location
+
+USAGE:
+    from file_catalog import scan_files
+
+    pdfs = scan_files("Properties", ext=".pdf")
+    invoices = scan_files("..", classification="invoice", hashed=True)
+
+    catalog = open_catalog()
+    catalog.refresh(root)
+    catalog.files(root, ext=".xlsx", pattern="*BACKUP*", recursive=False)
+
+scan_files(root, recursive=False) refreshes only the files directly in root,
+so listing a top-level folder does not walk the tree below it.
+"""
+
+import os
+import re
+import json
+import time
+import fnmatch
+import sqlite3
+import threading
+from pathlib import Path
+
+from file_dedup import hash_files
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+BASE_PREFIX = str(BASE_DIR) + os.sep
+DEFAULT_CATALOG_PATH = BASE_DIR / "Extraction_Output" / ".file_catalog.sqlite"
+CATALOG_PATH = Path(os.environ.get("FILE_CATALOG_PATH", DEFAULT_CATALOG_PATH))
+
+PROPERTY_CONFIG_FILE = Path(__file__).resolve().parent / "property_config.json"
+
+# Directories never worth cataloging (caches, VCS, bytecode)
+SKIP_DIR_NAMES = {"__pycache__", "node_modules", "venv", ".venv"}
+
+# Path-based classification rules (folder + filename keywords)
+INVOICE_KEYWORDS = [
+    "invoice", "statement", "bill", "trash bills",
+    "republic services", "frontier waste", "community waste",
+    "city of mckinney", "tcam"
+]
+
+CONTRACT_KEYWORDS = [
+    "agreement", "contract", "bulk agreement"
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT,
+    classification TEXT,
+    property TEXT,
+    scanned_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_sha256 ON files(sha256);
+CREATE INDEX IF NOT EXISTS idx_files_ext ON files(ext);
+CREATE INDEX IF NOT EXISTS idx_files_classification ON files(classification);
+CREATE INDEX IF NOT EXISTS idx_files_property ON files(property);
+
+CREATE TABLE IF NOT EXISTS content_classes (
+    sha256 TEXT NOT NULL,
+    classifier_version TEXT NOT NULL,
+    classification TEXT NOT NULL,
+    confidence REAL,
+    details TEXT,
+    classified_at REAL NOT NULL,
+    PRIMARY KEY (sha256, classifier_version)
+);
+"""
+
+
+def classify_path(relative_path):
+    """Classify a PDF by folder and filename: "invoice", "contract" or "unknown\""""
+    rel_path = Path(relative_path)
+    file_lower = rel_path.name.lower()
+    folder_lower = str(rel_path.parent).lower()
+
+    is_invoice = False
+    is_contract = False
+
+    # Check folder structure
+    if "trash bills" in folder_lower or folder_lower == "invoices":
+        is_invoice = True
+    elif "contracts" in folder_lower:
+        is_contract = True
+
+    # Check filename
+    if any(kw in file_lower for kw in INVOICE_KEYWORDS):
+        is_invoice = True
+    if any(kw in file_lower for kw in CONTRACT_KEYWORDS):
+        is_contract = True
+
+    # Invoice takes precedence
+    if is_invoice:
+        return "invoice"
+    if is_contract:
+        return "contract"
+    return "unknown"
+
+
+def _squash(text):
+    return re.sub(r"[\s_\-]+", "", text.lower())
+
+
+def _load_property_folders():
+    """Squashed folder name -> property name, longest name first"""
+    try:
+        with open(PROPERTY_CONFIG_FILE, "r", encoding="utf-8") as f:
+            names = list(json.load(f)["properties"].keys())
+    except (OSError, KeyError, json.JSONDecodeError):
+        names = []
+    return [(_squash(name), name) for name in sorted(names, key=len, reverse=True)]
+
+
+PROPERTY_FOLDERS = _load_property_folders()
+
+
+def property_for_path(path):
+    """Property whose folder name appears in the path (e.g. Properties/Bella_Mirage/...)"""
+    for part in reversed(Path(path).parts[:-1]):
+        squashed = _squash(part)
+        for folder_key, name in PROPERTY_FOLDERS:
+            if squashed == folder_key:
+                return name
+    return None
+
+
+def _prefix_range(prefix):
+    """[low, high) bounds selecting every path under a directory prefix"""
+    low = prefix.rstrip(os.sep) + os.sep
+    high = low[:-1] + chr(ord(os.sep) + 1)
+    return low, high
+
+
+class FileCatalog:
+    """SQLite-backed file index with incremental refresh and a small query API"""
+
+    def __init__(self, db_path=CATALOG_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._refreshed = set()
+        # Directories refreshed with recursive=False (their files only)
+        self._refreshed_flat = set()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # -- refresh -----------------------------------------------------------
+
+    def _walk(self, root, recursive=True):
+        """Yield (path, name, size, mtime_ns) for every file under root (directly in it when not recursive)"""
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if recursive and not entry.name.startswith(".") and entry.name not in SKIP_DIR_NAMES:
+                                    stack.append(entry.path)
+                            elif entry.is_file():
+                                stat = entry.stat()
+                                yield entry.path, entry.name, stat.st_size, stat.st_mtime_ns
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def refresh(self, root, hashed=False, force=False, recursive=True, ext=None):
+        """
+        Bring the catalog in line with the tree under root
+
+        Args:
+            root: Directory to reconcile (other roots in the catalog are untouched)
+            hashed: Also fill sha256 for any file under root that lacks one
+            force: Re-walk even if this root (or a parent) was already
+                refreshed in this process
+            recursive: False reconciles only the files directly in root, so
+                listing a top-level folder does not walk everything below it
+            ext: With hashed, hash only files with this extension (e.g. ".pdf")
+
+        Returns:
+            Dict of added/changed/removed/unchanged/hashed counts and seconds
+        """
+        root = os.path.abspath(root)
+        started = time.perf_counter()
+        stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0, "hashed": 0}
+
+        with self._lock:
+            # A refresh of a parent directory already covered this root
+            covered = any(root == done or root.startswith(done.rstrip(os.sep) + os.sep) for done in self._refreshed)
+            if not recursive:
+                covered = covered or root in self._refreshed_flat
+            if covered and not force:
+                if hashed:
+                    stats["hashed"] = self._fill_hashes(root, ext=ext and ext.lower(), recursive=recursive)
+                stats["seconds"] = time.perf_counter() - started
+                return stats
+
+            low, high = _prefix_range(root)
+            known = {
+                row[0]: (row[1], row[2])
+                for row in self._conn.execute(
+                    "SELECT path, size, mtime_ns FROM files WHERE path >= ? AND path < ?", (low, high)
+                )
+            }
+            if not recursive:
+                # Rows in subdirectories were not walked - leave them alone
+                known = {path: row for path, row in known.items() if os.path.dirname(path) == root}
+
+            now = time.time()
+            upserts = []
+            for path, name, size, mtime_ns in self._walk(root, recursive):
+                previous = known.pop(path, None)
+                if previous == (size, mtime_ns):
+                    stats["unchanged"] += 1
+                    continue
+
+                stats["changed" if previous else "added"] += 1
+                ext = os.path.splitext(name)[1].lower()
+                # Classify relative to the project root so the answer does not
+                # depend on which directory a caller happened to refresh
+                base = BASE_PREFIX if path.startswith(BASE_PREFIX) else root
+                relative_path = os.path.relpath(path, base)
+                classification = classify_path(relative_path) if ext == ".pdf" else None
+                upserts.append((
+                    path, name, ext, size, mtime_ns, classification, property_for_path(path), now
+                ))
+
+            with self._conn:
+                # Content changed, so any stored hash is stale (sha256 reset to NULL)
+                self._conn.executemany(
+                    """INSERT INTO files (path, name, ext, size, mtime_ns, sha256, classification, property, scanned_at)
+                       VALUES (?, ?, ?, ?, ?, NULL, ?, ?, ?)
+                       ON CONFLICT(path) DO UPDATE SET
+                           size = excluded.size, mtime_ns = excluded.mtime_ns, sha256 = NULL,
+                           classification = excluded.classification, property = excluded.property,
+                           scanned_at = excluded.scanned_at""",
+                    upserts
+                )
+                self._conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in known])
+            stats["removed"] = len(known)
+
+            (self._refreshed if recursive else self._refreshed_flat).add(root)
+            if hashed:
+                stats["hashed"] = self._fill_hashes(root, ext=ext and ext.lower(), recursive=recursive)
+
+        stats["seconds"] = time.perf_counter() - started
+        return stats
+
+    def _fill_hashes(self, root, ext=None, recursive=True):
+        low, high = _prefix_range(root)
+        query = "SELECT path FROM files WHERE sha256 IS NULL AND path >= ? AND path < ?"
+        params = [low, high]
+        if ext:
+            query += " AND ext = ?"
+            params.append(ext)
+        missing = [row[0] for row in self._conn.execute(query, params)]
+        if not recursive:
+            missing = [path for path in missing if os.path.dirname(path) == root]
+        if not missing:
+            return 0
+
+        hashes = hash_files(missing)
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE files SET sha256 = ? WHERE path = ?",
+                [(digest, path) for path, digest in hashes.items() if digest]
+            )
+        return len(missing)
+
+    # -- queries -----------------------------------------------------------
+
+    def files(self, root, ext=None, pattern=None, classification=None, property_name=None,
+              recursive=True, order_by="path"):
+        """
+        Catalog rows under root as dicts
+
+        Args:
+            root: Directory to query (call refresh(root) first, or use scan_files)
+            ext: Extension filter, e.g. ".pdf" (case-insensitive)
+            pattern: fnmatch pattern on the filename, e.g. "*BACKUP*" (case-insensitive)
+            classification: "invoice", "contract" or "unknown"
+            property_name: Property name as in property_config.json
+            recursive: False limits results to files directly in root
+            order_by: "path", "mtime" (newest first) or "name"
+
+        Returns:
+            List of dicts: path, relative_path, name, ext, size, mtime, sha256,
+            classification, property
+        """
+        root = os.path.abspath(root)
+        low, high = _prefix_range(root)
+        query = "SELECT * FROM files WHERE path >= ? AND path < ?"
+        params = [low, high]
+
+        if ext:
+            query += " AND ext = ?"
+            params.append(ext.lower())
+        if classification:
+            query += " AND classification = ?"
+            params.append(classification)
+        if property_name:
+            query += " AND property = ?"
+            params.append(property_name)
+
+        query += {
+            "path": " ORDER BY path",
+            "mtime": " ORDER BY mtime_ns DESC",
+            "name": " ORDER BY name"
+        }[order_by]
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        results = []
+        for row in rows:
+            relative_path = os.path.relpath(row["path"], root)
+            if not recursive and os.sep in relative_path:
+                continue
+            if pattern and not fnmatch.fnmatch(row["name"].lower(), pattern.lower()):
+                continue
+            results.append({
+                "path": row["path"],
+                "relative_path": relative_path,
+                "name": row["name"],
+                "ext": row["ext"],
+                "size": row["size"],
+                "mtime": row["mtime_ns"] / 1e9,
+                "sha256": row["sha256"],
+                "classification": row["classification"],
+                "property": row["property"]
+            })
+        return results
+
+    # -- content classification cache ---------------------------------------
+
+    def get_content_classes(self, digests, classifier_version):
+        """Cached content classifications: sha256 -> {classification, confidence, details}"""
+        digests = [digest for digest in set(digests) if digest]
+        results = {}
+        with self._lock:
+            # Chunk to stay under SQLite's bound-parameter limit
+            for start in range(0, len(digests), 500):
+                chunk = digests[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for row in self._conn.execute(
+                    f"""SELECT sha256, classification, confidence, details FROM content_classes
+                        WHERE classifier_version = ? AND sha256 IN ({placeholders})""",
+                    [classifier_version] + chunk
+                ):
+                    results[row["sha256"]] = {
+                        "classification": row["classification"],
+                        "confidence": row["confidence"],
+                        "details": json.loads(row["details"]) if row["details"] else {}
+                    }
+        return results
+
+    def put_content_classes(self, classifications, classifier_version):
+        """Store sha256 -> {classification, confidence, details} results"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """INSERT OR REPLACE INTO content_classes
+                   (sha256, classifier_version, classification, confidence, details, classified_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                [
+                    (digest, classifier_version, result["classification"], result.get("confidence"),
+                     json.dumps(result.get("details") or {}), now)
+                    for digest, result in classifications.items() if digest
+                ]
+            )
+
+    def duplicates(self, root, ext=None):
+        """Groups of paths under root that share a sha256 (refresh with hashed=True first)"""
+        groups = {}
+        for row in self.files(root, ext=ext):
+            if row["sha256"]:
+                groups.setdefault(row["sha256"], []).append(row["path"])
+        return {digest: paths for digest, paths in groups.items() if len(paths) > 1}
+
+
+_default_catalog = None
+_default_lock = threading.Lock()
+
+
+def open_catalog():
+    """Process-wide shared FileCatalog"""
+    global _default_catalog
+    with _default_lock:
+        if _default_catalog is None:
+            _default_catalog = FileCatalog()
+        return _default_catalog
+
+
+def scan_files(root, hashed=False, **filters):
+    """Refresh root (once per process) and return matching catalog rows"""
+    catalog = open_catalog()
+    catalog.refresh(root, hashed=hashed, recursive=filters.get("recursive", True), ext=filters.get("ext"))
+    return catalog.files(root, **filters)
+
+
+def scan_paths(root, **filters):
+    """Like scan_files but returns Path objects"""
+    return [Path(row["path"]) for row in scan_files(root, **filters)]
@@ -0,0 +1,108 @@
+"""
+Content-Hash De-duplication
+Collapse byte-identical files found in several folders down to one canonical copy
+
+The same invoice PDF often lives under Properties/, Archive/ and a vendor
+download folder at once. Hashing every file (streamed, in a thread pool) and
+grouping by SHA-256 lets the scan extract each document exactly once and keep
+the other locations as aliases for the report.
+
+USAGE:
+    from file_dedup import collapse_duplicates
+
+    unique, duplicates = collapse_duplicates(file_infos)
+"""
+
+import os
+from pathlib import PurePath
+from concurrent.futures import ThreadPoolExecutor
+
+from file_hashing import cached_sha256
+
+HASH_WORKERS = int(os.environ.get("FILE_HASH_WORKERS", "8"))
+
+# Folders that hold stale copies; a file outside them wins as canonical
+ARCHIVE_FOLDER_NAMES = ("archive", "old_extraction_files", "backup", "backups")
+
+
+def hash_files(paths, max_workers=HASH_WORKERS):
+    """
+    SHA-256 of many files, streamed and hashed concurrently
+
+    Returns:
+        Dict of str(path) -> hex digest (None when a file cannot be read)
+    """
+    def _hash(path):
+        try:
+            return cached_sha256(path)
+        except OSError as e:
+            print(f"   WARNING: Could not hash {path}: {e}")
+            return None
+
+    paths = [str(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(paths, executor.map(_hash, paths)))
+
+
+def canonical_sort_key(file_info):
+    """Prefer live folders over archives, then the shortest, then alphabetical path"""
+    rel_path = file_info.get("relative_path", file_info["path"])
+    parts = [part.lower() for part in PurePath(rel_path).parts[:-1]]
+    archived = any(part in ARCHIVE_FOLDER_NAMES for part in parts)
+    return (archived, len(parts), rel_path.lower())
+
+
+def collapse_duplicates(file_infos, max_workers=HASH_WORKERS):
+    """
+    Group file_info dicts (each with a "path") by content hash
+
+    Args:
+        file_infos: List of dicts with at least "path" (and ideally
+            "relative_path"); a "sha256" already present is trusted
+        max_workers: Hashing threads
+
+    Returns:
+        (unique, duplicates)
+        unique: One file_info per distinct content, in first-seen order, with
+            "sha256" and "aliases" (relative paths of the other copies) added
+        duplicates: Report rows for every hash seen more than once:
+            {"sha256", "canonical", "aliases", "copies", "bytes_saved"}
+    """
+    # Rows from the file catalog already carry a sha256; only hash the rest
+    hashes = {str(info["path"]): info["sha256"] for info in file_infos if info.get("sha256")}
+    hashes.update(hash_files(
+        [info["path"] for info in file_infos if not info.get("sha256")],
+        max_workers=max_workers
+    ))
+
+    groups = {}
+    for info in file_infos:
+        digest = hashes.get(str(info["path"]))
+        # Unreadable files stay as their own group so they are still reported downstream
+        group_key = digest or f"unhashed:{info['path']}"
+        groups.setdefault(group_key, []).append(info)
+
+    unique = []
+    duplicates = []
+
+    for group_key, group in groups.items():
+        group = sorted(group, key=canonical_sort_key)
+        canonical = dict(group[0])
+        canonical["sha256"] = hashes.get(str(canonical["path"]))
+        canonical["aliases"] = [info.get("relative_path", info["path"]) for info in group[1:]]
+        unique.append(canonical)
+
+        if len(group) > 1:
+            try:
+                size = os.path.getsize(canonical["path"])
+            except OSError:
+                size = 0
+            duplicates.append({
+                "sha256": canonical["sha256"],
+                "canonical": canonical.get("relative_path", canonical["path"]),
+                "aliases": canonical["aliases"],
+                "copies": len(group),
+                "bytes_saved": size * (len(group) - 1)
+            })
+
+    return unique, duplicates
@@ -0,0 +1,42 @@
+"""
+File Hashing Helpers
+Streaming SHA-256 of files so large PDFs/workbooks are never read into memory at once
+"""
+
+import os
+import hashlib
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+
+def sha256_file(path, chunk_size=CHUNK_SIZE):
+    """Return the hex SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sha256_text(*parts):
+    """Return the hex SHA-256 of one or more text parts (joined unambiguously)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        encoded = str(part).encode("utf-8")
+        digest.update(str(len(encoded)).encode("ascii") + b":")
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+_hash_memo = {}
+
+
+def cached_sha256(path):
+    """sha256_file memoized per (path, size, mtime) for the life of the process"""
+    stat = os.stat(path)
+    memo_key = (str(path), stat.st_size, stat.st_mtime_ns)
+    digest = _hash_memo.get(memo_key)
+    if digest is None:
+        digest = sha256_file(path)
+        _hash_memo[memo_key] = digest
+    return digest
@@ -26,6 +26,8 @@ from jinja2 import Environment, FileSystemLoader, select_autoescape
 # Composio Google Sheets integration
 from dotenv import load_dotenv
 
+from line_item_table import cents_to_dollars, format_cents, to_cents
+
 load_dotenv()
 
 # Spreadsheet ID from our created sheet
@@ -56,13 +58,15 @@ class GoogleSheetsReportGenerator:
         """Format number as currency"""
         if value is None or value == "":
             return "N/A"
-        try:
-            # Remove any existing currency symbols or commas
-            if isinstance(value, str):
-                value = value.replace('$', '').replace(',', '').strip()
-            return f"${float(value):,.2f}"
-        except:
-            return str(value)
+        cents = to_cents(value)
+        return str(value) if cents is None else format_cents(cents)
+
+    def _parse_dollars(self, value):
+        """Dollar amount from a sheet cell ("$1,250.00", "1250", 1250.0), rounded to the cent"""
+        cents = to_cents(value)
+        if cents is None:
+            raise ValueError(f"Invalid dollar amount: {value!r}")
+        return cents_to_dollars(cents)
 
     def _format_percent(self, value):
         """Format number as percentage"""
@@ -191,7 +195,7 @@ class GoogleSheetsReportGenerator:
                     'avg_ypd': float(details_row[5]) if len(details_row) > 5 and details_row[5] else 0,
                     'avg_overage_cpd': float(details_row[6]) if len(details_row) > 6 and details_row[6] else 0,
                     'city': details_row[7] if len(details_row) > 7 else '',
-                    'monthly_cost': float(str(details_row[8]).replace('$', '').replace(',', '')) if len(details_row) > 8 and details_row[8] else 0,
+                    'monthly_cost': self._parse_dollars(details_row[8]) if len(details_row) > 8 and details_row[8] else 0,
                     'service_details': details_row[9] if len(details_row) > 9 else '',
 
                     # From Performance Metrics sheet (columns A-J)
@@ -241,11 +245,9 @@ class GoogleSheetsReportGenerator:
             if len(portfolio_rows) >= 6:
                 summary['total_units'] = int(portfolio_rows[5][1]) if len(portfolio_rows[5]) > 1 else 0
             if len(portfolio_rows) >= 7:
-                cost_str = str(portfolio_rows[6][1]).replace('$', '').replace(',', '')
-                summary['total_monthly_cost'] = float(cost_str) if cost_str else 0
+                summary['total_monthly_cost'] = self._parse_dollars(portfolio_rows[6][1]) if portfolio_rows[6][1] else 0
             if len(portfolio_rows) >= 8:
-                cpd_str = str(portfolio_rows[7][1]).replace('$', '').replace(',', '')
-                summary['avg_cpd'] = float(cpd_str) if cpd_str else 0
+                summary['avg_cpd'] = self._parse_dollars(portfolio_rows[7][1]) if portfolio_rows[7][1] else 0
             if len(portfolio_rows) >= 11:
                 summary['good_properties'] = int(portfolio_rows[10][1]) if len(portfolio_rows[10]) > 1 else 0
             if len(portfolio_rows) >= 12:
@@ -5,6 +5,8 @@ Identify files that can be cleaned up
 from pathlib import Path
 from datetime import datetime
 
+from file_catalog import scan_files
+
 print('=' * 80)
 print('FILE CLEANUP ANALYSIS')
 print('=' * 80)
@@ -21,9 +23,9 @@ old_documentation = []
 # Find backup files
 print('BACKUP FILES:')
 print('-' * 80)
-for backup in Path('Portfolio_Reports').glob('*BACKUP*.xlsx'):
+for backup in scan_files('Portfolio_Reports', ext='.xlsx', pattern='*BACKUP*', recursive=False):
     backup_files.append(backup)
-    print(f'  {backup.name}')
+    print(f'  {backup["name"]}')
 print(f'Total: {len(backup_files)} files')
 print()
 
@@ -39,34 +41,35 @@ temp_script_patterns = [
 ]
 
 for pattern in temp_script_patterns:
-    for script in Path('Code').glob(pattern):
+    for script in scan_files('Code', ext='.py', pattern=pattern, recursive=False):
         temp_scripts.append(script)
-        print(f'  {script.name}')
+        print(f'  {script["name"]}')
 print(f'Total: {len(temp_scripts)} files')
 print()
 
 # Find duplicate/old reports
 print('PROPERTY REPORTS (check for duplicates):')
 print('-' * 80)
-for prop_dir in Path('Properties').iterdir():
-    if prop_dir.is_dir():
-        reports_dir = prop_dir / 'Reports'
-        if reports_dir.exists():
-            reports = list(reports_dir.glob('*.xlsx'))
-            if len(reports) > 1:
-                print(f'  {prop_dir.name}:')
-                for report in reports:
-                    print(f'    - {report.name}')
-                duplicate_reports.extend(reports)
+reports_by_property = {}
+for report in scan_files('Properties', ext='.xlsx'):
+    parts = Path(report['relative_path']).parts
+    if len(parts) == 3 and parts[1] == 'Reports':
+        reports_by_property.setdefault(parts[0], []).append(report)
+for prop_dir_name, reports in sorted(reports_by_property.items()):
+    if len(reports) > 1:
+        print(f'  {prop_dir_name}:')
+        for report in reports:
+            print(f'    - {report["name"]}')
+        duplicate_reports.extend(reports)
 print()
 
 # Find old documentation files
 print('DOCUMENTATION FILES (check for outdated):')
 print('-' * 80)
-doc_files = list(Path('Portfolio_Reports').glob('*.md'))
+doc_files = scan_files('Portfolio_Reports', ext='.md', recursive=False)
 for doc in doc_files:
     old_documentation.append(doc)
-    print(f'  {doc.name}')
+    print(f'  {doc["name"]}')
 print(f'Total: {len(doc_files)} files')
 print()
 
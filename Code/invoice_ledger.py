@@ -0,0 +1,393 @@
+"""
+Columnar Invoice Ledger
+Partitioned Parquet copy of the master workbook that analysis scripts read instead of the XLSX
+
+Every analysis script used to call pd.read_excel() on
+MASTER_Portfolio_Complete_Data.xlsx, once per sheet, and each call parses
+the whole workbook again. The ledger holds the same data as typed Parquet:
+invoice line items partitioned by property and invoice month, summary sheets
+(Property Overview, Spend by Category, ...) as one file each. Reading a
+property is a columnar read of that property's partitions.
+
+The ledger is the source of truth; the master XLSX is regenerated from it
+with export_master(). An export holds values only: cell styles, column
+widths, number formats and formulas of the original workbook are lost. It
+therefore writes <master>_FROM_LEDGER.xlsx beside the master by default;
+exporting over the master itself (--output <master>) first stores the
+current file in the snapshot store (see snapshot_store).
+
+Scripts that still write the XLSX directly leave the
+ledger behind - read_master_sheet() notices (the workbook hash no longer
+matches the manifest), falls back to the XLSX (via the single-parse
+MasterWorkbook loader) and says to re-import.
+
+Layout:
+    Portfolio_Reports/ledger/manifest.json
+    Portfolio_Reports/ledger/lines/property=<Property_Name>/month=<YYYY-MM>/part-0.parquet
+    Portfolio_Reports/ledger/sheets/<Sheet_Name>.parquet
+
+Line-item tabs keep their own columns (they differ between vendors); the
+manifest records each sheet's column order so a load returns exactly what
+pd.read_excel() returned, with date columns as datetime64.
+
+Environment:
+    INVOICE_LEDGER_DIR=<path>   Override ledger location
+
+USAGE:
+    python Code/invoice_ledger.py import            # master XLSX -> ledger
+    python Code/invoice_ledger.py export [--output PATH]   # default: <master>_FROM_LEDGER.xlsx
+    python Code/invoice_ledger.py summary
+
+    from invoice_ledger import ledger, read_master_sheet
+
+    df = read_master_sheet("Orion Prosper", master_path)
+    lines = ledger.load_lines(properties=["Tempe Vista"], months=["2025-08"])
+"""
+
+import os
+import re
+import json
+import shutil
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+import pandas as pd
+
+from file_hashing import cached_sha256
+from master_workbook import MasterWorkbook, read_sheet
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# Bump when the ledger layout changes
+LEDGER_FORMAT_VERSION = 1
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MASTER_FILE = BASE_DIR / "Portfolio_Reports" / "MASTER_Portfolio_Complete_Data.xlsx"
+DEFAULT_LEDGER_DIR = BASE_DIR / "Portfolio_Reports" / "ledger"
+LEDGER_DIR = Path(os.environ.get("INVOICE_LEDGER_DIR", DEFAULT_LEDGER_DIR))
+
+# export_master() writes <master><suffix>.xlsx unless given an output path
+EXPORT_SUFFIX = "_FROM_LEDGER"
+
+# A sheet with these columns is an invoice line-item tab
+LINE_ITEM_COLUMNS = ("Source File", "Invoice Number")
+
+# Stored as datetime64 when every value parses; exported back as YYYY-MM-DD text
+DATE_COLUMNS = ("Invoice Date", "Due Date", "Service Date", "Service Period Start", "Service Period End")
+
+# Partition key column for line items
+MONTH_COLUMN = "Invoice Date"
+UNKNOWN_MONTH = "unknown"
+
+# Original row position, so partitioned reads come back in workbook order
+ROW_COLUMN = "_row"
+
+
+def partition_name(name):
+    """Directory/file-safe name for a property or sheet"""
+    return re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_")
+
+
+def is_line_item_sheet(df):
+    return all(column in df.columns for column in LINE_ITEM_COLUMNS)
+
+
+def _typed(df):
+    """Copy of a sheet with parseable date columns as datetime64 -> (df, date_columns)"""
+    df = df.copy()
+    converted = []
+    for column in DATE_COLUMNS:
+        if column not in df.columns or df[column].notna().sum() == 0:
+            continue
+        parsed = pd.to_datetime(df[column], errors="coerce", format="mixed")
+        if parsed.notna().sum() == df[column].notna().sum():
+            df[column] = parsed
+            converted.append(column)
+    return df, converted
+
+
+def _arrow_safe(df):
+    """Mixed-type text columns (e.g. numbers typed into a text column) stored as text -> column names"""
+    stringified = []
+    for column in df.columns:
+        if df[column].dtype == object and len({type(value) for value in df[column].dropna()}) > 1:
+            df[column] = df[column].map(lambda value: value if pd.isna(value) else str(value))
+            stringified.append(str(column))
+    return stringified
+
+
+def _months(df):
+    if MONTH_COLUMN in df.columns and pd.api.types.is_datetime64_any_dtype(df[MONTH_COLUMN]):
+        return df[MONTH_COLUMN].dt.strftime("%Y-%m").fillna(UNKNOWN_MONTH)
+    return pd.Series(UNKNOWN_MONTH, index=df.index)
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImportError("The invoice ledger needs pyarrow (pip install pyarrow)")
+
+
+class InvoiceLedger:
+    """Partitioned Parquet store of the master workbook"""
+
+    def __init__(self, ledger_dir=LEDGER_DIR):
+        self.ledger_dir = Path(ledger_dir)
+        self._manifest = None
+        self._warned_stale = False
+
+    @property
+    def manifest_path(self):
+        return self.ledger_dir / "manifest.json"
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            try:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                return None
+            if manifest.get("format_version") != LEDGER_FORMAT_VERSION:
+                return None
+            self._manifest = manifest
+        return self._manifest
+
+    @property
+    def available(self):
+        return pyarrow is not None and self.manifest is not None
+
+    def properties(self):
+        """Property names with line items in the ledger, in workbook order"""
+        return [name for name, sheet in self.manifest["sheets"].items() if sheet["kind"] == "lines"]
+
+    def serves(self, master_path=MASTER_FILE):
+        """True when the ledger holds the current contents of master_path"""
+        if not self.available:
+            return False
+        master_path = Path(master_path).resolve()
+        if str(master_path) != self.manifest["master_path"]:
+            return False
+        if not master_path.exists() or cached_sha256(master_path) == self.manifest["master_sha256"]:
+            return True
+        if not self._warned_stale:
+            print(f"   WARNING: {master_path.name} changed since the ledger was built - reading the XLSX "
+                  f"(run: python Code/invoice_ledger.py import)")
+            self._warned_stale = True
+        return False
+
+    # -- write -------------------------------------------------------------
+
+    def import_master(self, master_path=MASTER_FILE):
+        """
+        Rebuild the ledger from a master workbook
+
+        The new ledger is written beside the old one and swapped in, so
+        readers never see half a ledger.
+
+        Returns:
+            The manifest
+        """
+        _require_pyarrow()
+        master_path = Path(master_path).resolve()
+        workbook = MasterWorkbook.open(master_path).sheets
+
+        staging_dir = self.ledger_dir.with_name(self.ledger_dir.name + ".tmp")
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        (staging_dir / "lines").mkdir(parents=True)
+        (staging_dir / "sheets").mkdir(parents=True)
+
+        sheets = {}
+        for sheet_name, df in workbook.items():
+            typed, date_columns = _typed(df)
+            entry = {
+                "columns": [str(column) for column in df.columns],
+                "date_columns": date_columns,
+                "text_columns": _arrow_safe(typed),
+                "rows": len(df)
+            }
+
+            if is_line_item_sheet(df):
+                entry.update(kind="lines", partition=partition_name(sheet_name), months={})
+                typed[ROW_COLUMN] = range(len(typed))
+                # One schema per property so every month partition has the same column types
+                schema = pyarrow.Schema.from_pandas(typed, preserve_index=False)
+                for month, group in typed.groupby(_months(typed), sort=True):
+                    month_dir = staging_dir / "lines" / f"property={entry['partition']}" / f"month={month}"
+                    month_dir.mkdir(parents=True)
+                    group.to_parquet(month_dir / "part-0.parquet", index=False, schema=schema)
+                    entry["months"][month] = len(group)
+            else:
+                entry.update(kind="sheet", partition=partition_name(sheet_name))
+                typed.columns = entry["columns"]
+                typed.to_parquet(staging_dir / "sheets" / f"{entry['partition']}.parquet", index=False)
+
+            sheets[sheet_name] = entry
+
+        manifest = {
+            "format_version": LEDGER_FORMAT_VERSION,
+            "built_at": datetime.now().isoformat(),
+            "master_path": str(master_path),
+            "master_sha256": cached_sha256(master_path),
+            "sheets": sheets
+        }
+        with open(staging_dir / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        old_dir = self.ledger_dir.with_name(self.ledger_dir.name + ".old")
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if self.ledger_dir.exists():
+            os.replace(self.ledger_dir, old_dir)
+        os.replace(staging_dir, self.ledger_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        self._manifest = manifest
+        self._warned_stale = False
+        return manifest
+
+    def export_master(self, output_path=None):
+        """
+        Regenerate the master workbook from the ledger (values only - formatting is not kept)
+
+        Args:
+            output_path: Workbook to write (default: <master>_FROM_LEDGER.xlsx
+                beside the imported workbook). Writing over the imported
+                workbook snapshots it first, and the ledger then serves it again.
+
+        Returns:
+            Path written
+        """
+        _require_pyarrow()
+        master_path = Path(self.manifest["master_path"])
+        if output_path is None:
+            output_path = master_path.with_name(f"{master_path.stem}{EXPORT_SUFFIX}{master_path.suffix}")
+        output_path = Path(output_path).resolve()
+        if output_path == master_path and output_path.exists():
+            # Imported here: snapshot_store itself imports this module
+            from snapshot_store import store
+            snapshot = store.snapshot(output_path, label="PRE_EXPORT")
+            print(f"   Previous {output_path.name} kept as snapshot {snapshot['id']} "
+                  f"(python Code/snapshot_store.py restore {snapshot['id']})")
+        temp_path = output_path.with_name(f"~{output_path.stem}.tmp.xlsx")
+
+        with pd.ExcelWriter(temp_path, engine="openpyxl") as writer:
+            for sheet_name, entry in self.manifest["sheets"].items():
+                df = self.load_sheet(sheet_name)
+                for column in entry["date_columns"]:
+                    df[column] = df[column].dt.strftime("%Y-%m-%d")
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+        os.replace(temp_path, output_path)
+
+        if str(output_path) == self.manifest["master_path"]:
+            self.manifest["master_sha256"] = cached_sha256(output_path)
+            with open(self.manifest_path, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, indent=2)
+        return output_path
+
+    # -- read --------------------------------------------------------------
+
+    def _line_files(self, entry, months=None):
+        property_dir = self.ledger_dir / "lines" / f"property={entry['partition']}"
+        return [
+            property_dir / f"month={month}" / "part-0.parquet"
+            for month in entry["months"]
+            if months is None or month in months
+        ]
+
+    def load_property(self, property_name, months=None):
+        """
+        One property's line items with the columns of its workbook tab
+
+        Args:
+            months: Optional list of "YYYY-MM" partitions to read
+        """
+        _require_pyarrow()
+        entry = self.manifest["sheets"].get(property_name)
+        if entry is None or entry["kind"] != "lines":
+            raise KeyError(f"No line items for property {property_name!r} in the ledger")
+
+        files = self._line_files(entry, months)
+        if not files:
+            return pd.DataFrame(columns=entry["columns"])
+        df = pd.concat([pd.read_parquet(path) for path in files], ignore_index=True)
+        df = df.sort_values(ROW_COLUMN, kind="stable").reset_index(drop=True)
+        return df[entry["columns"]]
+
+    def load_lines(self, properties=None, months=None):
+        """
+        Line items of several properties in one frame (union of their columns)
+
+        Args:
+            properties: Property names (default: all)
+            months: Optional list of "YYYY-MM" partitions to read
+        """
+        frames = [self.load_property(name, months) for name in (properties or self.properties())]
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True, sort=False)
+
+    def load_sheet(self, sheet_name):
+        """Any workbook sheet as pd.read_excel(sheet_name=...) would return it"""
+        _require_pyarrow()
+        entry = self.manifest["sheets"].get(sheet_name)
+        if entry is None:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        if entry["kind"] == "lines":
+            return self.load_property(sheet_name)
+        df = pd.read_parquet(self.ledger_dir / "sheets" / f"{entry['partition']}.parquet")
+        return df[entry["columns"]]
+
+    def summary(self):
+        if not self.available:
+            return "Ledger: not built" + ("" if pyarrow is not None else " (pyarrow not installed)")
+        sheets = self.manifest["sheets"].values()
+        lines = [entry for entry in sheets if entry["kind"] == "lines"]
+        months = {month for entry in lines for month in entry["months"]}
+        return (f"Ledger: {sum(entry['rows'] for entry in lines)} line items, {len(lines)} properties, "
+                f"{len(months)} months, {len(sheets) - len(lines)} summary sheets "
+                f"(built {self.manifest['built_at'][:19]})")
+
+
+ledger = InvoiceLedger()
+
+
+def read_master_sheet(sheet_name, master_path=MASTER_FILE):
+    """
+    A master workbook sheet - from the ledger when it holds that workbook,
+    otherwise from the XLSX (parsed once per process, see master_workbook)
+    """
+    if ledger.serves(master_path):
+        return ledger.load_sheet(sheet_name)
+    return read_sheet(master_path, sheet_name)
+
+
+def sync_from_master(master_path=MASTER_FILE):
+    """Re-import after a script wrote the master XLSX directly (no-op when the ledger tracks another workbook)"""
+    if ledger.available and str(Path(master_path).resolve()) == ledger.manifest["master_path"]:
+        ledger.import_master(master_path)
+        print(f"   {ledger.summary()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Invoice ledger - Orion Portfolio")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Rebuild the ledger from the master workbook")
+    import_parser.add_argument("--master", type=Path, default=MASTER_FILE)
+    export_parser = subparsers.add_parser(
+        "export", help="Regenerate the master workbook from the ledger (values only, formatting is not kept)")
+    export_parser.add_argument("--output", type=Path, default=None)
+    subparsers.add_parser("summary", help="Show what the ledger holds")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        manifest = ledger.import_master(args.master)
+        print(f"OK: Imported {Path(manifest['master_path']).name} into {ledger.ledger_dir}")
+    elif args.command == "export":
+        if not ledger.available:
+            raise SystemExit(ledger.summary())
+        print(f"OK: Exported ledger to {ledger.export_master(args.output)}")
+    print(ledger.summary())
@@ -0,0 +1,182 @@
+"""
+Multi-Document Packing for Small Invoices
+Group several small same-vendor invoices into one vision extraction request
+
+Most invoices are one or two pages (the Bella Mirage "invoice (N).pdf" files
+are ~80 KB), so per-request overhead dominates and the run is capped by
+requests per minute, not tokens. Packing sends up to PACK_SIZE such invoices
+from the same vendor in one request (see vision_client.documents_request)
+and asks for one result object per document, labelled with its source_file.
+
+Labels carry the document's position in the pack ("#2 invoice (3).pdf",
+see document_label) because file names repeat across property folders; a
+pack never holds two files with the same name either, so the model is not
+asked to tell them apart. Results are only trusted when the labels map back
+one-to-one onto the files that were sent (match_documents); anything missing, duplicated or mislabelled,
+and any document whose result fails validate_extraction, is re-extracted with
+a normal single-document call by the caller.
+
+Vendor comes from the vendor_parsers detector on the cached page-1 text;
+scans without a text layer are grouped by folder instead.
+
+Environment:
+    INVOICE_PACKING=off         on to enable (or --pack on the batch extractor)
+    INVOICE_PACK_SIZE=4         Invoices per request
+    INVOICE_PACK_MAX_KB=250     Largest PDF eligible for packing
+    INVOICE_PACK_MAX_PAGES=2    Longest PDF eligible for packing
+
+USAGE:
+    from invoice_packing import InvoicePack, plan_packs, match_documents
+
+    work_items = plan_packs(units)   # ExtractionUnits and InvoicePacks
+"""
+
+import os
+from pathlib import Path
+
+from pdf_text import get_pdf_text
+from vendor_parsers import GENERIC_PARSER, detect_vendor
+
+ENABLED = os.environ.get("INVOICE_PACKING", "off").lower() in ("1", "on", "true", "yes")
+PACK_SIZE = int(os.environ.get("INVOICE_PACK_SIZE", "4"))
+PACK_MAX_BYTES = int(os.environ.get("INVOICE_PACK_MAX_KB", "250")) * 1024
+PACK_MAX_PAGES = int(os.environ.get("INVOICE_PACK_MAX_PAGES", "2"))
+
+
+def document_label(position, pdf_path):
+    """source_file label of the document at position in a packed request"""
+    return f"#{position + 1} {Path(pdf_path).name}"
+
+
+class InvoicePack:
+    """Several small invoices from one vendor, extracted with one request"""
+
+    def __init__(self, units, vendor):
+        names = [unit.path.name for unit in units]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Cannot pack two files with the same name: {', '.join(names)}")
+        self.units = units
+        self.vendor = vendor
+
+    @property
+    def name(self):
+        return f"pack of {len(self.units)} ({self.vendor}): {', '.join(unit.path.name for unit in self.units)}"
+
+
+def pack_vendor(pdf_path):
+    """Grouping key: detected vendor, or the folder for PDFs the detector cannot place"""
+    doc = get_pdf_text(pdf_path, max_pages=1)
+    parser = detect_vendor(doc.first_page)
+    if parser is not GENERIC_PARSER:
+        return parser.vendor_name
+    return f"folder {Path(pdf_path).parent.name}"
+
+
+def is_packable(unit, max_bytes=PACK_MAX_BYTES, max_pages=PACK_MAX_PAGES):
+    """Whole, small, short PDFs only (statement segments always go alone)"""
+    if unit.segmented:
+        return False
+    try:
+        if unit.path.stat().st_size > max_bytes:
+            return False
+    except OSError:
+        return False
+    doc = get_pdf_text(unit.path, max_pages=1)
+    return not doc.error and 0 < doc.total_pages <= max_pages
+
+
+def plan_packs(units, pack_size=PACK_SIZE, max_bytes=PACK_MAX_BYTES, max_pages=PACK_MAX_PAGES):
+    """
+    Replace runs of small same-vendor invoices with InvoicePacks
+
+    Args:
+        units: ExtractionUnits (see statement_segments)
+        pack_size: Invoices per pack
+
+    Returns:
+        Work items in input order: each an ExtractionUnit or an InvoicePack
+        (placed where its first invoice was). A vendor with a single leftover
+        invoice gets a plain unit, not a pack of one.
+    """
+    units = list(units)
+    if pack_size < 2:
+        return units
+
+    by_vendor = {}
+    for position, unit in enumerate(units):
+        if is_packable(unit, max_bytes, max_pages):
+            by_vendor.setdefault(pack_vendor(unit.path), []).append(position)
+
+    packed_at = {}
+    packed_positions = set()
+    for vendor, positions in by_vendor.items():
+        # Same-named files (e.g. "invoice.pdf" in two property folders) go to different packs
+        chunks = []
+        for position in positions:
+            name = units[position].path.name
+            chunk = next((chunk for chunk in chunks
+                          if len(chunk) < pack_size and all(units[p].path.name != name for p in chunk)), None)
+            if chunk is None:
+                chunks.append([position])
+            else:
+                chunk.append(position)
+        for chunk in chunks:
+            if len(chunk) < 2:
+                continue
+            packed_at[chunk[0]] = InvoicePack([units[position] for position in chunk], vendor)
+            packed_positions.update(chunk)
+
+    work_items = []
+    for position, unit in enumerate(units):
+        if position in packed_at:
+            work_items.append(packed_at[position])
+        elif position not in packed_positions:
+            work_items.append(unit)
+
+    packs = [item for item in work_items if isinstance(item, InvoicePack)]
+    if packs:
+        print(f"   Packing: {sum(len(pack.units) for pack in packs)} small invoices into "
+              f"{len(packs)} requests ({len(work_items)} work items)")
+    return work_items
+
+
+def match_documents(documents, expected_names):
+    """
+    Pair results from a packed request with the files that were sent
+
+    Args:
+        documents: The "documents" list returned by the model
+        expected_names: source_file labels that were sent (unique, see
+            document_label)
+
+    Returns:
+        (by_name, problems) - by_name maps each cleanly matched label to its
+        result; labels that are missing, returned twice or unknown are left
+        out and described in problems
+    """
+    expected = set(expected_names)
+    if len(expected) != len(expected_names):
+        raise ValueError("Packed documents need unique source_file labels")
+    by_name = {}
+    duplicated = set()
+    problems = []
+
+    if len(documents) != len(expected_names):
+        problems.append(f"{len(documents)} results for {len(expected_names)} documents")
+
+    for position, document in enumerate(documents):
+        name = document.get("source_file") if isinstance(document, dict) else None
+        if name not in expected:
+            problems.append(f"documents[{position}]: unknown source_file {name!r}")
+        elif name in by_name or name in duplicated:
+            duplicated.add(name)
+        else:
+            by_name[name] = document
+
+    for name in sorted(duplicated):
+        by_name.pop(name, None)
+        problems.append(f"{name}: returned more than once")
+    for name in sorted(expected - by_name.keys() - duplicated):
+        problems.append(f"{name}: no result")
+
+    return by_name, problems
@@ -0,0 +1,141 @@
+"""
+Typed Line-Item Table
+Invoice line items with amounts as integer cents and dimensions as categoricals
+
+Amounts arrive as strings ("1250.00", "$1,250.00") or floats and used to be
+re-parsed wherever they were needed, then summed as floats - which drifts
+(30200.56 comes back as 30200.560000000005) right where the $1.00 total
+checks look. line_item_table() parses every amount column exactly once, with
+Decimal rounding, into a nullable Int64 "<column> Cents" column; sums of
+those are exact. Repeated text (property, vendor, category, container type)
+becomes pandas categoricals, stored once per distinct value.
+
+Convert back to dollars only for display (cents_to_dollars / format_cents).
+
+USAGE:
+    from line_item_table import line_item_table, cents_column
+
+    table = line_item_table(read_master_sheet("Orion Prosper"))
+    total_cents = int(table[cents_column("Extended Amount")].sum())
+
+    python Code/line_item_table.py    # memory: raw sheets vs typed table
+"""
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+import pandas as pd
+
+from invoice_ledger import DATE_COLUMNS, MASTER_FILE, is_line_item_sheet, read_master_sheet
+from master_workbook import MasterWorkbook
+
+# Money columns across the property tabs (parsed to "<column> Cents")
+AMOUNT_COLUMNS = (
+    "Invoice Amount", "Extended Amount", "Unit Rate", "Line Item Amount",
+    "Total Amount", "Previous Balance", "Payments"
+)
+
+# Low-cardinality text repeated on every row (or every line of an invoice)
+DIMENSION_COLUMNS = (
+    "Property", "Vendor", "Category", "Service Type", "Container Type",
+    "Container Size", "Service Frequency", "Service Days", "Service Notes",
+    "Data Source", "UOM", "Account Number", "Source File", "Billing Period"
+)
+
+CENTS_SUFFIX = " Cents"
+
+
+def to_cents(value):
+    """Integer cents from a number or a "$1,250.00"-style string, None when blank/unparseable"""
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    try:
+        amount = Decimal(str(value).replace("$", "").replace(",", "").strip())
+    except InvalidOperation:
+        return None
+    if not amount.is_finite():
+        return None
+    return int((amount * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def cents_to_dollars(cents):
+    return None if cents is None else cents / 100
+
+
+def format_cents(cents):
+    """$1,250.00 display text for integer cents"""
+    return f"${cents / 100:,.2f}"
+
+
+def cents_column(column):
+    """Name of the cents column line_item_table() builds for an amount column"""
+    return column + CENTS_SUFFIX
+
+
+def cents_series(values):
+    """Nullable Int64 cents for a column of amounts (unparseable cells become <NA>)"""
+    values = pd.Series(values)
+    parsed = {value: to_cents(value) for value in values.dropna().unique()}
+    return values.map(parsed).astype("Int64")
+
+
+def line_item_table(df):
+    """
+    Typed copy of a property tab (or several concatenated)
+
+    Amount columns are replaced by Int64 "<column> Cents" columns, dimension
+    columns become categoricals and date columns datetime64. Everything else
+    is kept as read.
+    """
+    table = df.copy()
+    for column in AMOUNT_COLUMNS:
+        if column in table.columns:
+            table[column] = cents_series(table[column])
+            table = table.rename(columns={column: cents_column(column)})
+    for column in DIMENSION_COLUMNS:
+        if column in table.columns:
+            values = table[column]
+            # Numbers typed into a text column (e.g. container sizes) share one category type
+            table[column] = values.where(values.isna(), values.astype(str)).astype("category")
+    for column in DATE_COLUMNS:
+        if column in table.columns and not pd.api.types.is_datetime64_any_dtype(table[column]):
+            table[column] = pd.to_datetime(table[column], errors="coerce", format="mixed")
+    return table
+
+
+def line_item_sheets(master_path=MASTER_FILE):
+    """Names of the property line-item tabs in the master workbook"""
+    return [name for name, df in MasterWorkbook.open(master_path).sheets.items() if is_line_item_sheet(df)]
+
+
+def load_line_items(properties=None, master_path=MASTER_FILE):
+    """
+    One typed table of every property's line items (union of their columns)
+
+    Categories are built after concatenating, so each dimension has a single
+    category set across properties.
+    """
+    names = properties or line_item_sheets(master_path)
+    frames = [read_master_sheet(name, master_path) for name in names]
+    return line_item_table(pd.concat(frames, ignore_index=True, sort=False))
+
+
+def memory_summary(raw, table):
+    raw_bytes = raw.memory_usage(deep=True).sum()
+    table_bytes = table.memory_usage(deep=True).sum()
+    return (f"{len(table)} line items: {raw_bytes / 1024:,.0f} KB as read, "
+            f"{table_bytes / 1024:,.0f} KB typed ({raw_bytes / table_bytes:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    names = line_item_sheets()
+    raw = pd.concat([read_master_sheet(name) for name in names], ignore_index=True, sort=False)
+    table = line_item_table(raw)
+
+    print("=" * 80)
+    print("TYPED LINE-ITEM TABLE")
+    print("=" * 80)
+    print(memory_summary(raw, table))
+    for column in AMOUNT_COLUMNS:
+        if cents_column(column) in table.columns:
+            cents = table[cents_column(column)]
+            print(f"  {column:<18} {cents.notna().sum():>5} values  total {format_cents(int(cents.sum()))}")
@@ -0,0 +1,157 @@
+"""
+Master Workbook Loader
+Parse every sheet of a workbook once per process, memoized on path + mtime
+
+pd.read_excel(path, sheet_name=X) unzips and parses the whole XLSX for every
+call, and the analysis scripts call it once per sheet or once per property
+in a loop. MasterWorkbook parses all sheets in one pd.read_excel(...,
+sheet_name=None) call and keeps the DataFrames until the file changes on
+disk (size or mtime); every caller gets its own copy.
+
+Optionally the parsed sheets are pickled to a snapshot keyed by the
+workbook's SHA-256, so the next process skips the XLSX parse entirely.
+
+Layout:
+    Extraction_Output/.workbook_snapshots/<Workbook_Name>-<sha[:16]>.pkl
+
+Environment:
+    WORKBOOK_SNAPSHOTS=off         on to persist parsed sheets between runs
+    WORKBOOK_SNAPSHOT_DIR=<path>   Override snapshot location
+
+USAGE:
+    from master_workbook import MasterWorkbook
+
+    workbook = MasterWorkbook.open(master_path)
+    df = workbook.sheet("Orion Prosper")
+"""
+
+import os
+import re
+import pickle
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from file_hashing import cached_sha256
+
+# Bump when the snapshot layout changes
+SNAPSHOT_FORMAT_VERSION = 1
+
+DEFAULT_SNAPSHOT_DIR = Path(__file__).resolve().parent.parent / "Extraction_Output" / ".workbook_snapshots"
+SNAPSHOT_DIR = Path(os.environ.get("WORKBOOK_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR))
+SNAPSHOTS_ENABLED = os.environ.get("WORKBOOK_SNAPSHOTS", "off").lower() in ("1", "on", "true", "yes")
+
+
+class MasterWorkbook:
+    """All sheets of one workbook, parsed at most once per file version"""
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path, snapshots=SNAPSHOTS_ENABLED, snapshot_dir=SNAPSHOT_DIR):
+        self.path = Path(path).resolve()
+        self.snapshots = snapshots
+        self.snapshot_dir = Path(snapshot_dir)
+        self.stats = {"parsed": 0, "snapshot_hits": 0, "served": 0}
+        self._version = None
+        self._sheets = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path):
+        """Process-wide shared loader for a workbook path"""
+        key = str(Path(path).resolve())
+        with cls._shared_lock:
+            workbook = cls._shared.get(key)
+            if workbook is None:
+                workbook = cls._shared[key] = cls(key)
+            return workbook
+
+    # -- snapshots ---------------------------------------------------------
+
+    def _snapshot_prefix(self):
+        return re.sub(r"[^A-Za-z0-9]+", "_", self.path.stem).strip("_") + "-"
+
+    def _snapshot_path(self, sha256):
+        return self.snapshot_dir / f"{self._snapshot_prefix()}{sha256[:16]}.pkl"
+
+    def _load_snapshot(self, sha256):
+        try:
+            with open(self._snapshot_path(sha256), "rb") as f:
+                snapshot = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+        if snapshot.get("format_version") != SNAPSHOT_FORMAT_VERSION or snapshot.get("sha256") != sha256:
+            return None
+        return snapshot["sheets"]
+
+    def _save_snapshot(self, sha256, sheets):
+        snapshot_path = self._snapshot_path(sha256)
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = snapshot_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"format_version": SNAPSHOT_FORMAT_VERSION, "sha256": sha256, "sheets": sheets}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+
+        # Older versions of this workbook are never read again
+        for old_path in self.snapshot_dir.glob(f"{self._snapshot_prefix()}*.pkl"):
+            if old_path != snapshot_path:
+                old_path.unlink(missing_ok=True)
+
+    # -- loading -----------------------------------------------------------
+
+    def _current_version(self):
+        stat = os.stat(self.path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _parse(self):
+        sha256 = cached_sha256(self.path) if self.snapshots else None
+        if sha256:
+            sheets = self._load_snapshot(sha256)
+            if sheets is not None:
+                self.stats["snapshot_hits"] += 1
+                return sheets
+
+        sheets = pd.read_excel(self.path, sheet_name=None)
+        self.stats["parsed"] += 1
+        if sha256:
+            self._save_snapshot(sha256, sheets)
+        return sheets
+
+    @property
+    def sheets(self):
+        """Dict of sheet name -> DataFrame (shared - use sheet() for a copy you can modify)"""
+        with self._lock:
+            version = self._current_version()
+            if self._sheets is None or version != self._version:
+                self._sheets = self._parse()
+                self._version = version
+            return self._sheets
+
+    @property
+    def sheet_names(self):
+        return list(self.sheets)
+
+    def sheet(self, sheet_name):
+        """
+        One sheet as pd.read_excel(path, sheet_name=...) returns it
+
+        Raises:
+            ValueError: No sheet by that name (same as pd.read_excel)
+        """
+        sheets = self.sheets
+        if sheet_name not in sheets:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        self.stats["served"] += 1
+        return sheets[sheet_name].copy()
+
+    def summary(self):
+        return (f"Workbook {self.path.name}: {self.stats['served']} sheet reads from "
+                f"{self.stats['parsed']} parses, {self.stats['snapshot_hits']} snapshot hits")
+
+
+def read_sheet(path, sheet_name):
+    """Drop-in for pd.read_excel(path, sheet_name=sheet_name) through the shared loader"""
+    return MasterWorkbook.open(path).sheet(sheet_name)
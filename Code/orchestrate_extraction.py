@@ -14,6 +14,8 @@ from pathlib import Path
 from datetime import datetime
 from typing import Dict, List
 
+from file_catalog import scan_files
+
 # Property configurations
 PROPERTY_CONFIG = {
     'Bella Mirage': {
@@ -109,7 +111,7 @@ def count_invoices():
     for prop_name, config in PROPERTY_CONFIG.items():
         folder_path = Path(config['folder'])
         if folder_path.exists():
-            invoices = list(folder_path.glob('*.pdf')) + list(folder_path.glob('*.PDF'))
+            invoices = scan_files(folder_path, ext='.pdf', recursive=False)
             count = len(invoices)
             expected = config['expected_invoices']
             status = "✓" if count == expected else "⚠️"
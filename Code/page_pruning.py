@@ -0,0 +1,177 @@
+"""
+Page-Pruned Vision Submissions
+Send only the pages of a long invoice PDF that carry charges or totals
+
+Multi-page statements often end with remittance stubs, marketing inserts and
+terms-and-conditions pages. Vision is billed per page, so those pages cost
+tokens and latency without adding a single charge. This stage reads the
+cached text layer (pdf_text), keeps page 1 plus every page with line items
+or totals, writes a slim PDF with pypdf and records the dropped pages.
+
+Pages without a text layer (scans) are always kept, since nothing can be
+said about them. pypdf is optional: without it, or when nothing can be
+dropped, the original PDF is sent unchanged.
+
+Environment:
+    PAGE_PRUNING=off   Always send the whole PDF
+
+USAGE:
+    from page_pruning import prepare_pdf_for_vision
+
+    pdf_data, page_selection = prepare_pdf_for_vision(pdf_path)
+"""
+
+import io
+import os
+import re
+import base64
+
+from pdf_text import get_pdf_text
+from vendor_parsers import LINE_ITEM_FULL, LINE_ITEM_SHORT, NON_CHARGE_LINE
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+ENABLED = os.environ.get("PAGE_PRUNING", "on").lower() not in ("0", "off", "false", "no")
+
+# Pages with this much text are readable; less means a scan or an image page
+MIN_TEXT_CHARS = 40
+
+CHARGE_KEYWORDS = re.compile(
+    r"amount\s*due|total\s*(?:due|charges|current)|current\s*charges|subtotal|"
+    r"invoice\s*(?:number|no|#)|service\s*(?:period|date)|line\s*item|qty|quantity|"
+    r"fuel|surcharge|franchise|overage|contamination|extra\s*pickup|haul|tax",
+    re.IGNORECASE
+)
+DOLLAR_AMOUNT = re.compile(r"\$?\s?-?[\d,]*\d\.\d{2}\b")
+
+# Pages that are boilerplate unless they also carry line items
+BOILERPLATE_PATTERNS = {
+    "remittance stub": re.compile(r"return\s*this\s*portion|remittance|detach\s*and\s*return|make\s*checks?\s*payable", re.IGNORECASE),
+    "terms and conditions": re.compile(r"terms\s*(?:and|&)\s*conditions|late\s*fee\s*policy|arbitration", re.IGNORECASE),
+    "marketing": re.compile(r"go\s*paperless|sign\s*up\s*(?:for|today)|download\s*(?:our|the)\s*app|newsletter|did\s*you\s*know", re.IGNORECASE),
+}
+
+
+def _line_item_count(page_text):
+    count = 0
+    for line in page_text.splitlines():
+        line = line.strip()
+        if not line or NON_CHARGE_LINE.search(line):
+            continue
+        if LINE_ITEM_FULL.match(line) or LINE_ITEM_SHORT.match(line):
+            count += 1
+    return count
+
+
+def page_reason(page_text):
+    """
+    Why a page is kept or dropped
+
+    Returns:
+        (keep, reason)
+    """
+    if len(page_text.strip()) < MIN_TEXT_CHARS:
+        return True, "no text layer"
+
+    line_items = _line_item_count(page_text)
+    if line_items:
+        return True, f"{line_items} line items"
+
+    # A remittance stub repeats the amount due, so boilerplate wins over bare totals
+    for reason, pattern in BOILERPLATE_PATTERNS.items():
+        if pattern.search(page_text):
+            return False, reason
+
+    if CHARGE_KEYWORDS.search(page_text) and DOLLAR_AMOUNT.search(page_text):
+        return True, "totals"
+    return False, "no charges"
+
+
+def select_pages(doc, pages=None):
+    """
+    Page indices to send for one PdfText
+
+    The first page (of the document, or of pages) is always kept: invoice
+    number, property, vendor header.
+
+    Args:
+        doc: PdfText
+        pages: 0-based pages to choose from (default: every page)
+
+    Returns:
+        (kept_indices, dropped) - dropped is a list of {"page": n, "reason": str}
+        with 1-based page numbers
+    """
+    pages = range(doc.page_count) if pages is None else pages
+    kept = []
+    dropped = []
+    for position, index in enumerate(pages):
+        keep, reason = page_reason(doc.page_text(index))
+        if keep or position == 0:
+            kept.append(index)
+        else:
+            dropped.append({"page": index + 1, "reason": reason})
+    return kept, dropped
+
+
+def build_slim_pdf(pdf_path, page_indices):
+    """PDF bytes containing only the given 0-based pages (requires pypdf)"""
+    reader = pypdf.PdfReader(str(pdf_path))
+    writer = pypdf.PdfWriter()
+    for index in page_indices:
+        writer.add_page(reader.pages[index])
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def prepare_pdf_for_vision(pdf_path, pages=None):
+    """
+    Base64 PDF for the vision API, pruned to the pages that matter
+
+    Args:
+        pdf_path: Invoice PDF
+        pages: 0-based pages of one invoice within a multi-invoice statement
+            (see statement_segments); only these are ever sent
+
+    Returns:
+        (pdf_base64, page_selection) - page_selection is None when the whole
+        PDF is sent, otherwise {"total_pages", "kept_pages", "dropped_pages"}
+    """
+    with open(pdf_path, "rb") as f:
+        pdf_bytes = f.read()
+
+    page_selection = None
+    if pypdf is not None and (ENABLED or pages is not None):
+        doc = get_pdf_text(pdf_path)
+        if not doc.error and doc.page_count > 1:
+            candidates = list(range(doc.page_count)) if pages is None else list(pages)
+            if ENABLED:
+                kept, dropped = select_pages(doc, candidates)
+            else:
+                kept, dropped = candidates, []
+            if len(kept) < doc.page_count:
+                try:
+                    pdf_bytes = build_slim_pdf(pdf_path, kept)
+                    page_selection = {
+                        "total_pages": doc.page_count,
+                        "kept_pages": [index + 1 for index in kept],
+                        "dropped_pages": dropped
+                    }
+                except Exception as e:
+                    # The whole PDF is a fair fallback for one invoice, never for one segment of many
+                    if pages is not None:
+                        raise
+                    print(f"      Page pruning failed for {os.path.basename(str(pdf_path))}, sending whole PDF: {e}")
+
+    return base64.b64encode(pdf_bytes).decode("utf-8"), page_selection
+
+
+def selection_summary(page_selection):
+    """Short log fragment like 'sent 2/6 pages'"""
+    if not page_selection:
+        return "sent all pages"
+    return f"sent {len(page_selection['kept_pages'])}/{page_selection['total_pages']} pages"
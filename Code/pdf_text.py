@@ -0,0 +1,356 @@
+"""
+Shared PDF Text Extraction Service
+pdfplumber in a process pool, with a per-PDF timeout and a compressed per-page sidecar cache
+
+pdfplumber is CPU-bound and single-threaded, and several scripts used to
+re-open and re-parse the same PDFs. This service parses each PDF once, keyed
+by its SHA-256, and stores per-page text plus word boxes in a gzip JSON
+sidecar. Address, service-detail, line-item and classification parsers read
+the sidecar instead of touching the PDF again.
+
+Layout:
+    Extraction_Output/.pdf_text_cache/<sha[:2]>/<sha>.json.gz
+
+Environment:
+    PDF_TEXT_CACHE_DIR=<path>   Override sidecar location
+    PDF_TEXT_WORKERS=<n>        Process pool size (default: CPU count)
+    PDF_TEXT_TIMEOUT=60         Seconds allowed per PDF
+
+USAGE:
+    from pdf_text import get_pdf_text, get_pdf_texts
+
+    doc = get_pdf_text(pdf_path)
+    doc.first_page, doc.text, doc.words(0)
+
+    docs = get_pdf_texts(all_pdf_paths)   # parallel, sidecar-cached
+"""
+
+import os
+import gzip
+import json
+import time
+import threading
+import multiprocessing
+from pathlib import Path
+
+from file_hashing import cached_sha256
+
+# Bump when the sidecar layout changes
+SIDECAR_FORMAT_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / "Extraction_Output" / ".pdf_text_cache"
+CACHE_DIR = Path(os.environ.get("PDF_TEXT_CACHE_DIR", DEFAULT_CACHE_DIR))
+MAX_WORKERS = int(os.environ.get("PDF_TEXT_WORKERS", "0")) or (os.cpu_count() or 2)
+PDF_TIMEOUT_SECONDS = float(os.environ.get("PDF_TEXT_TIMEOUT", "60"))
+
+# How often get_many checks on queued PDFs
+POLL_SECONDS = 0.2
+
+
+class PdfText:
+    """Per-page text and word boxes for one PDF"""
+
+    def __init__(self, sha256, pages, error=None, total_pages=None):
+        self.sha256 = sha256
+        self.pages = pages
+        self.error = error
+        # Pages in the PDF; more than len(pages) when only a prefix was parsed
+        self.total_pages = len(pages) if total_pages is None else total_pages
+
+    @property
+    def complete(self):
+        return len(self.pages) >= self.total_pages
+
+    @property
+    def page_count(self):
+        return len(self.pages)
+
+    def page_text(self, index):
+        return self.pages[index]["text"] if index < len(self.pages) else ""
+
+    @property
+    def first_page(self):
+        return self.page_text(0)
+
+    @property
+    def text(self):
+        """All pages joined the same way extract_text_from_pdf() always did"""
+        return "".join(page["text"] + "\n" for page in self.pages if page["text"])
+
+    def words(self, index):
+        """Word boxes for a page as dicts: x0, top, x1, bottom, text"""
+        if index >= len(self.pages):
+            return []
+        return [
+            {"x0": x0, "top": top, "x1": x1, "bottom": bottom, "text": text}
+            for x0, top, x1, bottom, text in self.pages[index]["words"]
+        ]
+
+    def page_size(self, index):
+        page = self.pages[index]
+        return page["width"], page["height"]
+
+
+def _extract_pages(pdf_path, timeout, max_pages=None):
+    """Worker-process entry point: parse every page (or the first max_pages) of one PDF"""
+    import pdfplumber
+
+    deadline = time.monotonic() + timeout
+    pages = []
+
+    with pdfplumber.open(pdf_path) as pdf:
+        total_pages = len(pdf.pages)
+        for page in pdf.pages[:max_pages]:
+            # Cooperative timeout between pages; the pool enforces a hard one
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"exceeded {timeout:.0f}s after {len(pages)} pages")
+
+            words = page.extract_words() or []
+            pages.append({
+                "page": page.page_number,
+                "width": round(float(page.width), 1),
+                "height": round(float(page.height), 1),
+                "text": page.extract_text() or "",
+                "words": [
+                    [round(w["x0"], 1), round(w["top"], 1), round(w["x1"], 1), round(w["bottom"], 1), w["text"]]
+                    for w in words
+                ]
+            })
+
+    return pages, total_pages
+
+
+class _Task:
+    """One PDF queued on the pool"""
+
+    def __init__(self, pdf_path, sha256, result):
+        self.pdf_path = pdf_path
+        self.sha256 = sha256
+        self.result = result
+        # When the pool started working on it (see PdfTextService._mark_running)
+        self.started = None
+
+
+class PdfTextService:
+    """Process-pool text extraction backed by the sidecar cache"""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_workers=MAX_WORKERS, timeout=PDF_TIMEOUT_SECONDS):
+        self.cache_dir = Path(cache_dir)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._pool = None
+        # Unfinished tasks on the current pool, in submission order
+        self._queue = []
+        self._lock = threading.Lock()
+
+    # -- sidecar -----------------------------------------------------------
+
+    def _sidecar_path(self, sha256):
+        return self.cache_dir / sha256[:2] / f"{sha256}.json.gz"
+
+    def _load_sidecar(self, sha256, max_pages=None):
+        try:
+            with gzip.open(self._sidecar_path(sha256), "rt", encoding="utf-8") as f:
+                sidecar = json.load(f)
+        except (OSError, EOFError, json.JSONDecodeError):
+            return None
+        if sidecar.get("format_version") != SIDECAR_FORMAT_VERSION:
+            return None
+
+        doc = PdfText(sha256, sidecar["pages"], total_pages=sidecar.get("total_pages"))
+        # A first-pages-only sidecar cannot answer a full-document request
+        if not doc.complete and (max_pages is None or doc.page_count < min(max_pages, doc.total_pages)):
+            return None
+        return doc
+
+    def _save_sidecar(self, sha256, source_path, pages, total_pages):
+        sidecar_path = self._sidecar_path(sha256)
+        sidecar_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = sidecar_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({
+                "format_version": SIDECAR_FORMAT_VERSION,
+                "sha256": sha256,
+                "source_path": str(source_path),
+                "total_pages": total_pages,
+                "pages": pages
+            }, f)
+        os.replace(tmp_path, sidecar_path)
+
+    # -- process pool ------------------------------------------------------
+
+    def start(self):
+        """
+        Create the process pool now
+
+        Call before starting threads that parse PDFs (run_extractions does):
+        forking a process that already runs other threads can copy a lock one
+        of them holds into the workers and deadlock them. A pool first needed
+        once other threads run is started with "spawn" instead - safe, but
+        slower to start.
+        """
+        with self._lock:
+            self._start_pool()
+        return self
+
+    def _start_pool(self):
+        if self._pool is None:
+            context = multiprocessing.get_context()
+            if context.get_start_method() == "fork" and threading.active_count() > 1:
+                context = multiprocessing.get_context("spawn")
+            self._pool = context.Pool(processes=self.max_workers)
+            self._queue = []
+
+    def _submit(self, pending, max_pages):
+        """Queue (path, sha256) pairs on the current pool; returns (pool, tasks)"""
+        with self._lock:
+            self._start_pool()
+            pool = self._pool
+            tasks = [
+                _Task(pdf_path, sha256, pool.apply_async(_extract_pages, (str(pdf_path), self.timeout, max_pages)))
+                for pdf_path, sha256 in pending
+            ]
+            self._queue.extend(tasks)
+        return pool, tasks
+
+    def _mark_running(self):
+        """
+        Start the clock on tasks the pool is working on now
+
+        The pool hands out tasks in submission order, so the first max_workers
+        unfinished tasks (across every thread using the pool) are the ones
+        running; a task's timeout counts from when it got there, not from
+        when it was queued.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._queue = [task for task in self._queue if not task.result.ready()]
+            for task in self._queue[:self.max_workers]:
+                if task.started is None:
+                    task.started = now
+
+    def _reset_pool(self, pool):
+        """
+        Kill a pool with a hung worker so later PDFs are not stuck behind it
+
+        Only the pool the caller submitted to is terminated: when another
+        batch already replaced it, there is nothing left to do.
+        """
+        with self._lock:
+            if self._pool is pool:
+                self._pool.terminate()
+                self._pool = None
+                self._queue = []
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+                self._queue = []
+
+    # -- public API --------------------------------------------------------
+
+    def get(self, pdf_path, max_pages=None):
+        """PdfText for one PDF (sidecar hit, or parsed in the pool)"""
+        return self.get_many([pdf_path], max_pages=max_pages)[str(pdf_path)]
+
+    def get_many(self, pdf_paths, max_pages=None):
+        """
+        PdfText for every path, parsing cache misses in parallel
+
+        Args:
+            pdf_paths: PDFs to read
+            max_pages: Parse only the first N pages (e.g. 1 for classification).
+                A full sidecar also satisfies a max_pages request.
+
+        Returns:
+            Dict of str(path) -> PdfText. A PDF that fails or runs longer
+            than the timeout gets a PdfText with no pages and .error set (and
+            is not cached).
+        """
+        results = {}
+        pending = []
+
+        for pdf_path in pdf_paths:
+            sha256 = cached_sha256(pdf_path)
+            cached = self._load_sidecar(sha256, max_pages)
+            if cached is not None:
+                results[str(pdf_path)] = cached
+            else:
+                pending.append((pdf_path, sha256))
+
+        while pending:
+            pool, tasks = self._submit(pending, max_pages)
+            pending = []
+
+            while tasks:
+                waiting = []
+                for task in tasks:
+                    if task.result.ready():
+                        self._collect(results, task)
+                    else:
+                        waiting.append(task)
+                tasks = waiting
+                if not tasks:
+                    break
+
+                if self._pool is not pool:
+                    # Another batch reset the pool under us - this work was lost, not slow
+                    pending = [(task.pdf_path, task.sha256) for task in tasks]
+                    break
+
+                self._mark_running()
+                now = time.monotonic()
+                hung = [task for task in tasks if task.started is not None and now - task.started > self.timeout]
+                if hung:
+                    for task in hung:
+                        print(f"   WARNING: Text extraction timed out: {Path(task.pdf_path).name}")
+                        results[str(task.pdf_path)] = PdfText(task.sha256, [], error="timeout")
+                    # Restart the pool and resubmit everything else not finished yet
+                    pending = [(task.pdf_path, task.sha256) for task in tasks if task not in hung]
+                    self._reset_pool(pool)
+                    break
+
+                tasks[0].result.wait(POLL_SECONDS)
+
+        return results
+
+    def _collect(self, results, task):
+        try:
+            pages, total_pages = task.result.get(timeout=0)
+        except Exception as e:
+            print(f"   WARNING: Text extraction failed: {Path(task.pdf_path).name} ({e})")
+            results[str(task.pdf_path)] = PdfText(task.sha256, [], error=str(e))
+            return
+        self._save_sidecar(task.sha256, task.pdf_path, pages, total_pages)
+        results[str(task.pdf_path)] = PdfText(task.sha256, pages, total_pages=total_pages)
+
+
+_default_service = None
+_default_lock = threading.Lock()
+
+
+def default_service():
+    """Process-wide shared PdfTextService"""
+    global _default_service
+    with _default_lock:
+        if _default_service is None:
+            _default_service = PdfTextService()
+        return _default_service
+
+
+def start_pdf_text_pool():
+    """Start the shared service's process pool from the calling thread (see PdfTextService.start)"""
+    return default_service().start()
+
+
+def get_pdf_text(pdf_path, max_pages=None):
+    """Cached PdfText for one PDF via the shared service"""
+    return default_service().get(pdf_path, max_pages=max_pages)
+
+
+def get_pdf_texts(pdf_paths, max_pages=None):
+    """Cached PdfText for many PDFs, parsed in parallel via the shared service"""
+    return default_service().get_many(pdf_paths, max_pages=max_pages)
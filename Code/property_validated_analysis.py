@@ -19,6 +19,8 @@ from openpyxl.utils import get_column_letter
 from datetime import datetime, timedelta
 import json
 
+from invoice_ledger import read_master_sheet
+
 class PropertyAnalyzer:
     """Validate and analyze individual property waste management performance"""
 
@@ -36,14 +38,14 @@ class PropertyAnalyzer:
 
         # Read property-specific tab
         try:
-            df_property = pd.read_excel(self.master_file_path, sheet_name=property_name)
+            df_property = read_master_sheet(property_name, self.master_file_path)
             print(f"[OK] Property tab: {len(df_property)} invoice line items")
         except:
             print(f"[X] Property tab not found")
             df_property = None
 
         # Read Property Overview
-        df_overview = pd.read_excel(self.master_file_path, sheet_name='Property Overview')
+        df_overview = read_master_sheet('Property Overview', self.master_file_path)
         property_overview = df_overview[df_overview['Property Name'] == property_name]
 
         if property_overview.empty:
@@ -51,16 +53,16 @@ class PropertyAnalyzer:
             return None
 
         # Read Service Details
-        df_service = pd.read_excel(self.master_file_path, sheet_name='Service Details')
+        df_service = read_master_sheet('Service Details', self.master_file_path)
         service_details = df_service[df_service['Property'] == property_name]
 
         # Read Contract Terms
-        df_contract = pd.read_excel(self.master_file_path, sheet_name='Contract Terms')
+        df_contract = read_master_sheet('Contract Terms', self.master_file_path)
         contract_terms = df_contract[df_contract['Property'] == property_name]
 
         # Read Spend by Category (if exists)
         try:
-            df_spend = pd.read_excel(self.master_file_path, sheet_name='Spend by Category')
+            df_spend = read_master_sheet('Spend by Category', self.master_file_path)
             spend_data = df_spend[df_spend['Property'] == property_name]
         except:
             spend_data = None
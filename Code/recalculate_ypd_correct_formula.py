@@ -6,15 +6,14 @@ YPD = (Container Size × Number of Containers × Pickups per Week × 4.33) / Num
 """
 
 import pandas as pd
-import openpyxl
 from pathlib import Path
 from datetime import datetime
-import shutil
+
+from workbook_changes import WorkbookChanges
 
 # Paths
 BASE_DIR = Path(__file__).parent.parent
 MASTER_FILE = BASE_DIR / "Portfolio_Reports" / "MASTER_Portfolio_Complete_Data.xlsx"
-BACKUP_FILE = BASE_DIR / "Portfolio_Reports" / f"MASTER_Portfolio_Complete_Data_BACKUP_YPD_FIX_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
 # Property service details with CORRECT YPD calculations
 PROPERTIES = {
@@ -136,73 +135,31 @@ def show_calculations():
     
     return results
 
-def create_backup():
-    """Create a backup of the master file before updating"""
-    
-    print('=' * 80)
-    print('CREATING BACKUP')
-    print('=' * 80)
-    print()
-    
-    if MASTER_FILE.exists():
-        shutil.copy2(MASTER_FILE, BACKUP_FILE)
-        print(f'✅ Backup created: {BACKUP_FILE.name}')
-        print()
-        return True
-    else:
-        print(f'❌ Master file not found: {MASTER_FILE}')
-        return False
-
 def update_ypd_in_master(results):
-    """Update YPD values in master file"""
+    """Update YPD values in master file - one save, one backup"""
     
     print('=' * 80)
     print('UPDATING YPD IN MASTER FILE')
     print('=' * 80)
     print()
     
-    wb = openpyxl.load_workbook(MASTER_FILE)
-    
+    changes = WorkbookChanges(MASTER_FILE, label='YPD_FIX')
+    operations = {}
     for property_name, data in results.items():
-        if property_name not in wb.sheetnames:
-            print(f'  ⚠️ Sheet not found: {property_name}')
-            continue
-        
-        ws = wb[property_name]
-        
-        # Find YPD column (should be in row 1 header)
-        ypd_col = None
-        total_yards_col = None
-        
-        for col in range(1, 50):
-            header = ws.cell(1, col).value
-            if header == 'YPD':
-                ypd_col = col
-            elif header == 'Total Yards':
-                total_yards_col = col
-        
-        if not ypd_col:
-            print(f'  ⚠️ YPD column not found in {property_name}')
-            continue
-        
-        # Update all data rows
-        row = 2
-        rows_updated = 0
-        while ws.cell(row, 1).value:
-            ws.cell(row, ypd_col).value = round(data['ypd'], 2)
-            if total_yards_col:
-                ws.cell(row, total_yards_col).value = round(data['total_monthly_yards'], 2)
-            rows_updated += 1
-            row += 1
-        
-        print(f'  ✅ {property_name}: Updated {rows_updated} rows with YPD = {data["ypd"]:.2f}')
+        operations[property_name] = changes.fill_column(property_name, 'YPD', round(data['ypd'], 2))
+        changes.fill_column(property_name, 'Total Yards', round(data['total_monthly_yards'], 2))
+    changes.commit()
     
-    wb.save(MASTER_FILE)
-    wb.close()
+    for property_name, data in results.items():
+        rows_updated = operations[property_name].result
+        if rows_updated is not None:
+            print(f'  ✅ {property_name}: Updated {rows_updated} rows with YPD = {data["ypd"]:.2f}')
     
     print()
-    print('✅ Master file updated successfully')
+    print(f'✅ {changes.summary()}')
     print()
+    
+    return changes
 
 def verify_updates(results):
     """Verify that YPD was updated correctly"""
@@ -228,7 +185,7 @@ def verify_updates(results):
     
     print()
 
-def create_summary_report(results):
+def create_summary_report(results, changes):
     """Create a summary report of the YPD recalculation"""
     
     report_path = BASE_DIR / 'Portfolio_Reports' / 'YPD_RECALCULATION_SUMMARY.md'
@@ -327,8 +284,8 @@ YPD = (Container Size × Number of Containers × Pickups per Week × 4.33) / Num
 
 ## BACKUP INFORMATION
 
-**Backup File:** """ + BACKUP_FILE.name + """  
-**Location:** Portfolio_Reports/
+**Backup Snapshot:** """ + (changes.backup or "None (no changes written)") + """  
+**Restore:** `python Code/snapshot_store.py restore <snapshot>`
 
 ---
 
@@ -347,19 +304,18 @@ def main():
     # Show calculations
     results = show_calculations()
     
-    # Create backup
-    if not create_backup():
-        print('❌ Cannot proceed without backup')
+    if not MASTER_FILE.exists():
+        print(f'❌ Master file not found: {MASTER_FILE}')
         return
     
-    # Update master file
-    update_ypd_in_master(results)
+    # Update master file (backed up once by the change set)
+    changes = update_ypd_in_master(results)
     
     # Verify updates
     verify_updates(results)
     
     # Create summary report
-    create_summary_report(results)
+    create_summary_report(results, changes)
     
     print('=' * 80)
     print('YPD RECALCULATION COMPLETE')
@@ -9,7 +9,9 @@ import json
 import base64
 from pathlib import Path
 from datetime import datetime
-import anthropic
+
+from structured_output import EXTRACTION_TOOL_NAME, request_structured, schema_from_template
+from vision_client import VisionClient, document_request
 
 # Configuration
 ORION_PROSPER_FOLDER = Path("C:/Users/Richard/Downloads/Orion Data Part 2/Invoices/Orion Prosper Trash Bills")
@@ -21,7 +23,7 @@ ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
 if not ANTHROPIC_API_KEY:
     raise ValueError("ANTHROPIC_API_KEY environment variable not set")
 
-client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+client = VisionClient(api_key=ANTHROPIC_API_KEY)
 
 # Find all PDFs
 pdf_files = sorted(ORION_PROSPER_FOLDER.glob("**/*.pdf"))
@@ -57,9 +59,9 @@ for i, pdf_path in enumerate(pdf_files, 1):
             pdf_data = base64.b64encode(f.read()).decode("utf-8")
 
         # Create extraction prompt
-        prompt = f"""Extract all information from this waste management invoice into structured JSON.
+        prompt = f"""Extract all information from this waste management invoice and record it with the {EXTRACTION_TOOL_NAME} tool.
 
-Return ONLY valid JSON in this exact format:
+The tool input follows this structure:
 {json.dumps(extraction_schema, indent=2)}
 
 For line_items array, include ALL charges with:
@@ -81,41 +83,20 @@ CRITICAL EXTRACTION RULES:
 8. Base service charges should be category "base"
 9. Extra pickups or overages should be category "extra_pickup" or "overage"
 
-Return ONLY the JSON object, no markdown, no explanations, no code blocks."""
+Call {EXTRACTION_TOOL_NAME} once with the complete extraction; do not answer in text."""
 
-        # Call Claude Vision API
-        message = client.messages.create(
+        # Forced tool call: the answer arrives as schema-checked JSON
+        extracted_data, problems = request_structured(
+            client,
+            schema_from_template(extraction_schema),
             model="claude-sonnet-4-20250514",
             max_tokens=4000,
-            messages=[{
-                "role": "user",
-                "content": [
-                    {
-                        "type": "document",
-                        "source": {
-                            "type": "base64",
-                            "media_type": "application/pdf",
-                            "data": pdf_data
-                        }
-                    },
-                    {
-                        "type": "text",
-                        "text": prompt
-                    }
-                ]
-            }]
+            **document_request(pdf_data, prompt)
         )
-
-        response_text = message.content[0].text
-
-        # Clean markdown code blocks if present
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
-
-        # Parse JSON
-        extracted_data = json.loads(response_text)
+        if extracted_data is None:
+            raise ValueError(problems[0])
+        if problems:
+            extracted_data["schema_warnings"] = problems
 
         # Add source file
         extracted_data["source_file"] = pdf_path.name
@@ -129,15 +110,6 @@ Return ONLY the JSON object, no markdown, no explanations, no code blocks."""
         extracted_invoices.append(extracted_data)
         print(f"   SUCCESS: Invoice #{invoice_num} | Date: {invoice_date} | Amount: ${amount} | Items: {line_count}")
 
-    except json.JSONDecodeError as e:
-        print(f"   ERROR: JSON Parse Error: {str(e)}")
-        print(f"   Response: {response_text[:200]}...")
-        failed_extractions.append({
-            "source_file": pdf_path.name,
-            "error_type": "json_parse_error",
-            "error": str(e)
-        })
-
     except Exception as e:
         print(f"   ERROR: Extraction Error: {str(e)}")
         failed_extractions.append({
@@ -175,6 +147,7 @@ print(f"SUCCESS: Successful: {len(extracted_invoices)}/{len(pdf_files)} invoices
 print(f"ERROR: Failed: {len(failed_extractions)}/{len(pdf_files)} invoices")
 print(f" Success Rate: {len(extracted_invoices)/len(pdf_files)*100:.1f}%")
 print(f" Output saved to: {output_file}")
+print(f" {client.summary()}")
 print("="*80)
 
 if failed_extractions:
@@ -8,6 +8,8 @@ import pandas as pd
 from openpyxl import load_workbook
 from openpyxl.utils.dataframe import dataframe_to_rows
 
+from invoice_ledger import read_master_sheet, sync_from_master
+
 def main():
     print("="*80)
     print("REGENERATING SPEND BY CATEGORY SHEET")
@@ -45,7 +47,7 @@ def main():
     for prop in properties:
         try:
             # Read property tab
-            df_prop = pd.read_excel(master_path, sheet_name=prop)
+            df_prop = read_master_sheet(prop, master_path)
 
             # Get unique categories
             categories = df_prop['Category'].unique()
@@ -113,6 +115,7 @@ def main():
     # Save workbook
     wb.save(master_path)
     print(f"Saved: {master_path}")
+    sync_from_master(master_path)
 
     # Verify the three problem properties
     print("\n" + "="*80)
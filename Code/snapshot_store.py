@@ -0,0 +1,424 @@
+"""
+Workbook Snapshot Store
+Content-addressed, deduplicated workbook backups
+
+Every fix script used to leave a full copy of the master workbook behind
+(_BACKUP_YPD_FIX_, _BACKUP_UNITS_FIX_ x4, _BACKUP_AZ_UPDATE_ x2, ...) even
+though each run changes one or two tabs. An XLSX file is a zip with one
+XML part per sheet (plus styles, workbook index, doc properties), so a
+snapshot stores each part by the SHA-256 of its content and a small
+manifest listing the parts. A sheet that did not change between snapshots
+is the same object, stored once; a new snapshot only adds the parts that
+changed. Snapshotting an unchanged workbook is a single (cached) file hash.
+
+Layout:
+    Archive/Snapshots/objects/<sha>                   zlib-compressed part
+    Archive/Snapshots/manifests/<snapshot id>.json.gz parts + sheet names
+
+Restore rebuilds the zip from its parts (every part byte-identical, the
+zip container itself recompressed) and snapshots the file it replaces
+first, so a restore can itself be undone.
+
+Environment:
+    SNAPSHOT_STORE_DIR=<path>   Override store location
+
+USAGE:
+    python Code/snapshot_store.py snapshot [--label YPD_FIX] [workbook ...]
+    python Code/snapshot_store.py list
+    python Code/snapshot_store.py diff <snapshot> [<snapshot or workbook>] [--cells]
+    python Code/snapshot_store.py restore <snapshot> [--output path]
+
+    Old full-copy backups can be folded in with
+    python Code/snapshot_store.py snapshot Archive/Old_Backups/*.xlsx
+"""
+
+import io
+import os
+import re
+import gzip
+import json
+import zlib
+import hashlib
+import zipfile
+import argparse
+from pathlib import Path
+from datetime import datetime
+import xml.etree.ElementTree as ET
+
+import openpyxl
+from openpyxl.utils import get_column_letter
+
+from file_hashing import cached_sha256
+from invoice_ledger import MASTER_FILE, sync_from_master
+
+# Bump when the manifest layout changes
+SNAPSHOT_FORMAT_VERSION = 1
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_STORE_DIR = BASE_DIR / "Archive" / "Snapshots"
+STORE_DIR = Path(os.environ.get("SNAPSHOT_STORE_DIR", DEFAULT_STORE_DIR))
+
+# Label and timestamp of the old full-copy backup names
+BACKUP_NAME = re.compile(r"_BACKUP(?:_(?P<label>[A-Z0-9_]+?))?_(?P<stamp>\d{8}_\d{6})$")
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+DIMENSION = re.compile(rb'<(?:\w+:)?dimension ref="([^"]+)"')
+
+# Changed cells listed per sheet by diff --cells
+CELL_SAMPLE = 5
+
+
+def sheet_parts(parts):
+    """Sheet name -> zip part name, from xl/workbook.xml and its relationships"""
+    if "xl/workbook.xml" not in parts or "xl/_rels/workbook.xml.rels" not in parts:
+        return {}
+    targets = {
+        rel.get("Id"): rel.get("Target")
+        for rel in ET.fromstring(parts["xl/_rels/workbook.xml.rels"]).iter(f"{NS_PKG_REL}Relationship")
+    }
+    sheets = {}
+    for sheet in ET.fromstring(parts["xl/workbook.xml"]).iter(f"{NS_MAIN}sheet"):
+        target = targets.get(sheet.get(f"{NS_REL}id"), "")
+        sheets[sheet.get("name")] = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+    return sheets
+
+
+def sheet_range(data):
+    """Used range of a sheet part ("A1:V96"), read from its <dimension> tag"""
+    match = DIMENSION.search(data[:4096])
+    return match.group(1).decode() if match else None
+
+
+def sheet_index(data):
+    """Sheet name -> {"part", "range"} for a workbook's parts (part name -> bytes)"""
+    return {name: {"part": part, "range": sheet_range(data.get(part, b""))}
+            for name, part in sheet_parts(data).items()}
+
+
+def read_parts(path):
+    """Every part of a workbook: [(ZipInfo, bytes)] in zip order"""
+    with zipfile.ZipFile(path) as zf:
+        return [(info, zf.read(info)) for info in zf.infolist()]
+
+
+class SnapshotStore:
+    """Deduplicated snapshots of workbooks"""
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = Path(store_dir)
+
+    @property
+    def objects_dir(self):
+        return self.store_dir / "objects"
+
+    @property
+    def manifests_dir(self):
+        return self.store_dir / "manifests"
+
+    # -- objects -----------------------------------------------------------
+
+    def _object_path(self, sha256):
+        return self.objects_dir / sha256
+
+    def _write_atomic(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def _put(self, data):
+        """Store a part -> (sha256, bytes added to the store)"""
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self._object_path(sha256)
+        if path.exists():
+            return sha256, 0
+        compressed = zlib.compress(data, 9)
+        self._write_atomic(path, compressed)
+        return sha256, len(compressed)
+
+    def _get(self, sha256):
+        with open(self._object_path(sha256), "rb") as f:
+            data = zlib.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != sha256:
+            raise ValueError(f"Snapshot object {sha256[:12]} is corrupt")
+        return data
+
+    # -- manifests ---------------------------------------------------------
+
+    def snapshots(self, source=None):
+        """Manifests oldest first, optionally only those of one workbook path"""
+        manifests = []
+        for path in self.manifests_dir.glob("*.json.gz"):
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, EOFError, json.JSONDecodeError):
+                continue
+            if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+                continue
+            if source is None or manifest["source"] == str(Path(source).resolve()):
+                manifests.append(manifest)
+        return sorted(manifests, key=lambda manifest: (manifest["created_at"], manifest["id"]))
+
+    def get(self, snapshot_id):
+        """A manifest by id or unique id prefix"""
+        matches = [manifest for manifest in self.snapshots() if manifest["id"].startswith(snapshot_id)]
+        if len(matches) != 1:
+            found = "no" if not matches else f"{len(matches)}"
+            raise KeyError(f"{found} snapshots match {snapshot_id!r}")
+        return matches[0]
+
+    def describe(self, path):
+        """Manifest-shaped description of a workbook on disk (nothing is stored)"""
+        parts = read_parts(path)
+        return {
+            "id": str(path),
+            "path": str(path),
+            "members": [{"name": info.filename, "sha256": hashlib.sha256(content).hexdigest()}
+                        for info, content in parts],
+            "sheets": sheet_index({info.filename: content for info, content in parts})
+        }
+
+    # -- snapshot / restore ------------------------------------------------
+
+    def snapshot(self, path=MASTER_FILE, label=None, created_at=None):
+        """
+        Store the current contents of a workbook
+
+        Args:
+            label: Short tag shown in the list (e.g. the script's old backup name)
+            created_at: Override the timestamp (used when folding in old backups)
+
+        Returns:
+            The manifest - the existing one when the newest snapshot of this
+            path already holds identical contents
+        """
+        path = Path(path).resolve()
+        workbook_sha256 = cached_sha256(path)
+
+        previous = self.snapshots(path)
+        if previous and previous[-1]["workbook_sha256"] == workbook_sha256:
+            return previous[-1]
+
+        parts = read_parts(path)
+        members = []
+        stored_bytes = 0
+        for info, content in parts:
+            sha256, added = self._put(content)
+            stored_bytes += added
+            members.append({
+                "name": info.filename,
+                "sha256": sha256,
+                "size": len(content),
+                "compress_type": info.compress_type,
+                "date_time": list(info.date_time)
+            })
+
+        created_at = created_at or datetime.now()
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "id": f"{created_at.strftime('%Y%m%d_%H%M%S')}-{workbook_sha256[:8]}",
+            "created_at": created_at.isoformat(),
+            "label": label,
+            "source": str(path),
+            "workbook_sha256": workbook_sha256,
+            "workbook_bytes": path.stat().st_size,
+            "stored_bytes": stored_bytes,
+            "members": members,
+            "sheets": sheet_index({info.filename: content for info, content in parts})
+        }
+        self._write_atomic(self.manifests_dir / f"{manifest['id']}.json.gz",
+                           gzip.compress(json.dumps(manifest, separators=(",", ":")).encode("utf-8")))
+        return manifest
+
+    def restore(self, snapshot_id, output_path=None):
+        """
+        Rebuild a snapshot's workbook (by default over the file it came from)
+
+        The file being replaced is snapshotted first. Returns the path written.
+        """
+        manifest = self.get(snapshot_id)
+        target = Path(output_path or manifest["source"])
+
+        if target.exists():
+            self.snapshot(target, label="PRE_RESTORE")
+
+        temp_path = target.with_name(f".{target.stem}.{os.getpid()}.tmp{target.suffix}")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._write_zip(temp_path, manifest)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        os.replace(temp_path, target)
+
+        sync_from_master(target)
+        return target
+
+    def _write_zip(self, file, manifest):
+        with zipfile.ZipFile(file, "w") as zf:
+            for member in manifest["members"]:
+                info = zipfile.ZipInfo(member["name"], date_time=tuple(member["date_time"]))
+                info.compress_type = member["compress_type"]
+                zf.writestr(info, self._get(member["sha256"]))
+
+    def open_workbook(self, manifest):
+        """Read-only openpyxl workbook of a snapshot (or of a describe()d file)"""
+        if "path" in manifest:
+            return openpyxl.load_workbook(manifest["path"], read_only=True)
+        buffer = io.BytesIO()
+        self._write_zip(buffer, manifest)
+        buffer.seek(0)
+        return openpyxl.load_workbook(buffer, read_only=True)
+
+    # -- reporting ---------------------------------------------------------
+
+    def diff(self, old, new, cells=False):
+        """
+        Sheet-level differences between two manifests (see get / describe)
+
+        Args:
+            cells: Also compare cell values of changed sheets (loads both
+                workbooks); a changed sheet with no value changes only
+                differs in formatting or how it was written
+
+        Returns:
+            List of (status, name, detail) - status is added / removed /
+            changed for sheets, "part" for non-sheet parts that changed
+        """
+        old_parts = {member["name"]: member["sha256"] for member in old["members"]}
+        new_parts = {member["name"]: member["sha256"] for member in new["members"]}
+        changed = []
+        changes = []
+
+        for name, sheet in new["sheets"].items():
+            before = old["sheets"].get(name)
+            if before is None:
+                changes.append(("added", name, sheet["range"]))
+            elif old_parts.get(before["part"]) != new_parts.get(sheet["part"]):
+                changed.append(name)
+                detail = sheet["range"] if before["range"] == sheet["range"] else f"{before['range']} -> {sheet['range']}"
+                changes.append(("changed", name, detail))
+        for name, sheet in old["sheets"].items():
+            if name not in new["sheets"]:
+                changes.append(("removed", name, sheet["range"]))
+
+        if cells and changed:
+            old_wb, new_wb = self.open_workbook(old), self.open_workbook(new)
+            details = {name: _cell_changes(old_wb[name], new_wb[name]) for name in changed}
+            old_wb.close()
+            new_wb.close()
+            changes = [(status, name, details[name] if status == "changed" else detail)
+                       for status, name, detail in changes]
+
+        sheet_part_names = {sheet["part"] for sheet in old["sheets"].values()} | \
+                           {sheet["part"] for sheet in new["sheets"].values()}
+        for name in sorted(set(old_parts) | set(new_parts)):
+            if name not in sheet_part_names and old_parts.get(name) != new_parts.get(name):
+                changes.append(("part", name, None))
+        return changes
+
+    def footprint(self):
+        """(bytes in the store, bytes the same snapshots take as full copies, snapshot count)"""
+        manifests = self.snapshots()
+        stored = sum(path.stat().st_size for path in self.objects_dir.glob("*"))
+        stored += sum(path.stat().st_size for path in self.manifests_dir.glob("*.json.gz"))
+        return stored, sum(manifest["workbook_bytes"] for manifest in manifests), len(manifests)
+
+    def summary(self):
+        stored, full_copies, count = self.footprint()
+        if not count:
+            return f"Snapshots: none in {self.store_dir}"
+        return (f"Snapshots: {count} in {stored / 1024:,.0f} KB "
+                f"({full_copies / 1024:,.0f} KB as full copies)")
+
+
+store = SnapshotStore()
+
+
+def backup_label(path):
+    """(label, timestamp) from an old ..._BACKUP_<LABEL>_<YYYYmmdd_HHMMSS>.xlsx name"""
+    match = BACKUP_NAME.search(Path(path).stem)
+    if not match:
+        return None, None
+    return match.group("label") or "BACKUP", datetime.strptime(match.group("stamp"), "%Y%m%d_%H%M%S")
+
+
+def _cell_values(ws):
+    return {
+        (row, column): value
+        for row, values in enumerate(ws.iter_rows(values_only=True), start=1)
+        for column, value in enumerate(values, start=1)
+        if value is not None
+    }
+
+
+def _cell_changes(old_ws, new_ws, sample=CELL_SAMPLE):
+    """Changed-cell summary of one sheet: "3 cells: S2 2.65 -> 2.7, ..." """
+    old_values, new_values = _cell_values(old_ws), _cell_values(new_ws)
+    changed = sorted(key for key in old_values.keys() | new_values.keys()
+                     if old_values.get(key) != new_values.get(key))
+    if not changed:
+        return "same values - formatting only"
+    shown = ", ".join(f"{get_column_letter(column)}{row} {old_values.get((row, column))!r} -> "
+                      f"{new_values.get((row, column))!r}" for row, column in changed[:sample])
+    more = f", ... {len(changed) - sample} more" if len(changed) > sample else ""
+    return f"{len(changed)} cells: {shown}{more}"
+
+
+def _print_diff(changes, old_id, new_id):
+    print(f"{old_id} -> {new_id}")
+    if not changes:
+        print("  No differences")
+    for status, name, detail in changes:
+        print(f"  {status:<8} {name}" + (f"  ({detail})" if detail else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Workbook snapshot store - Orion Portfolio")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    snapshot_parser = subparsers.add_parser("snapshot", help="Snapshot workbooks (default: the master file)")
+    snapshot_parser.add_argument("paths", nargs="*", type=Path, default=[MASTER_FILE])
+    snapshot_parser.add_argument("--label", default=None)
+    list_parser = subparsers.add_parser("list", help="List snapshots")
+    list_parser.add_argument("--source", type=Path, default=None, help="Only snapshots of this workbook")
+    diff_parser = subparsers.add_parser("diff", help="Sheets changed between two snapshots (or a workbook)")
+    diff_parser.add_argument("old")
+    diff_parser.add_argument("new", nargs="?", default=None, help="Snapshot id or workbook path (default: its source)")
+    diff_parser.add_argument("--cells", action="store_true", help="List changed cell values")
+    restore_parser = subparsers.add_parser("restore", help="Rebuild a snapshot's workbook")
+    restore_parser.add_argument("snapshot")
+    restore_parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        for path in args.paths:
+            label, created_at = backup_label(path)
+            manifest = store.snapshot(path, label=args.label or label, created_at=created_at)
+            print(f"OK: {Path(path).name} -> {manifest['id']} "
+                  f"({manifest['stored_bytes'] / 1024:,.1f} KB new of {manifest['workbook_bytes'] / 1024:,.0f} KB)")
+
+    elif args.command == "list":
+        for manifest in store.snapshots(args.source):
+            print(f"{manifest['id']}  {manifest['created_at'][:19]}  {manifest['label'] or '-':<16} "
+                  f"{len(manifest['sheets']):>3} sheets  {manifest['stored_bytes'] / 1024:>7,.1f} KB new  "
+                  f"{Path(manifest['source']).name}")
+
+    elif args.command == "diff":
+        old = store.get(args.old)
+        if args.new is None or Path(args.new).exists():
+            new_path = Path(args.new or old["source"])
+            new = store.describe(new_path)
+            new_id = new_path.name
+        else:
+            new = store.get(args.new)
+            new_id = new["id"]
+        _print_diff(store.diff(old, new, cells=args.cells), old["id"], new_id)
+
+    elif args.command == "restore":
+        print(f"OK: Restored {args.snapshot} to {store.restore(args.snapshot, args.output)}")
+
+    print(store.summary())
@@ -0,0 +1,275 @@
+"""
+Multi-Invoice Statement Segmentation
+Split PDFs that bundle several invoices into per-invoice extraction units
+
+TCAM statements and city utility bills (City of McKinney, City of Mesa)
+carry several billing periods or service accounts in one PDF, but one
+extraction call returns one "invoice" object, so everything after the first
+invoice was silently dropped. This stage reads the cached text layer
+(pdf_text), finds invoice boundaries from the identifiers printed on each
+page (invoice number, account number, statement/bill date, "Page 1 of N"),
+and turns each segment into its own unit of work for run_extractions().
+Results are tagged with provenance (source file + pages) and can be
+re-assembled per source PDF with reassemble_statements().
+
+Pages without identifiers (continuations, remittance stubs) stay with the
+invoice before them. A PDF with fewer than two distinct invoices, no text
+layer, or no pypdf to cut segment PDFs is left as a single unit.
+
+Environment:
+    STATEMENT_SPLITTING=off   Never split; one unit per PDF
+
+USAGE:
+    from statement_segments import split_into_units, reassemble_statements
+
+    units = split_into_units(invoice_paths)
+    results = run_extractions(units, process_invoice, describe=lambda unit: unit.name)
+"""
+
+import os
+import re
+from pathlib import Path
+
+from pdf_text import get_pdf_texts
+from page_pruning import pypdf
+
+ENABLED = os.environ.get("STATEMENT_SPLITTING", "on").lower() not in ("0", "off", "false", "no")
+
+# Identifiers that distinguish one invoice from the next, in the order they are reported
+BOUNDARY_FIELDS = ("invoice_number", "account_number", "statement_date")
+
+BOUNDARY_PATTERNS = {
+    "invoice_number": re.compile(
+        r"invoice\s*(?:number|no\.?|#)\s*[:#.]?\s*([A-Z0-9-]*\d[A-Z0-9-]*)", re.IGNORECASE),
+    "account_number": re.compile(
+        r"(?:account|acct\.?)\s*(?:number|no\.?|#)\s*[:#.]?\s*(\d[\d -]{2,}\d)", re.IGNORECASE),
+    "statement_date": re.compile(
+        r"(?:statement|invoice|bill(?:ing)?)\s*date\s*[:#.]?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})", re.IGNORECASE),
+}
+
+# First page of a new invoice within a bundle
+PAGE_ONE = re.compile(r"\bpage\s*1\s*of\s*\d+\b", re.IGNORECASE)
+
+MIN_IDENTIFIER_LENGTH = 4
+
+
+def _normalize(value):
+    return re.sub(r"[\s-]+", "", value).upper()
+
+
+def page_markers(page_text):
+    """Boundary identifiers found on one page (None when absent)"""
+    markers = {"page_one": bool(PAGE_ONE.search(page_text))}
+    for field, pattern in BOUNDARY_PATTERNS.items():
+        match = pattern.search(page_text)
+        value = _normalize(match.group(1)) if match else None
+        if field != "statement_date" and value and len(value) < MIN_IDENTIFIER_LENGTH:
+            value = None
+        markers[field] = value
+    return markers
+
+
+def _starts_new_segment(segment, markers):
+    shared = [field for field in BOUNDARY_FIELDS if segment[field] and markers[field]]
+    if any(segment[field] != markers[field] for field in shared):
+        return True
+    # "Page 1 of N" opens a new invoice unless the page repeats this one's identifiers
+    has_identifier = any(markers[field] for field in BOUNDARY_FIELDS)
+    return bool(markers["page_one"] and has_identifier and not shared and segment["pages"])
+
+
+def find_segments(doc):
+    """
+    Invoice boundaries in one PdfText
+
+    Returns:
+        List of {"pages": [0-based indices], "invoice_number", "account_number",
+        "statement_date"}; a single segment covering every page when the
+        document holds one invoice
+    """
+    segments = []
+    current = None
+    for index in range(doc.page_count):
+        markers = page_markers(doc.page_text(index))
+        if current is None or _starts_new_segment(current, markers):
+            current = {"pages": [], **{field: None for field in BOUNDARY_FIELDS}}
+            segments.append(current)
+        current["pages"].append(index)
+        for field in BOUNDARY_FIELDS:
+            current[field] = current[field] or markers[field]
+
+    # A leading cover page without identifiers belongs to the first invoice
+    if len(segments) > 1 and not any(segments[0][field] for field in BOUNDARY_FIELDS):
+        segments[1]["pages"] = segments[0]["pages"] + segments[1]["pages"]
+        segments.pop(0)
+
+    if len(segments) < 2:
+        return [{"pages": list(range(doc.page_count)), **{field: None for field in BOUNDARY_FIELDS}}]
+    return segments
+
+
+def page_range_label(pages):
+    """'3' or '3-5' for 1-based page numbers"""
+    first, last = pages[0], pages[-1]
+    return str(first) if first == last else f"{first}-{last}"
+
+
+class ExtractionUnit:
+    """One invoice to extract: a whole PDF or one segment of a statement"""
+
+    def __init__(self, item, path, pages=None, index=0, count=1, boundary=None, total_pages=None):
+        self.item = item
+        self.path = Path(path)
+        # 0-based pages of the segment; None means the whole PDF
+        self.pages = pages
+        self.index = index
+        self.count = count
+        self.boundary = boundary or {}
+        self.total_pages = total_pages
+
+    @property
+    def segmented(self):
+        return self.pages is not None
+
+    @property
+    def page_numbers(self):
+        return [page + 1 for page in self.pages] if self.segmented else None
+
+    @property
+    def key(self):
+        """Stable id for journals and result maps ('<path>' or '<path>#pages=3-5')"""
+        if not self.segmented:
+            return str(self.path)
+        return f"{self.path}#pages={page_range_label(self.page_numbers)}"
+
+    @property
+    def name(self):
+        if not self.segmented:
+            return self.path.name
+        return f"{self.path.name} [pages {page_range_label(self.page_numbers)}]"
+
+    def provenance(self):
+        """Where a segment's extraction came from"""
+        return {
+            "source_file": self.path.name,
+            "source_path": str(self.path),
+            "pages": self.page_numbers,
+            "total_pages": self.total_pages,
+            "segment": self.index + 1,
+            "segment_count": self.count,
+            "boundary": self.boundary
+        }
+
+    def attach_provenance(self, extraction):
+        """Tag a segment's extraction with its provenance (whole-PDF results are left as they are)"""
+        if extraction is not None and self.segmented:
+            extraction["provenance"] = self.provenance()
+        return extraction
+
+
+def split_into_units(items, path=lambda item: item):
+    """
+    Expand PDFs into extraction units, one per invoice they contain
+
+    Args:
+        items: Work items (PDF paths, scan dicts, ...)
+        path: Callable giving an item's PDF path
+
+    Returns:
+        List of ExtractionUnit in input order (a statement's segments in page order)
+    """
+    items = list(items)
+    if not ENABLED or pypdf is None or not items:
+        return [ExtractionUnit(item, path(item)) for item in items]
+
+    docs = get_pdf_texts([path(item) for item in items])
+
+    units = []
+    split_count = 0
+    for item in items:
+        pdf_path = path(item)
+        doc = docs[str(pdf_path)]
+        segments = find_segments(doc) if not doc.error and doc.page_count > 1 else []
+
+        if len(segments) < 2:
+            units.append(ExtractionUnit(item, pdf_path))
+            continue
+
+        split_count += 1
+        for index, segment in enumerate(segments):
+            boundary = {field: segment[field] for field in BOUNDARY_FIELDS if segment[field]}
+            units.append(ExtractionUnit(item, pdf_path, pages=segment["pages"], index=index,
+                                        count=len(segments), boundary=boundary,
+                                        total_pages=doc.page_count))
+
+    if split_count:
+        print(f"   Statements: split {split_count} multi-invoice PDFs into "
+              f"{sum(1 for unit in units if unit.segmented)} extraction units")
+    return units
+
+
+def _amount(value):
+    try:
+        return float(str(value).replace("$", "").replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def reassemble_statements(units, extractions):
+    """
+    Group segment extractions back under their source PDFs
+
+    Args:
+        units: ExtractionUnits as returned by split_into_units
+        extractions: extracted_data dicts (or None) in the same order
+
+    Returns:
+        One row per split PDF: {"source_file", "source_path", "total_pages",
+        "segment_count", "extracted", "amount_due_total", "segments": [...]}
+        where each segment lists its pages, boundary identifiers and the
+        extracted invoice number / amount due
+    """
+    statements = {}
+    for unit, extraction in zip(units, extractions):
+        if not unit.segmented:
+            continue
+
+        statement = statements.setdefault(unit.path, {
+            "source_file": unit.path.name,
+            "source_path": str(unit.path),
+            "total_pages": unit.total_pages,
+            "segment_count": unit.count,
+            "extracted": 0,
+            "amount_due_total": 0.0,
+            "segments": []
+        })
+
+        invoice = (extraction or {}).get("invoice") or {}
+        amount_due = _amount(invoice.get("amount_due"))
+        if extraction is not None:
+            statement["extracted"] += 1
+        if amount_due is not None:
+            statement["amount_due_total"] += amount_due
+
+        statement["segments"].append({
+            "segment": unit.index + 1,
+            "pages": unit.page_numbers,
+            "boundary": unit.boundary,
+            "invoice_number": invoice.get("invoice_number"),
+            "amount_due": invoice.get("amount_due"),
+            "extracted": extraction is not None
+        })
+
+    for statement in statements.values():
+        statement["amount_due_total"] = f"{statement['amount_due_total']:.2f}"
+    return list(statements.values())
+
+
+def statements_summary(statements):
+    """One-line count of split statements and their recovered invoices"""
+    if not statements:
+        return "Statements: no multi-invoice PDFs"
+    segments = sum(statement["segment_count"] for statement in statements)
+    extracted = sum(statement["extracted"] for statement in statements)
+    return (f"Statements: {len(statements)} multi-invoice PDFs, "
+            f"{extracted}/{segments} invoices extracted")
@@ -0,0 +1,331 @@
+"""
+Schema-Enforced Structured Output
+Tool-call extraction, truncation handling and one shared validator for every extractor
+
+Extractors used to ask for "ONLY valid JSON", strip ```json fences with
+string splits and json.loads() the rest; stray prose or output cut off at
+max_tokens failed the whole invoice. Instead, the extraction_schema template
+is converted to a JSON Schema and offered as a forced tool call, so the
+model's answer arrives as an already-parsed tool input.
+
+Truncation: a tool call cut off at max_tokens cannot be resumed (the API
+does not accept a partial tool input back), so a truncated call is re-issued
+once with a larger output budget. Tools and instructions sit in the cached
+prompt prefix (see vision_client.document_request), so only the document
+itself is re-read.
+
+Malformed output never fails an extraction outright: validate() coerces
+trivial type slips (1250.0 vs "1250.00" for amounts; rates such as
+unit_rate keep their sub-cent digits) and returns the remaining problems
+as warnings for validate_extraction() to flag for review.
+
+Environment:
+    STRUCTURED_MAX_OUTPUT_TOKENS=16000   Ceiling for the truncation retry
+
+USAGE:
+    from structured_output import request_structured, schema_from_template
+
+    schema = schema_from_template(extraction_schema)
+    data, problems = request_structured(client, schema, model=MODEL, max_tokens=4000,
+                                        **document_request(pdf_data, prompt))
+"""
+
+import os
+import re
+import json
+
+MAX_OUTPUT_TOKENS = int(os.environ.get("STRUCTURED_MAX_OUTPUT_TOKENS", "16000"))
+
+EXTRACTION_TOOL_NAME = "record_extraction"
+
+NULLABLE_SCALAR = {"type": ["string", "number", "integer", "boolean", "null"]}
+NULLABLE_STRING = {"type": ["string", "null"]}
+NULLABLE_NUMBER = {"type": ["number", "null"]}
+
+# Item schemas for list fields, keyed by field name (lists are empty in the templates)
+LINE_ITEM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "date": NULLABLE_STRING,
+        "description": NULLABLE_STRING,
+        "category": NULLABLE_STRING,
+        "quantity": NULLABLE_NUMBER,
+        "uom": NULLABLE_STRING,
+        "container_size_yd": NULLABLE_NUMBER,
+        "container_type": NULLABLE_STRING,
+        "frequency_per_week": NULLABLE_NUMBER,
+        "unit_rate": NULLABLE_STRING,
+        "extended_amount": NULLABLE_STRING,
+        "notes": NULLABLE_STRING
+    },
+    "required": ["description", "extended_amount"]
+}
+
+SERVICE_SCHEDULE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "container_type": NULLABLE_STRING,
+        "container_size_yd": NULLABLE_NUMBER,
+        "quantity": NULLABLE_NUMBER,
+        "frequency_per_week": NULLABLE_NUMBER,
+        "monthly_rate": NULLABLE_SCALAR
+    }
+}
+
+CHARGE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "description": NULLABLE_STRING,
+        "amount": NULLABLE_SCALAR
+    }
+}
+
+ARRAY_ITEM_SCHEMAS = {
+    "line_items": LINE_ITEM_SCHEMA,
+    "service_schedules": SERVICE_SCHEDULE_SCHEMA,
+    "base_charges": CHARGE_SCHEMA,
+    "additional_charges": CHARGE_SCHEMA,
+    "validation_flags": {"type": "string"}
+}
+
+# Fields the prompts ask for as strings ("1250.00", "2025-01-31") when the template leaves them null
+STRING_FIELDS = {
+    "invoice_number", "invoice_date", "due_date", "amount_due", "subtotal", "taxes",
+    "previous_balance", "payments", "start_date", "end_date", "month_year", "raw",
+    "vendor_account_number", "effective_date", "expiration_date"
+}
+
+# Money fields rounded to cents when a number arrives for a string field
+AMOUNT_FIELDS = {
+    "amount_due", "subtotal", "taxes", "previous_balance", "payments", "extended_amount",
+    "amount", "monthly_rate", "monthly_total", "annual_total", "total_amount"
+}
+
+
+def schema_from_template(template, array_items=None):
+    """
+    JSON Schema for an extraction_schema-style example dict
+
+    None -> nullable string for STRING_FIELDS, otherwise any nullable scalar;
+    "" or "text" -> nullable string,
+    numbers -> nullable number, dicts -> objects with every key required
+    (values may be null), lists -> arrays whose item schema comes from
+    array_items / ARRAY_ITEM_SCHEMAS by field name, or from the first example
+    element.
+    """
+    array_items = {**ARRAY_ITEM_SCHEMAS, **(array_items or {})}
+
+    def convert(value, name=None):
+        if isinstance(value, dict):
+            return {
+                "type": "object",
+                "properties": {key: convert(child, key) for key, child in value.items()},
+                "required": list(value.keys())
+            }
+        if isinstance(value, list):
+            if name in array_items:
+                items = array_items[name]
+            elif value:
+                items = convert(value[0])
+            else:
+                items = {}
+            return {"type": "array", "items": items}
+        if isinstance(value, bool):
+            return {"type": ["boolean", "null"]}
+        if isinstance(value, (int, float)):
+            return NULLABLE_NUMBER
+        if isinstance(value, str) or name in STRING_FIELDS:
+            return NULLABLE_STRING
+        return NULLABLE_SCALAR
+
+    return convert(template)
+
+
+def packed_schema(document_schema):
+    """Schema for one request carrying several documents: {"documents": [one result per document]}"""
+    return {
+        "type": "object",
+        "properties": {"documents": {"type": "array", "items": document_schema}},
+        "required": ["documents"]
+    }
+
+
+def extraction_tool(input_schema, name=EXTRACTION_TOOL_NAME):
+    """Tool definition the model is forced to call with the extracted data"""
+    return {
+        "name": name,
+        "description": "Record the data extracted from the document. "
+                       "Use null for any field that cannot be found.",
+        "input_schema": input_schema
+    }
+
+
+# -- validation ------------------------------------------------------------
+
+_JSON_TYPES = {
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+    "object": dict,
+    "array": list,
+    "null": type(None)
+}
+
+_NUMBER_TEXT = re.compile(r"^\s*\$?\s*-?[\d,]*\.?\d+\s*$")
+
+
+def _matches(value, type_name):
+    if type_name in ("number", "integer") and isinstance(value, bool):
+        return False
+    return isinstance(value, _JSON_TYPES[type_name])
+
+
+def _coerce(value, types, name=None):
+    """Fix the common slips: numbers where strings are expected and vice versa"""
+    if "string" in types and isinstance(value, (int, float)) and not isinstance(value, bool):
+        if name in AMOUNT_FIELDS:
+            return f"{value:.2f}", True
+        # Rates and identifiers: no float noise, but no rounding to cents either
+        return f"{value:.12g}" if isinstance(value, float) else str(value), True
+    if ("number" in types or "integer" in types) and isinstance(value, str) and _NUMBER_TEXT.match(value):
+        number = float(value.replace("$", "").replace(",", ""))
+        return (int(number) if "number" not in types else number), True
+    if "null" in types and value == "":
+        return None, True
+    return value, False
+
+
+def validate(data, schema, coerce=True, path="$", name=None):
+    """
+    Check data against a (small subset of) JSON Schema
+
+    Supports type (single or list), properties, required, items and enum,
+    which is all schema_from_template() emits. With coerce=True trivial type
+    mismatches are repaired in place.
+
+    Returns:
+        (data, problems) - problems is a list of "path: message" strings
+    """
+    problems = []
+
+    types = schema.get("type")
+    if types is not None:
+        types = [types] if isinstance(types, str) else types
+        if not any(_matches(data, type_name) for type_name in types):
+            fixed = False
+            if coerce:
+                data, fixed = _coerce(data, types, name)
+            if not fixed:
+                problems.append(f"{path}: expected {'/'.join(types)}, got {type(data).__name__}")
+                return data, problems
+
+    if "enum" in schema and data not in schema["enum"]:
+        problems.append(f"{path}: {data!r} not one of {schema['enum']}")
+
+    if isinstance(data, dict):
+        for key in schema.get("required", []):
+            if key not in data:
+                problems.append(f"{path}.{key}: missing")
+        for key, child_schema in schema.get("properties", {}).items():
+            if key in data:
+                data[key], child_problems = validate(data[key], child_schema, coerce, f"{path}.{key}", key)
+                problems.extend(child_problems)
+
+    elif isinstance(data, list) and schema.get("items"):
+        for index, item in enumerate(data):
+            data[index], item_problems = validate(item, schema["items"], coerce, f"{path}[{index}]")
+            problems.extend(item_problems)
+
+    return data, problems
+
+
+def parse_json_text(text):
+    """
+    Best-effort JSON from free text (for responses that did not use the tool)
+
+    Handles ```json fences and prose around the object. Returns None if no
+    JSON object can be recovered.
+    """
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        return json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+
+
+# -- request ---------------------------------------------------------------
+
+def _tool_input(message, tool_name):
+    for block in message.content:
+        if getattr(block, "type", None) == "tool_use" and getattr(block, "name", None) == tool_name:
+            return block.input
+    text = "".join(getattr(block, "text", "") for block in message.content)
+    return parse_json_text(text)
+
+
+def structured_params(schema, max_tokens=4000, **request):
+    """Request kwargs that force the extraction tool call (for create_message or a batch entry)"""
+    tool = extraction_tool(schema)
+    return {
+        **request,
+        "max_tokens": max_tokens,
+        "tools": [tool],
+        "tool_choice": {"type": "tool", "name": tool["name"]}
+    }
+
+
+def read_structured(message, schema):
+    """
+    Schema-checked data from one response
+
+    Returns:
+        (data, problems); data is None when no JSON came back at all
+    """
+    truncated = getattr(message, "stop_reason", None) == "max_tokens"
+    data = _tool_input(message, EXTRACTION_TOOL_NAME)
+    if data is None:
+        return None, ["no structured output in response" + (" (truncated)" if truncated else "")]
+
+    data, problems = validate(data, schema)
+    if truncated:
+        output_tokens = getattr(getattr(message, "usage", None), "output_tokens", None)
+        problems.append(f"$: output truncated at {output_tokens} tokens")
+    return data, problems
+
+
+def request_structured(client, schema, max_tokens=4000, max_output_tokens=MAX_OUTPUT_TOKENS, **request):
+    """
+    One extraction call that returns schema-checked data
+
+    Args:
+        client: VisionClient
+        schema: JSON Schema for the result (see schema_from_template)
+        max_tokens: Initial output budget
+        max_output_tokens: Budget for the single retry after a truncated call
+        **request: model, system, messages, ... for client.create_message
+
+    Returns:
+        (data, problems). data is None only when no JSON came back at all;
+        problems lists schema mismatches and truncation for review.
+    """
+    budget = max_tokens
+
+    while True:
+        message = client.create_message(**structured_params(schema, budget, **request))
+        truncated = getattr(message, "stop_reason", None) == "max_tokens"
+        if not truncated or budget >= max_output_tokens:
+            break
+
+        client.count_truncation()
+        print(f"      Output truncated at {budget} tokens, retrying with {max_output_tokens}")
+        budget = max_output_tokens
+
+    return read_structured(message, schema)
@@ -0,0 +1,177 @@
+"""
+Tiered Invoice Extraction
+Text-first fast path: parse the PDF text layer locally, escalate to vision only when needed
+
+Tier 1 ("text"): cached text layer (pdf_text) + regex parsing (milliseconds, no API cost)
+Tier 2 ("vision"): Claude Vision extraction (seconds, billed per page)
+
+A text result is accepted only when validate_extraction() scores it at or
+above TEXT_TIER_MIN_CONFIDENCE, nothing critical is missing, and the line
+items add up to amount_due within $1.00. Every result is tagged with
+"extraction_tier" so runs can report how many invoices skipped the API.
+"""
+
+import os
+import re
+import json
+import threading
+from pathlib import Path
+
+from pdf_text import get_pdf_text
+import vendor_parsers
+
+TEXT_TIER_MIN_CONFIDENCE = float(os.environ.get("TEXT_TIER_MIN_CONFIDENCE", "0.85"))
+LINE_ITEM_TOLERANCE = 1.00
+
+PROPERTY_CONFIG_FILE = Path(__file__).resolve().parent / "property_config.json"
+
+_tier_counts = {"text": 0, "vision": 0}
+_tier_lock = threading.Lock()
+
+
+def load_property_names():
+    """Known property names, longest first so 'Orion Prosper Lakes' beats 'Orion Prosper'"""
+    try:
+        with open(PROPERTY_CONFIG_FILE, "r", encoding="utf-8") as f:
+            names = list(json.load(f)["properties"].keys())
+    except (OSError, KeyError, json.JSONDecodeError):
+        names = []
+    return sorted(names, key=len, reverse=True)
+
+
+PROPERTY_NAMES = load_property_names()
+
+
+def _squash(text):
+    """Lowercase with whitespace/underscores removed (Republic text runs words together)"""
+    return re.sub(r"[\s_]+", "", text.lower())
+
+
+def detect_property_name(text, pdf_path):
+    """Match a known property name in the invoice text, then in the folder path"""
+    squashed_text = _squash(text)
+    squashed_path = _squash(str(Path(pdf_path).parent))
+
+    for haystack in (squashed_text, squashed_path):
+        for name in PROPERTY_NAMES:
+            if _squash(name) in haystack:
+                return name
+    return None
+
+
+def parse_invoice_text(pdf_path, pages=None):
+    """
+    Tier 1: parse an invoice from its text layer into the extraction_schema shape
+
+    The vendor is auto-detected and parsed by the vendor_parsers registry.
+    pages limits parsing to one invoice of a multi-invoice statement (0-based).
+    Returns None when the PDF has no usable text layer (scanned image).
+    """
+    pdf_path = Path(pdf_path)
+    doc = get_pdf_text(pdf_path)
+    if pages is None:
+        text, first_page = doc.text, doc.first_page
+    else:
+        text = "".join(doc.page_text(index) + "\n" for index in pages if doc.page_text(index))
+        first_page = doc.page_text(pages[0])
+    if not text.strip():
+        return None
+
+    extracted_data = vendor_parsers.parse_invoice_text(
+        text,
+        pdf_path.name,
+        first_page_text=first_page,
+        property_name=detect_property_name(text, pdf_path)
+    )
+    extracted_data["extraction_tier"] = "text"
+    return extracted_data
+
+
+def line_items_reconcile(extracted_data):
+    """True when line items are present and sum to amount_due within tolerance"""
+    invoice = extracted_data.get("invoice") or {}
+    line_items = invoice.get("line_items") or []
+    if not line_items or invoice.get("amount_due") in (None, ""):
+        return False
+
+    try:
+        line_total = sum(float(item.get("extended_amount") or 0) for item in line_items)
+        return abs(line_total - float(invoice["amount_due"])) <= LINE_ITEM_TOLERANCE
+    except (TypeError, ValueError):
+        return False
+
+
+def _confidence(validation):
+    return validation.get("confidence_score", validation.get("confidence", 0.0))
+
+
+def _count_tier(tier):
+    with _tier_lock:
+        _tier_counts[tier] += 1
+
+
+def try_text_tier(pdf_path, validate, min_confidence=TEXT_TIER_MIN_CONFIDENCE, pages=None):
+    """
+    Tier 1 on its own: the text-layer result when it can be trusted, else None
+
+    Accepted results are counted towards tier_summary().
+    """
+    try:
+        text_result = parse_invoice_text(pdf_path, pages)
+    except Exception as e:
+        print(f"      Text tier failed for {Path(pdf_path).name}: {e}")
+        return None
+
+    if text_result is None:
+        return None
+
+    validation = validate(text_result)
+    if (_confidence(validation) >= min_confidence
+            and not validation.get("critical_missing")
+            and line_items_reconcile(text_result)):
+        _count_tier("text")
+        return text_result
+    return None
+
+
+def mark_vision_result(extracted_data):
+    """Tag and count an extraction that came from the vision tier"""
+    if extracted_data is not None:
+        extracted_data["extraction_tier"] = "vision"
+        _count_tier("vision")
+    return extracted_data
+
+
+def extract_invoice_tiered(pdf_path, vision_extract, validate, min_confidence=TEXT_TIER_MIN_CONFIDENCE,
+                           pages=None):
+    """
+    Try the local text parser first; fall back to vision_extract(pdf_path)
+
+    Args:
+        pdf_path: Invoice PDF
+        vision_extract: Callable(pdf_path) -> (extracted_data, error)
+        validate: validate_extraction-style callable returning a dict with
+            confidence_score (or confidence) and critical_missing
+        min_confidence: Lowest text-tier confidence accepted without escalation
+        pages: 0-based pages of one statement segment (vision_extract must
+            send the same pages)
+
+    Returns:
+        (extracted_data, error) like the vision extractors, with
+        extracted_data["extraction_tier"] set to "text" or "vision"
+    """
+    text_result = try_text_tier(pdf_path, validate, min_confidence, pages)
+    if text_result is not None:
+        return text_result, None
+
+    extracted_data, error = vision_extract(pdf_path)
+    return mark_vision_result(extracted_data), error
+
+
+def tier_summary():
+    """One-line count of invoices resolved per tier"""
+    with _tier_lock:
+        text, vision = _tier_counts["text"], _tier_counts["vision"]
+    total = text + vision
+    skipped = (text / total * 100) if total else 0
+    return f"Tiers: {text} text, {vision} vision ({skipped:.0f}% skipped the API)"
@@ -5,15 +5,14 @@ This script updates unit counts for Arizona properties and recalculates YPD valu
 """
 
 import pandas as pd
-import openpyxl
 from pathlib import Path
 from datetime import datetime
-import shutil
+
+from workbook_changes import WorkbookChanges
 
 # Paths
 BASE_DIR = Path(__file__).parent.parent
 MASTER_FILE = BASE_DIR / "Portfolio_Reports" / "MASTER_Portfolio_Complete_Data.xlsx"
-BACKUP_FILE = BASE_DIR / "Portfolio_Reports" / f"MASTER_Portfolio_Complete_Data_BACKUP_UNITS_FIX_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
 # Corrected unit counts from user
 CORRECTED_UNITS = {
@@ -122,76 +121,28 @@ def show_corrections():
     
     return results
 
-def create_backup():
-    """Create a backup of the master file before updating"""
-    
-    print('=' * 80)
-    print('CREATING BACKUP')
-    print('=' * 80)
-    print()
-    
-    if MASTER_FILE.exists():
-        shutil.copy2(MASTER_FILE, BACKUP_FILE)
-        print(f'✅ Backup created: {BACKUP_FILE.name}')
-        print()
-        return True
-    else:
-        print(f'❌ Master file not found: {MASTER_FILE}')
-        return False
-
 def update_units_and_ypd(results):
-    """Update unit counts and YPD in master file"""
+    """Update YPD in every row of each property tab - one save, one backup"""
     
     print('=' * 80)
     print('UPDATING MASTER FILE')
     print('=' * 80)
     print()
     
-    wb = openpyxl.load_workbook(MASTER_FILE)
+    changes = WorkbookChanges(MASTER_FILE, label='UNITS_FIX')
+    operations = {
+        property_name: changes.fill_column(property_name, 'YPD', round(data['new_ypd'], 2))
+        for property_name, data in results.items()
+    }
+    changes.commit()
     
     for property_name, data in results.items():
-        if property_name not in wb.sheetnames:
-            print(f'  ⚠️ Sheet not found: {property_name}')
+        rows_updated = operations[property_name].result
+        if rows_updated is None:
             continue
         
-        ws = wb[property_name]
-        
         print(f'Updating: {property_name}')
         print('-' * 80)
-        
-        # Find header row
-        header_row = None
-        for row in range(1, 10):
-            cell_value = ws.cell(row, 1).value
-            if cell_value and ('Property' in str(cell_value)):
-                header_row = row
-                break
-        
-        if not header_row:
-            print(f'  ❌ Could not find header row')
-            continue
-        
-        # Find YPD column
-        ypd_col = None
-        for col in range(1, 50):
-            header = ws.cell(header_row, col).value
-            if header == 'YPD':
-                ypd_col = col
-                break
-        
-        if not ypd_col:
-            print(f'  ⚠️ YPD column not found')
-            continue
-        
-        # Update all data rows with new YPD
-        row = header_row + 1
-        rows_updated = 0
-        
-        while ws.cell(row, 1).value:
-            ws.cell(row, ypd_col).value = round(data['new_ypd'], 2)
-            rows_updated += 1
-            row += 1
-        
         print(f'  ✓ Updated {rows_updated} rows')
 
         old_ypd_str = f'{data["old_ypd"]:.2f}' if data["old_ypd"] else "TBD"
@@ -199,11 +150,10 @@ def update_units_and_ypd(results):
         print(f'  ✅ {property_name} updated successfully')
         print()
     
-    wb.save(MASTER_FILE)
-    wb.close()
-    
-    print('✅ Master file updated successfully')
+    print(f'✅ {changes.summary()}')
     print()
+    
+    return changes
 
 def verify_updates(results):
     """Verify that updates were applied correctly"""
@@ -229,7 +179,7 @@ def verify_updates(results):
     
     print()
 
-def create_summary_report(results):
+def create_summary_report(results, changes):
     """Create a summary report of the unit count corrections"""
     
     report_path = BASE_DIR / 'Portfolio_Reports' / 'UNIT_COUNT_CORRECTIONS_SUMMARY.md'
@@ -368,8 +318,8 @@ def create_summary_report(results):
 
 ## BACKUP INFORMATION
 
-**Backup File:** """ + BACKUP_FILE.name + """  
-**Location:** Portfolio_Reports/
+**Backup Snapshot:** """ + (changes.backup or "None (no changes written)") + """  
+**Restore:** `python Code/snapshot_store.py restore <snapshot>`
 
 ---
 
@@ -388,19 +338,18 @@ def main():
     # Show corrections
     results = show_corrections()
     
-    # Create backup
-    if not create_backup():
-        print('❌ Cannot proceed without backup')
+    if not MASTER_FILE.exists():
+        print(f'❌ Master file not found: {MASTER_FILE}')
         return
     
-    # Update master file
-    update_units_and_ypd(results)
+    # Update master file (backed up once by the change set)
+    changes = update_units_and_ypd(results)
     
     # Verify updates
     verify_updates(results)
     
     # Create summary report
-    create_summary_report(results)
+    create_summary_report(results, changes)
     
     print('=' * 80)
     print('UNIT COUNT CORRECTIONS COMPLETE')
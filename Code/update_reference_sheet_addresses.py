@@ -1,22 +1,28 @@
 """
 Update Property_Reference_Sheet with extracted addresses from invoices
+
+Reads the stored results of extract_addresses_from_invoices.py (address,
+confidence, source file/page) - no PDFs are opened here.
 """
 
 import pandas as pd
 import openpyxl
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from datetime import datetime
-import json
 import re
 
+from extract_addresses_from_invoices import load_addresses
+
 # File paths
 REFERENCE_FILE = "Portfolio_Reports/Property_Reference_Sheet.xlsx"
 ADDRESS_DATA_FILE = "Portfolio_Reports/addresses_data.json"
 OUTPUT_FILE = "Portfolio_Reports/Property_Reference_Sheet.xlsx"
 
+# Addresses below this confidence are flagged for a manual check
+REVIEW_CONFIDENCE = 0.8
+
 # Load extracted addresses
-with open(ADDRESS_DATA_FILE, 'r') as f:
-    addresses = json.load(f)
+addresses = load_addresses(ADDRESS_DATA_FILE)
 
 # Parse addresses to extract components
 def parse_address(full_address):
@@ -109,7 +115,8 @@ for idx, row in df.iterrows():
     prop_name = row['Property Name']
 
     if prop_name in addresses:
-        full_addr = addresses[prop_name]
+        result = addresses[prop_name]
+        full_addr = result['address']
         parsed = parse_address(full_addr)
 
         df.at[idx, 'Address'] = parsed['street']
@@ -121,6 +128,10 @@ for idx, row in df.iterrows():
         print(f"  Full: {full_addr}")
         print(f"  Street: {parsed['street']}")
         print(f"  City: {parsed['city']}, {parsed['state']} {parsed['zip']}")
+        source = f"{result['source_file']} page {result['page']}" if result['source_file'] else result['method']
+        print(f"  Source: {source or 'not found'} (confidence {result['confidence']})")
+        if result['confidence'] < REVIEW_CONFIDENCE:
+            print("  [REVIEW] Address not confirmed by an invoice")
 
 # Create updated workbook with formatting
 wb = openpyxl.Workbook()
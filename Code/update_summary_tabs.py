@@ -2,16 +2,13 @@
 Update summary tabs in master file with complete service details and YPD
 """
 
-import pandas as pd
-import openpyxl
 from pathlib import Path
-from datetime import datetime
-import shutil
+
+from workbook_changes import WorkbookChanges
 
 # Paths
 BASE_DIR = Path(__file__).parent.parent
 MASTER_FILE = BASE_DIR / "Portfolio_Reports" / "MASTER_Portfolio_Complete_Data.xlsx"
-BACKUP_FILE = BASE_DIR / "Portfolio_Reports" / f"MASTER_Portfolio_Complete_Data_BACKUP_SUMMARY_UPDATE_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
 # Property data
 PROPERTY_DATA = {
@@ -117,162 +114,49 @@ PROPERTY_DATA = {
     }
 }
 
-def create_backup():
-    """Create backup before updating"""
-    print('=' * 80)
-    print('CREATING BACKUP')
-    print('=' * 80)
-    print()
-    
-    if MASTER_FILE.exists():
-        shutil.copy2(MASTER_FILE, BACKUP_FILE)
-        print(f'✅ Backup created: {BACKUP_FILE.name}')
-        print()
-        return True
-    else:
-        print(f'❌ Master file not found: {MASTER_FILE}')
-        return False
+def update_property_overview(changes):
+    """Queue Property Overview updates"""
+    operations = []
+    for prop_name, data in PROPERTY_DATA.items():
+        operations += [
+            changes.set_cell('Property Overview', prop_name, 'Container Count', data['containers']),
+            changes.set_cell('Property Overview', prop_name, 'Container Size', data['container_size']),
+            changes.set_cell('Property Overview', prop_name, 'Service Frequency', data['frequency']),
+            changes.set_cell('Property Overview', prop_name, 'Monthly Yards', round(data['monthly_yards'], 2)),
+            changes.set_cell('Property Overview', prop_name, 'YPD', round(data['ypd'], 2)),
+        ]
+    return operations
 
-def update_property_overview():
-    """Update Property Overview tab"""
-    print('Updating: Property Overview')
-    print('-' * 80)
-    
-    wb = openpyxl.load_workbook(MASTER_FILE)
-    
-    if 'Property Overview' not in wb.sheetnames:
-        print('  ⚠️ Sheet not found')
-        wb.close()
-        return False
-    
-    ws = wb['Property Overview']
-    
-    # Find or add columns
-    headers = []
-    for col in range(1, 20):
-        header = ws.cell(1, col).value
-        if header:
-            headers.append(header)
-        else:
-            break
-    
-    # Add missing columns
-    new_columns = ['Container Count', 'Container Size', 'Service Frequency', 'Monthly Yards', 'YPD']
-    
-    col_map = {}
-    next_col = len(headers) + 1
-    
-    for new_col in new_columns:
-        if new_col in headers:
-            col_map[new_col] = headers.index(new_col) + 1
+def update_yards_per_door_tab(changes):
+    """Queue Yards Per Door updates"""
+    operations = []
+    for prop_name, data in PROPERTY_DATA.items():
+        # Add performance rating
+        ypd = data['ypd']
+        if ypd <= 2.0:
+            performance = 'Excellent'
+        elif ypd <= 2.25:
+            performance = 'Good'
         else:
-            ws.cell(1, next_col).value = new_col
-            col_map[new_col] = next_col
-            next_col += 1
-    
-    # Update data rows
-    row = 2
-    rows_updated = 0
-    
-    while ws.cell(row, 1).value:
-        prop_name = ws.cell(row, 1).value
-        
-        if prop_name in PROPERTY_DATA:
-            data = PROPERTY_DATA[prop_name]
-            
-            ws.cell(row, col_map['Container Count']).value = data['containers']
-            ws.cell(row, col_map['Container Size']).value = data['container_size']
-            ws.cell(row, col_map['Service Frequency']).value = data['frequency']
-            ws.cell(row, col_map['Monthly Yards']).value = round(data['monthly_yards'], 2)
-            ws.cell(row, col_map['YPD']).value = round(data['ypd'], 2)
-            
-            rows_updated += 1
-        
-        row += 1
-    
-    wb.save(MASTER_FILE)
-    wb.close()
-    
-    print(f'  ✅ Updated {rows_updated} properties')
-    print()
-    
-    return True
+            performance = 'High'
+
+        operations += [
+            changes.set_cell('Yards Per Door', prop_name, 'Units', data['units']),
+            changes.set_cell('Yards Per Door', prop_name, 'Containers', data['containers']),
+            changes.set_cell('Yards Per Door', prop_name, 'Container Size', data['container_size']),
+            changes.set_cell('Yards Per Door', prop_name, 'Monthly Yards', round(data['monthly_yards'], 2)),
+            changes.set_cell('Yards Per Door', prop_name, 'YPD', round(data['ypd'], 2)),
+            changes.set_cell('Yards Per Door', prop_name, 'Performance', performance),
+        ]
+    return operations
 
-def update_yards_per_door_tab():
-    """Update Yards Per Door tab"""
-    print('Updating: Yards Per Door')
+def print_tab_result(sheet_name, operations):
+    """Properties updated on one tab"""
+    print(f'Updated: {sheet_name}')
     print('-' * 80)
-    
-    wb = openpyxl.load_workbook(MASTER_FILE)
-    
-    if 'Yards Per Door' not in wb.sheetnames:
-        print('  ⚠️ Sheet not found')
-        wb.close()
-        return False
-    
-    ws = wb['Yards Per Door']
-    
-    # Find or add columns
-    headers = []
-    for col in range(1, 20):
-        header = ws.cell(1, col).value
-        if header:
-            headers.append(header)
-        else:
-            break
-    
-    # Ensure we have the right columns
-    required_columns = ['Property', 'Units', 'Containers', 'Container Size', 'Monthly Yards', 'YPD', 'Performance']
-    
-    col_map = {}
-    next_col = len(headers) + 1
-    
-    for req_col in required_columns:
-        if req_col in headers:
-            col_map[req_col] = headers.index(req_col) + 1
-        else:
-            ws.cell(1, next_col).value = req_col
-            col_map[req_col] = next_col
-            next_col += 1
-    
-    # Update data rows
-    row = 2
-    rows_updated = 0
-    
-    while ws.cell(row, 1).value:
-        prop_name = ws.cell(row, 1).value
-        
-        if prop_name in PROPERTY_DATA:
-            data = PROPERTY_DATA[prop_name]
-            
-            ws.cell(row, col_map['Units']).value = data['units']
-            ws.cell(row, col_map['Containers']).value = data['containers']
-            ws.cell(row, col_map['Container Size']).value = data['container_size']
-            ws.cell(row, col_map['Monthly Yards']).value = round(data['monthly_yards'], 2)
-            ws.cell(row, col_map['YPD']).value = round(data['ypd'], 2)
-            
-            # Add performance rating
-            ypd = data['ypd']
-            if ypd <= 2.0:
-                performance = 'Excellent'
-            elif ypd <= 2.25:
-                performance = 'Good'
-            else:
-                performance = 'High'
-            
-            ws.cell(row, col_map['Performance']).value = performance
-            
-            rows_updated += 1
-        
-        row += 1
-    
-    wb.save(MASTER_FILE)
-    wb.close()
-    
+    rows_updated = len({op.row for op in operations if op.result})
     print(f'  ✅ Updated {rows_updated} properties')
     print()
-    
-    return True
 
 def main():
     """Main function"""
@@ -282,19 +166,25 @@ def main():
     print('=' * 80)
     print()
     
-    # Create backup
-    if not create_backup():
-        print('❌ Cannot proceed without backup')
+    if not MASTER_FILE.exists():
+        print(f'❌ Master file not found: {MASTER_FILE}')
         return
     
-    # Update tabs
+    # Update tabs - one load, one save and one backup for both
     print('=' * 80)
     print('UPDATING TABS')
     print('=' * 80)
     print()
     
-    update_property_overview()
-    update_yards_per_door_tab()
+    changes = WorkbookChanges(MASTER_FILE, label='SUMMARY_UPDATE')
+    overview_ops = update_property_overview(changes)
+    ypd_ops = update_yards_per_door_tab(changes)
+    changes.commit()
+    
+    print_tab_result('Property Overview', overview_ops)
+    print_tab_result('Yards Per Door', ypd_ops)
+    print(changes.summary())
+    print()
     
     # Summary
     print('=' * 80)
@@ -0,0 +1,406 @@
+"""
+Vendor Parser Registry
+Text-layer invoice parsers for each hauler/city, with vendor auto-detection
+
+Consolidates the one-off regex logic from extract_orion_prosper_invoices.py
+(Republic's run-together text, e.g. "TotalAmountDue"), extract_service_from_invoices
+(container size/type/frequency in descriptions) and extract_addresses_from_invoices
+(service address) into one place. All patterns are compiled once at import so
+thousands of invoices can be parsed locally at CPU speed.
+
+Every parser returns the extraction_schema shape used by
+batch_extract_all_invoices.extract_invoice_with_vision, so text results and
+vision results are interchangeable downstream.
+
+USAGE:
+    from vendor_parsers import detect_vendor, parse_invoice_text
+
+    parser = detect_vendor(first_page_text)
+    extracted = parse_invoice_text(full_text, "invoice.pdf", first_page_text=first_page_text)
+"""
+
+import re
+from datetime import datetime
+
+IGNORECASE = re.IGNORECASE | re.MULTILINE
+
+# ---------------------------------------------------------------------------
+# Shared patterns
+# ---------------------------------------------------------------------------
+
+AMOUNT = r"\(?-?\$?\s*[\d,]*\d\.\d{2}\)?-?"
+
+DEFAULT_PATTERNS = {
+    "invoice_number": [
+        r"Invoice\s*(?:Number|No\.?|#)[:\s#]*([A-Z0-9][\w-]{3,})",
+        r"Bill\s*(?:Number|No\.?)[:\s#]*([A-Z0-9][\w-]{3,})",
+    ],
+    "account_number": [
+        r"Account\s*(?:Number|No\.?|#)[:\s#]*([\d][\d-]{3,})",
+        r"Customer\s*(?:ID|Number|No\.?)[:\s#]*([\d][\d-]{3,})",
+    ],
+    "invoice_date": [
+        r"Invoice\s*Date[:\s]*([A-Za-z]+\s*\d{1,2},\s*\d{4}|\d{1,2}/\d{1,2}/\d{2,4}|\d{4}-\d{2}-\d{2})",
+        r"(?:Bill|Statement)\s*Date[:\s]*([A-Za-z]+\s*\d{1,2},\s*\d{4}|\d{1,2}/\d{1,2}/\d{2,4}|\d{4}-\d{2}-\d{2})",
+    ],
+    "due_date": [
+        r"(?:Payment\s*)?Due\s*Date[:\s]*([A-Za-z]+\s*\d{1,2},\s*\d{4}|\d{1,2}/\d{1,2}/\d{2,4}|\d{4}-\d{2}-\d{2})",
+    ],
+    "amount_due": [
+        r"Total\s*Amount\s*Due[:\s]*(" + AMOUNT + ")",
+        r"Amount\s*Due[:\s]*(" + AMOUNT + ")",
+        r"Total\s*Due[:\s]*(" + AMOUNT + ")",
+        r"Total\s*Current\s*Charges[:\s]*(" + AMOUNT + ")",
+    ],
+    "service_period": [
+        r"Service\s*Period[:\s]*(\d{1,2}/\d{1,2}/\d{2,4}\s*(?:-|to|through)\s*\d{1,2}/\d{1,2}/\d{2,4})",
+        r"Billing\s*Period[:\s]*(\d{1,2}/\d{1,2}/\d{2,4}\s*(?:-|to|through)\s*\d{1,2}/\d{1,2}/\d{2,4})",
+    ],
+}
+
+# "PickupService 02/01-02/28 2.0000 $625.58 $1,251.16"
+LINE_ITEM_FULL = re.compile(
+    r"^(?:(?P<date>\d{1,2}/\d{1,2}(?:/\d{2,4})?)\s+)?"
+    r"(?P<description>.*?[A-Za-z].*?)\s+"
+    r"(?P<quantity>-?\d+(?:\.\d+)?)\s+"
+    r"\$?(?P<unit_rate>-?[\d,]*\d\.\d{2,4})\s+"
+    r"(?P<amount>" + AMOUNT + r")\s*$"
+)
+
+# "Fuel Recovery Fee $43.60"
+LINE_ITEM_SHORT = re.compile(
+    r"^(?:(?P<date>\d{1,2}/\d{1,2}(?:/\d{2,4})?)\s+)?"
+    r"(?P<description>.*?[A-Za-z].*?)\s+"
+    r"(?P<amount>" + AMOUNT + r")\s*$"
+)
+
+# Lines that carry amounts but are not charges ("Total...Tax" lines are:
+# Republic prints its only tax charges as "TotalCitySalesTax $26.76")
+NON_CHARGE_LINE = re.compile(
+    r"total(?![A-Za-z\s]*tax)|(?:before|pre|excl\w*)\s*-?\s*tax|balance|payment|amount\s*due|subtotal|previous|past\s*due|credit\s*card|"
+    r"page\s*\d|remit|please\s*pay|thank\s*you",
+    re.IGNORECASE
+)
+
+# Container details in descriptions: "8 YD", "30-YD", "2X30CY", "3X WK", "FEL"
+CONTAINER_SIZE = re.compile(r"(\d+(?:\.\d+)?)\s*-?\s*(?:YD|YARD|CY)S?\b", re.IGNORECASE)
+CONTAINER_FREQUENCY = re.compile(r"\b(\d)\s*X\s*(?:/?\s*(?:WK|WEEK|PER\s*WEEK))?\b", re.IGNORECASE)
+CONTAINER_TYPES = [
+    ("COMPACTOR", re.compile(r"compactor|\bcmp\b", re.IGNORECASE)),
+    ("FEL", re.compile(r"front\s*-?\s*load|\bFEL\b|\bFL\b", re.IGNORECASE)),
+    ("REL", re.compile(r"rear\s*-?\s*load|\bREL\b|\bcart\b", re.IGNORECASE)),
+]
+
+# Street address on one line (header region of page 1)
+ADDRESS_PATTERN = re.compile(
+    r"\d+\s+[NSEW]?\.?\s*[A-Za-z0-9\s]+?"
+    r"(?:St|Street|Ave|Avenue|Rd|Road|Dr|Drive|Pkwy|Parkway|Blvd|Boulevard|Way|Lane|Ln|Ct|Court|"
+    r"Circle|Cir|Trail|Trl|Pl|Place|Hwy|Highway|FM\s*\d+)\.?,?\s+"
+    r"[A-Za-z\s]+,?\s+[A-Z]{2}\s+\d{5}(?:-\d{4})?",
+    re.IGNORECASE
+)
+
+# Line item categories (first match wins) -> extraction_schema categories
+CATEGORY_RULES = [
+    ("fuel_surcharge", re.compile(r"fuel", re.IGNORECASE)),
+    ("franchise_fee", re.compile(r"franchise", re.IGNORECASE)),
+    ("env_charge", re.compile(r"environmental|\benv\b|recovery\s*fee|regulatory", re.IGNORECASE)),
+    ("contamination", re.compile(r"contaminat", re.IGNORECASE)),
+    ("tax", re.compile(r"\btax", re.IGNORECASE)),
+    ("overage", re.compile(r"overage|overflow|overload", re.IGNORECASE)),
+    ("extra_pickup", re.compile(r"extra|additional|on[\s-]*call|special|bulk", re.IGNORECASE)),
+    ("admin", re.compile(r"admin|late\s*fee|processing|invoice\s*fee|paper", re.IGNORECASE)),
+]
+
+DATE_FORMATS = ["%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d", "%B %d, %Y", "%b %d, %Y", "%B %d %Y"]
+
+
+# ---------------------------------------------------------------------------
+# Value helpers
+# ---------------------------------------------------------------------------
+
+def parse_amount(value):
+    """'$1,234.56' / '(12.00)' / '12.00-' -> float, or None"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    negative = text.startswith("(") or text.endswith("-") or text.startswith("-")
+    digits = re.sub(r"[^\d.]", "", text)
+    if not digits:
+        return None
+    try:
+        amount = float(digits)
+    except ValueError:
+        return None
+    return -amount if negative else amount
+
+
+def format_amount(amount):
+    """float -> extraction_schema amount string ('1250.00')"""
+    return f"{amount:.2f}" if amount is not None else None
+
+
+def normalize_date(value):
+    """Invoice date text -> 'YYYY-MM-DD', or None"""
+    if not value:
+        return None
+    text = re.sub(r"\s+", " ", value.strip())
+    # Republic runs month and day together: "February25,2025"
+    text = re.sub(r"^([A-Za-z]+)\s*(\d{1,2}),\s*(\d{4})$", r"\1 \2, \3", text)
+
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def categorize_line_item(description):
+    """Map a free-text charge description to an extraction_schema category"""
+    for category, pattern in CATEGORY_RULES:
+        if pattern.search(description or ""):
+            return category
+    return "base"
+
+
+def parse_container_info(description):
+    """Container size (yd), type (FEL/COMPACTOR/REL) and pickups/week from a description"""
+    description = description or ""
+
+    size_match = CONTAINER_SIZE.search(description)
+    frequency_match = CONTAINER_FREQUENCY.search(description)
+    container_type = next(
+        (name for name, pattern in CONTAINER_TYPES if pattern.search(description)),
+        None
+    )
+
+    return {
+        "container_size_yd": float(size_match.group(1)) if size_match else None,
+        "container_type": container_type,
+        "frequency_per_week": int(frequency_match.group(1)) if frequency_match else None,
+    }
+
+
+def find_address(text, max_lines=50):
+    """First street address in the first max_lines lines, or None"""
+    for line in text.split("\n")[:max_lines]:
+        match = ADDRESS_PATTERN.search(line)
+        if match:
+            return match.group(0).strip()
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Parsers
+# ---------------------------------------------------------------------------
+
+class VendorParser:
+    """Regex-driven parser for one vendor's invoice text layout"""
+
+    def __init__(self, key, vendor_name, detect, patterns=None, charges_start=None, charges_end=None):
+        self.key = key
+        self.vendor_name = vendor_name
+        self.detect = [re.compile(p, re.IGNORECASE) for p in detect]
+
+        # Vendor-specific patterns are tried before the shared defaults
+        patterns = patterns or {}
+        self.patterns = {
+            field: [re.compile(p, IGNORECASE) for p in patterns.get(field, []) + defaults]
+            for field, defaults in DEFAULT_PATTERNS.items()
+        }
+        self.charges_start = re.compile(charges_start, re.IGNORECASE) if charges_start else None
+        self.charges_end = re.compile(charges_end, re.IGNORECASE) if charges_end else None
+
+    def score(self, text):
+        """Detection score for text (0 = not this vendor)"""
+        return sum(len(pattern.findall(text)) for pattern in self.detect)
+
+    def find(self, field, text):
+        """First capture for field, or None"""
+        for pattern in self.patterns[field]:
+            match = pattern.search(text)
+            if match:
+                return match.group(1).strip()
+        return None
+
+    def charges_text(self, text):
+        """The section of text that holds line items (whole text if unbounded)"""
+        start = 0
+        if self.charges_start:
+            match = self.charges_start.search(text)
+            if match:
+                start = match.end()
+        end = len(text)
+        if self.charges_end:
+            match = self.charges_end.search(text, start)
+            if match:
+                end = match.start()
+        return text[start:end]
+
+    def parse_line_items(self, text):
+        line_items = []
+
+        for line in self.charges_text(text).split("\n"):
+            line = line.strip()
+            if not line or NON_CHARGE_LINE.search(line):
+                continue
+
+            match = LINE_ITEM_FULL.match(line) or LINE_ITEM_SHORT.match(line)
+            if not match:
+                continue
+
+            groups = match.groupdict()
+            description = groups["description"].strip()
+            amount = parse_amount(groups["amount"])
+            if amount is None:
+                continue
+
+            quantity = groups.get("quantity")
+            unit_rate = parse_amount(groups.get("unit_rate"))
+
+            item = {
+                "date": normalize_date(groups.get("date")),
+                "description": description,
+                "category": categorize_line_item(description),
+                "quantity": float(quantity) if quantity else None,
+                "uom": None,
+                "unit_rate": format_amount(unit_rate),
+                "extended_amount": format_amount(amount),
+                "notes": None,
+            }
+            item.update(parse_container_info(description))
+            line_items.append(item)
+
+        return line_items
+
+    def parse(self, text, source_file, property_name=None):
+        """Parse full invoice text into the extraction_schema shape"""
+        amount_due = parse_amount(self.find("amount_due", text))
+        service_period = self.find("service_period", text)
+        start_date = end_date = None
+        if service_period:
+            parts = re.split(r"\s*(?:-|to|through)\s*", service_period, maxsplit=1)
+            if len(parts) == 2:
+                start_date, end_date = normalize_date(parts[0]), normalize_date(parts[1])
+
+        return {
+            "source_file": source_file,
+            "document_type": "invoice",
+            "property_name": property_name,
+            "property_address": find_address(text),
+            "vendor_name": self.vendor_name,
+            "vendor_account_number": self.find("account_number", text),
+            "billing_period": {
+                "start_date": start_date,
+                "end_date": end_date,
+                "raw": service_period
+            },
+            "invoice": {
+                "invoice_number": self.find("invoice_number", text),
+                "invoice_date": normalize_date(self.find("invoice_date", text)),
+                "due_date": normalize_date(self.find("due_date", text)),
+                "amount_due": format_amount(amount_due),
+                "subtotal": None,
+                "line_items": self.parse_line_items(text)
+            },
+            "text_parser": self.key
+        }
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+VENDOR_PARSERS = {}
+
+
+def register_parser(parser):
+    """Add a parser to the registry (later registrations replace same key)"""
+    VENDOR_PARSERS[parser.key] = parser
+    return parser
+
+
+GENERIC_PARSER = VendorParser("generic", None, detect=[])
+
+register_parser(VendorParser(
+    "republic_services", "Republic Services",
+    detect=[r"republic\s*services", r"republicservices\.com"],
+    patterns={
+        # Republic's text layer drops spaces: "InvoiceNumber 0615-002287935"
+        "invoice_number": [r"InvoiceNumber\s+(\d+-\d+)"],
+        "account_number": [r"AccountNumber\s+([\d-]+)"],
+        "invoice_date": [r"InvoiceDate\s+([A-Za-z]+\d{1,2},\d{4})"],
+        "due_date": [r"DueDate\s+([A-Za-z]+\d{1,2},\d{4})"],
+        "amount_due": [r"TotalAmountDue\s*(" + AMOUNT + ")", r"CURRENTINVOICECHARGES\s*(" + AMOUNT + ")"],
+    },
+    charges_start=r"CURRENT INVOICE CHARGES",
+    charges_end=r"CURRENTINVOICECHARGES|PleaseReturnThis",
+))
+
+register_parser(VendorParser(
+    "waste_management", "Waste Management",
+    detect=[r"waste\s*management", r"\bwm\.com\b", r"WM\s*National\s*Services"],
+    patterns={
+        "account_number": [r"Customer\s*ID[:\s]*([\d-]{4,})"],
+        "amount_due": [r"Total\s*Current\s*Charges[:\s]*(" + AMOUNT + ")"],
+    },
+    charges_start=r"(?:Current\s*Invoice\s*Charges|Details\s*of\s*Service)",
+    charges_end=r"Total\s*Current\s*Charges",
+))
+
+register_parser(VendorParser(
+    "frontier_waste", "Frontier Waste Solutions",
+    detect=[r"frontier\s*waste"],
+    charges_start=r"Description",
+    charges_end=r"(?:Invoice\s*Total|Total\s*Due)",
+))
+
+register_parser(VendorParser(
+    "community_waste", "Community Waste Disposal",
+    detect=[r"community\s*waste\s*disposal", r"\bCWD\b"],
+    charges_start=r"Reference",
+    charges_end=r"(?:Please\s*Pay|Total\s*Due)",
+))
+
+register_parser(VendorParser(
+    "waste_connections", "Waste Connections of Florida",
+    detect=[r"waste\s*connections"],
+    charges_start=r"(?:Current\s*Charges|Description)",
+    charges_end=r"(?:Total\s*Current\s*Charges|Amount\s*Due)",
+))
+
+register_parser(VendorParser(
+    "ally_waste", "Ally Waste",
+    detect=[r"ally\s*waste"],
+    charges_start=r"Description",
+    charges_end=r"(?:Total|Balance\s*Due)",
+))
+
+for _city in ("Mesa", "Glendale", "McKinney"):
+    register_parser(VendorParser(
+        f"city_of_{_city.lower()}", f"City of {_city}",
+        detect=[rf"city\s*of\s*{_city}"],
+        patterns={
+            "invoice_number": [r"Statement\s*(?:Number|No\.?)[:\s#]*([\w-]{4,})"],
+            "amount_due": [r"Current\s*Charges[:\s]*(" + AMOUNT + ")"],
+        },
+        charges_start=r"(?:Current\s*Charges|Service\s*Charges|Charges\s*Detail)",
+        charges_end=r"(?:Total\s*Current\s*Charges|Total\s*Amount\s*Due|Amount\s*Due)",
+    ))
+
+
+def detect_vendor(first_page_text):
+    """Best-matching registered parser for page-1 text (GENERIC_PARSER if none match)"""
+    best, best_score = GENERIC_PARSER, 0
+    for parser in VENDOR_PARSERS.values():
+        score = parser.score(first_page_text or "")
+        if score > best_score:
+            best, best_score = parser, score
+    return best
+
+
+def parse_invoice_text(text, source_file, first_page_text=None, property_name=None):
+    """Detect the vendor from page 1 and parse the full text into extraction_schema shape"""
+    parser = detect_vendor(first_page_text if first_page_text is not None else text[:4000])
+    return parser.parse(text, source_file, property_name=property_name)
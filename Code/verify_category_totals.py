@@ -4,7 +4,7 @@ Verify Category Totals for Properties with Tax Issues
 Compare actual totals from property tabs vs. Spend by Category sheet
 """
 
-import pandas as pd
+from invoice_ledger import read_master_sheet
 
 def main():
     master_path = 'Portfolio_Reports/MASTER_Portfolio_Complete_Data.xlsx'
@@ -17,7 +17,7 @@ def main():
     print("="*80)
 
     # Read Spend by Category for comparison
-    df_spend = pd.read_excel(master_path, sheet_name='Spend by Category')
+    df_spend = read_master_sheet('Spend by Category', master_path)
 
     for prop in problem_properties:
         print(f"\n{prop}")
@@ -25,7 +25,7 @@ def main():
 
         # Read property tab
         try:
-            df_prop = pd.read_excel(master_path, sheet_name=prop)
+            df_prop = read_master_sheet(prop, master_path)
 
             print("\nACTUAL TOTALS (from property tab):")
             for cat in ['base', 'tax', 'overage', 'extra_pickup', 'admin', 'other']:
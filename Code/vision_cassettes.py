@@ -0,0 +1,177 @@
+"""
+Vision API Record/Replay Cassettes
+Offline transport for VisionClient: record live responses, replay them without network or key
+
+Record mode passes every messages.create() call through to the API and saves
+the response under a hash of the full request (model, prompt, tools, PDF
+data, max_tokens). Replay mode serves those responses from disk with an
+optional simulated latency, so the extraction path - concurrency, prompt
+warm-up, retries, structured output, Excel/JSON export - runs
+deterministically on a machine with no network, and downstream steps can be
+re-run from recorded responses at no API cost.
+
+Token bucket, AIMD limiter and usage accounting in VisionClient sit above
+the transport, so they behave (and are tallied) exactly as in a live run.
+
+Layout:
+    Extraction_Output/.vision_cassettes/<key[:2]>/<key>.json
+
+Environment:
+    VISION_CASSETTE_MODE=off       off | record | replay | auto (replay, record misses)
+    VISION_CASSETTE_DIR=<path>     Override cassette location
+    VISION_REPLAY_LATENCY=0        Seconds per replayed call, or "recorded"
+                                   to sleep for the latency seen when recording
+
+USAGE:
+    VISION_CASSETTE_MODE=record python Code/batch_extract_all_invoices.py
+    VISION_CASSETTE_MODE=replay VISION_REPLAY_LATENCY=recorded python Code/batch_extract_all_invoices.py
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from datetime import datetime
+
+from file_hashing import sha256_text
+
+# Bump when the request key or file layout changes
+CASSETTE_FORMAT_VERSION = 1
+
+MODES = ("off", "record", "replay", "auto")
+
+DEFAULT_CASSETTE_DIR = Path(__file__).resolve().parent.parent / "Extraction_Output" / ".vision_cassettes"
+CASSETTE_DIR = Path(os.environ.get("VISION_CASSETTE_DIR", DEFAULT_CASSETTE_DIR))
+CASSETTE_MODE = os.environ.get("VISION_CASSETTE_MODE", "off").lower()
+REPLAY_LATENCY = os.environ.get("VISION_REPLAY_LATENCY", "0")
+
+
+class CassetteMissError(LookupError):
+    """Replay mode was asked for a request that was never recorded"""
+
+
+def request_key(kwargs):
+    """Hash of everything that determines the response"""
+    return sha256_text(CASSETTE_FORMAT_VERSION, json.dumps(kwargs, sort_keys=True, default=str))
+
+
+def request_summary(kwargs):
+    """Small, readable description of a request (the PDF itself is not stored)"""
+    documents = []
+    for message in kwargs.get("messages", []):
+        content = message.get("content")
+        for block in content if isinstance(content, list) else []:
+            if block.get("type") == "document":
+                documents.append(sha256_text(block.get("source", {}).get("data", "")))
+
+    return {
+        "model": kwargs.get("model"),
+        "max_tokens": kwargs.get("max_tokens"),
+        "tools": [tool.get("name") for tool in kwargs.get("tools") or []],
+        "system_sha256": sha256_text(json.dumps(kwargs.get("system"), sort_keys=True)),
+        "document_sha256": documents
+    }
+
+
+def _to_dict(message):
+    if hasattr(message, "model_dump"):
+        return message.model_dump(mode="json")
+    return message.to_dict()
+
+
+def _to_message(data):
+    import anthropic
+    return anthropic.types.Message.model_validate(data)
+
+
+class CassetteStore:
+    """One JSON file per recorded request"""
+
+    def __init__(self, cassette_dir=CASSETTE_DIR):
+        self.cassette_dir = Path(cassette_dir)
+
+    def _path(self, key):
+        return self.cassette_dir / key[:2] / f"{key}.json"
+
+    def load(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def save(self, key, kwargs, message, latency_seconds):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "format": CASSETTE_FORMAT_VERSION,
+            "key": key,
+            "recorded_at": datetime.now().isoformat(),
+            "latency_seconds": round(latency_seconds, 3),
+            "request": request_summary(kwargs),
+            "response": _to_dict(message)
+        }
+        # Write-then-rename so a concurrent replay never sees half a cassette
+        temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(temp_path, path)
+
+
+class CassetteTransport:
+    """
+    Stand-in for the SDK client: transport.messages.create(**kwargs)
+
+    Args:
+        mode: "record", "replay" or "auto"
+        live_client: Callable returning the real SDK client (only called
+            when a request has to go to the API)
+        store: CassetteStore
+        latency: Seconds per replayed call, or "recorded"
+    """
+
+    def __init__(self, mode, live_client, store=None, latency=REPLAY_LATENCY):
+        if mode not in MODES or mode == "off":
+            raise ValueError(f"Unknown cassette mode {mode!r} (expected record, replay or auto)")
+        self.mode = mode
+        self.live_client = live_client
+        self.store = store or CassetteStore()
+        self.latency = latency
+        self.stats = {"replayed": 0, "recorded": 0}
+        self._lock = threading.Lock()
+        self.messages = self
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _replay_delay(self, entry):
+        if str(self.latency).lower() == "recorded":
+            return entry.get("latency_seconds", 0.0)
+        return float(self.latency or 0)
+
+    def create(self, **kwargs):
+        key = request_key(kwargs)
+
+        if self.mode in ("replay", "auto"):
+            entry = self.store.load(key)
+            if entry is not None:
+                delay = self._replay_delay(entry)
+                if delay > 0:
+                    time.sleep(delay)
+                self._count("replayed")
+                return _to_message(entry["response"])
+            if self.mode == "replay":
+                raise CassetteMissError(f"No cassette for request {key[:12]} "
+                                        f"(model {kwargs.get('model')}) in {self.store.cassette_dir}")
+
+        started = time.monotonic()
+        message = self.live_client().messages.create(**kwargs)
+        self.store.save(key, kwargs, message, time.monotonic() - started)
+        self._count("recorded")
+        return message
+
+    def summary(self):
+        return (f"Cassettes ({self.mode}): {self.stats['replayed']} replayed, "
+                f"{self.stats['recorded']} recorded in {self.store.cassette_dir}")
@@ -0,0 +1,492 @@
+"""
+Shared Vision API Client
+Rate-limited, retrying wrapper around anthropic.Anthropic used by every extractor
+
+- Token bucket caps request rate (VISION_REQUESTS_PER_MINUTE)
+- 429 / 529 / 5xx / connection errors are retried with exponential backoff
+  and full jitter instead of marking the invoice as failed
+- Retry-After / retry-after-ms headers are honoured and pause the whole
+  client, not just the calling thread
+- AIMD adaptive concurrency: calls in flight grow by ~1 per window of
+  successes and halve on every throttle response
+- Prompt caching: document_request() puts the static instructions/schema in
+  a cache_control system block ahead of the per-invoice document. The first
+  call with a new prefix runs alone so the rest of the run reads the cache
+  instead of all writing it at once. Cached vs uncached input tokens are
+  tallied in stats / summary()
+
+Point ANTHROPIC_BASE_URL (or base_url=) at Code/fake_vision_server.py to
+exercise the throttling paths locally without an API key, or set
+VISION_CASSETTE_MODE=record/replay (see vision_cassettes) to save real
+responses once and replay them offline.
+
+USAGE:
+    from vision_client import VisionClient
+
+    client = VisionClient(api_key=ANTHROPIC_API_KEY)
+    message = client.create_message(model=MODEL, max_tokens=4000, messages=[...])
+
+    # Static prompt cached across the run, document appended after it
+    message = client.create_message(model=MODEL, max_tokens=4000,
+                                    **document_request(pdf_data, prompt))
+"""
+
+import os
+import json
+import time
+import random
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+import anthropic
+
+from file_hashing import sha256_text
+from vision_cassettes import CASSETTE_MODE, CassetteStore, CassetteTransport
+
+# Defaults - override via environment
+REQUESTS_PER_MINUTE = float(os.environ.get("VISION_REQUESTS_PER_MINUTE", "50"))
+MAX_RETRIES = int(os.environ.get("VISION_MAX_RETRIES", "6"))
+INITIAL_CONCURRENCY = int(os.environ.get("VISION_INITIAL_CONCURRENCY", "4"))
+MAX_CONCURRENCY = int(os.environ.get("VISION_MAX_CONCURRENCY", "16"))
+
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+# Status codes worth retrying (529 = overloaded)
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+THROTTLE_STATUS_CODES = {429, 529}
+
+# How long later calls wait for the first call to write a new cached prefix
+PREFIX_WARMUP_TIMEOUT_SECONDS = 120.0
+
+# Per-document turn that follows the cached instructions
+DOCUMENT_INSTRUCTION = "Extract the data from this document following the instructions above."
+
+# Per-request turn for several documents packed into one call
+PACKED_DOCUMENTS_INSTRUCTION = (
+    "Extract the data from each document above following the instructions. "
+    "Return one entry in documents per document, with source_file set exactly "
+    "to the label given before that document."
+)
+
+USAGE_FIELDS = ("input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens", "output_tokens")
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a request may be sent"""
+
+    def __init__(self, rate_per_second, capacity=None):
+        self.rate = rate_per_second
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_second)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                else:
+                    wait = (tokens - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every caller off for seconds (server asked us to back off)"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on calls in flight: +1 per window of successes, halve on throttle"""
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, minimum=1, maximum=MAX_CONCURRENCY,
+                 decrease_factor=0.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, throttled=False):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit * self.decrease_factor)
+            else:
+                # Additive increase: a full window of successes adds one slot
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+def retry_after_seconds(error):
+    """Seconds requested by Retry-After / retry-after-ms headers, or None"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+
+    return None
+
+
+def backoff_seconds(attempt):
+    """Exponential backoff with full jitter for the given retry attempt (0-based)"""
+    ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def cached_system(*texts):
+    """System blocks for static instructions, with a cache breakpoint after the last one"""
+    blocks = [{"type": "text", "text": text} for text in texts]
+    blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    return blocks
+
+
+def document_request(pdf_data, instructions, instruction=DOCUMENT_INSTRUCTION):
+    """
+    system/messages kwargs for one PDF extraction with a cacheable prompt prefix
+
+    The instructions (prompt text + JSON schema) are identical for every
+    invoice in a run, so they go first as a cached system block; only the
+    base64 PDF and a one-line instruction differ per call. Prefixes shorter
+    than the model's minimum cacheable length are simply sent uncached.
+    """
+    return {
+        "system": cached_system(instructions),
+        "messages": [{
+            "role": "user",
+            "content": [
+                {
+                    "type": "document",
+                    "source": {
+                        "type": "base64",
+                        "media_type": "application/pdf",
+                        "data": pdf_data
+                    }
+                },
+                {
+                    "type": "text",
+                    "text": instruction
+                }
+            ]
+        }]
+    }
+
+
+def documents_request(documents, instructions, instruction=PACKED_DOCUMENTS_INSTRUCTION):
+    """
+    system/messages kwargs for several PDFs in one extraction call
+
+    Args:
+        documents: List of (source_file label, base64 PDF data)
+        instructions: Static prompt text, cached as in document_request()
+
+    Each PDF is preceded by a "Document source_file: <label>" line so results
+    can be mapped back to files (see invoice_packing.match_documents).
+    """
+    content = []
+    for label, pdf_data in documents:
+        content.append({"type": "text", "text": f"Document source_file: {label}"})
+        content.append({
+            "type": "document",
+            "source": {
+                "type": "base64",
+                "media_type": "application/pdf",
+                "data": pdf_data
+            }
+        })
+    content.append({"type": "text", "text": instruction})
+
+    return {
+        "system": cached_system(instructions),
+        "messages": [{"role": "user", "content": content}]
+    }
+
+
+def _cached_prefix_key(kwargs):
+    """Identity of the cache_control prefix in a request, or None if it has none"""
+    system = kwargs.get("system")
+    if not isinstance(system, list) or not any("cache_control" in block for block in system):
+        return None
+    return sha256_text(kwargs.get("model"), json.dumps(kwargs.get("tools"), sort_keys=True),
+                       json.dumps(system, sort_keys=True))
+
+
+def _document_bytes(kwargs):
+    """Approximate decoded size of the base64 documents in a request"""
+    total = 0
+    for message in kwargs.get("messages", []):
+        content = message.get("content")
+        for block in content if isinstance(content, list) else []:
+            if block.get("type") == "document":
+                total += len(block.get("source", {}).get("data", "")) * 3 // 4
+    return total
+
+
+def is_retryable(error):
+    """Transient failures: throttling, overload, server errors, dropped connections"""
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+class RetryingBatches:
+    """messages.batches calls routed through VisionClient.call_with_retries"""
+
+    def __init__(self, vision_client):
+        self._vision_client = vision_client
+        self._batches = vision_client._live_client().messages.batches
+
+    def create(self, **kwargs):
+        return self._vision_client.call_with_retries("BATCH CREATE RETRY", self._batches.create, **kwargs)
+
+    def retrieve(self, batch_id):
+        return self._vision_client.call_with_retries("BATCH STATUS RETRY", self._batches.retrieve, batch_id)
+
+    def results(self, batch_id):
+        """All results of an ended batch as a list (read in full, so a dropped stream is retried whole)"""
+        return self._vision_client.call_with_retries(
+            "BATCH RESULTS RETRY", lambda: list(self._batches.results(batch_id))
+        )
+
+
+class VisionClient:
+    """anthropic.Anthropic wrapper with rate limiting, retries and adaptive concurrency"""
+
+    def __init__(self, api_key=None, base_url=None, requests_per_minute=REQUESTS_PER_MINUTE,
+                 max_retries=MAX_RETRIES, initial_concurrency=INITIAL_CONCURRENCY,
+                 max_concurrency=MAX_CONCURRENCY, cassette_mode=CASSETTE_MODE, cassette_dir=None):
+        self.api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
+        self.base_url = base_url or os.environ.get("ANTHROPIC_BASE_URL")
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(requests_per_minute / 60.0, capacity=max(1.0, requests_per_minute / 60.0 * 5))
+        self.limiter = AdaptiveConcurrencyLimiter(initial_concurrency, maximum=max_concurrency)
+        self.stats = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0, "truncated": 0, "batched": 0}
+        self.stats.update({field: 0 for field in USAGE_FIELDS})
+        self._client = None
+        self._sdk_client = None
+        self._lock = threading.Lock()
+        self._warm_prefixes = {}
+        self._local = threading.local()
+
+        # Record/replay transport in place of the SDK client (vision_cassettes)
+        self.cassettes = None
+        if cassette_mode and cassette_mode != "off":
+            store = CassetteStore(cassette_dir) if cassette_dir else CassetteStore()
+            self.cassettes = CassetteTransport(cassette_mode, self._live_client, store)
+
+    def _live_client(self):
+        """Underlying SDK client, created on first use (SDK retries disabled - we own them)"""
+        with self._lock:
+            if self._sdk_client is None:
+                kwargs = {"api_key": self.api_key, "max_retries": 0}
+                if self.base_url:
+                    kwargs["base_url"] = self.base_url
+                self._sdk_client = anthropic.Anthropic(**kwargs)
+            return self._sdk_client
+
+    @property
+    def client(self):
+        """Object whose messages.create() is called: the cassette transport or the SDK client"""
+        if self.cassettes is not None:
+            return self.cassettes
+        return self._live_client()
+
+    @property
+    def batches(self):
+        """Message Batches API of the live SDK client, with the same backoff as messages (see bulk_extraction)"""
+        return RetryingBatches(self)
+
+    def call_with_retries(self, description, call, *args, **kwargs):
+        """
+        call(*args, **kwargs) retried on transient errors with backoff and Retry-After
+
+        For API calls other than messages.create (which has its own loop with
+        throttling and adaptive concurrency): the batch create / retrieve /
+        results endpoints of an overnight bulk run.
+        """
+        attempt = 0
+        while True:
+            try:
+                return call(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt, description)
+            time.sleep(delay)
+            attempt += 1
+
+    def _retry_delay(self, error, attempt, description="RETRY"):
+        """Seconds to wait before retrying error (a Retry-After pause applies to the whole client)"""
+        delay = retry_after_seconds(error)
+        if delay is None:
+            delay = backoff_seconds(attempt)
+        else:
+            self.bucket.pause(delay)
+        self._count("retries")
+        print(f"      {description}: {type(error).__name__} (status {getattr(error, 'status_code', 'n/a')}), "
+              f"attempt {attempt + 1}/{self.max_retries}, waiting {delay:.1f}s")
+        return delay
+
+    def record_batch_result(self, message):
+        """Count a response that arrived through a message batch; it is an API call like any other"""
+        self._count("calls")
+        self._count("batched")
+        self._record_usage(message)
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def count_truncation(self):
+        """Record a response cut off at max_tokens (see structured_output)"""
+        self._count("truncated")
+
+    def _record_usage(self, message):
+        usage = getattr(message, "usage", None)
+        if usage is None:
+            return
+        with self._lock:
+            for field in USAGE_FIELDS:
+                self.stats[field] += getattr(usage, field, None) or 0
+
+    @contextmanager
+    def track_calls(self):
+        """
+        Collect a record per create_message() made by this thread inside the block
+
+        Each record: latency_seconds, retries, throttled, document_bytes,
+        stop_reason, error and the USAGE_FIELDS token counts. Used by
+        extraction_metrics to attribute time and tokens to one invoice.
+        """
+        previous = getattr(self._local, "calls", None)
+        self._local.calls = calls = []
+        try:
+            yield calls
+        finally:
+            self._local.calls = previous
+
+    def _log_call(self, kwargs, started, retries, throttled, message=None, error=None):
+        calls = getattr(self._local, "calls", None)
+        if calls is None:
+            return
+        usage = getattr(message, "usage", None)
+        record = {
+            "latency_seconds": round(time.monotonic() - started, 3),
+            "retries": retries,
+            "throttled": throttled,
+            "document_bytes": _document_bytes(kwargs),
+            "stop_reason": getattr(message, "stop_reason", None),
+            "error": f"{type(error).__name__}: {error}" if error else None
+        }
+        record.update({field: (getattr(usage, field, None) or 0) for field in USAGE_FIELDS})
+        calls.append(record)
+
+    def create_message(self, **kwargs):
+        """messages.create() with prefix warm-up, throttling, backoff and Retry-After handling"""
+        prefix_key = _cached_prefix_key(kwargs)
+        if prefix_key is None:
+            return self._create_with_retries(kwargs)
+
+        with self._lock:
+            warmed = self._warm_prefixes.get(prefix_key)
+            first = warmed is None
+            if first:
+                warmed = self._warm_prefixes[prefix_key] = threading.Event()
+
+        if not first:
+            # Let the first call write the cache entry so this one can read it
+            warmed.wait(PREFIX_WARMUP_TIMEOUT_SECONDS)
+            return self._create_with_retries(kwargs)
+
+        try:
+            return self._create_with_retries(kwargs)
+        finally:
+            warmed.set()
+
+    def _create_with_retries(self, kwargs):
+        attempt = 0
+        throttle_count = 0
+        started = time.monotonic()
+
+        while True:
+            self.bucket.acquire()
+            self.limiter.acquire()
+            throttled = False
+
+            try:
+                self._count("calls")
+                message = self.client.messages.create(**kwargs)
+                self._record_usage(message)
+                self._log_call(kwargs, started, attempt, throttle_count, message=message)
+                return message
+            except Exception as e:
+                throttled = getattr(e, "status_code", None) in THROTTLE_STATUS_CODES
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    self._count("failures")
+                    self._log_call(kwargs, started, attempt, throttle_count + throttled, error=e)
+                    raise
+
+                delay = self._retry_delay(e, attempt)
+                if throttled:
+                    throttle_count += 1
+                    self._count("throttled")
+            finally:
+                self.limiter.release(throttled=throttled)
+
+            time.sleep(delay)
+            attempt += 1
+
+    def summary(self):
+        """Call/retry summary plus cached vs uncached input tokens for run output"""
+        stats = self.stats
+        total_input = stats["input_tokens"] + stats["cache_read_input_tokens"] + stats["cache_creation_input_tokens"]
+        cached_pct = (stats["cache_read_input_tokens"] / total_input * 100) if total_input else 0
+        lines = [
+            f"API: {stats['calls']} calls" + (f" ({stats['batched']} batched)" if stats["batched"] else "")
+            + f", {stats['retries']} retries, {stats['throttled']} throttled, {stats['failures']} failed, "
+            f"{stats['truncated']} truncated, concurrency limit {self.limiter.limit:.1f}",
+            f"Tokens: {stats['input_tokens']:,} uncached + {stats['cache_read_input_tokens']:,} cache-read + "
+            f"{stats['cache_creation_input_tokens']:,} cache-write input ({cached_pct:.0f}% read from cache), "
+            f"{stats['output_tokens']:,} output"
+        ]
+        if self.cassettes:
+            lines.append(self.cassettes.summary())
+        return "\n".join(lines)
@@ -0,0 +1,320 @@
+"""
+Workbook Change Sets
+Queue typed edits to a workbook and commit them in one session, atomically
+
+The fix scripts each used to shutil.copy a full backup, load the whole
+master workbook with openpyxl, change a few cells and save() - once per
+function, so a script touching two tabs loaded and saved twice and every
+run left another full copy behind. A WorkbookChanges batch queues its edits
+as operations and commits them together:
+
+  1. Load the workbook once and apply every operation in order
+  2. Nothing changed (values already current) -> no save, no backup
+  3. Save to a temp file beside the target and rename it over the target,
+     so a crash mid-save never leaves a truncated master file
+  4. One snapshot of the previous version for the whole batch (see
+     snapshot_store - unchanged sheets are not stored again)
+  5. Re-import the invoice ledger when it tracks this workbook
+
+Operations:
+    SetCell(sheet, row, column, value)    row: number or column-A key (property name)
+                                          column: number or header (added when missing)
+    FillColumn(sheet, column, value)      every data row of an existing column
+    AppendRows(sheet, rows)               rows after the last used row
+    ReplaceSheet(sheet, df)               drop and rewrite a whole tab
+
+An operation on a sheet, keyed row or fill column the workbook does not
+have is skipped with a warning (result None), like the scripts' own
+"Sheet not found" checks.
+
+USAGE:
+    from workbook_changes import WorkbookChanges
+
+    with WorkbookChanges(MASTER_FILE, label="YPD_FIX") as changes:
+        changes.fill_column("Tempe Vista", "YPD", 2.65)
+        changes.set_cell("Yards Per Door", "Tempe Vista", "YPD", 2.65)
+    print(changes.summary())
+"""
+
+import os
+from pathlib import Path
+
+import openpyxl
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils.dataframe import dataframe_to_rows
+
+from invoice_ledger import MASTER_FILE, sync_from_master
+from snapshot_store import store
+
+# Header rows sit at the top; some tabs have a title row or two above them
+HEADER_SEARCH_ROWS = 10
+
+HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+MAX_COLUMN_WIDTH = 50
+
+
+def find_header_row(ws):
+    """First row whose column A mentions "Property" (row 1 when none does)"""
+    for row in range(1, HEADER_SEARCH_ROWS):
+        value = ws.cell(row, 1).value
+        if value and 'Property' in str(value):
+            return row
+    return 1
+
+
+def header_columns(ws, header_row):
+    """Header text -> column number"""
+    columns = {}
+    for column in range(1, ws.max_column + 1):
+        header = ws.cell(header_row, column).value
+        if header is not None and header not in columns:
+            columns[header] = column
+    return columns
+
+
+def data_rows(ws, header_row):
+    """Row numbers below the header, up to the first blank column A"""
+    row = header_row + 1
+    while ws.cell(row, 1).value:
+        yield row
+        row += 1
+
+
+class Operation:
+    """One queued edit to one sheet"""
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.changed = 0
+        self.result = None
+
+    def run(self, wb):
+        """
+        Apply to an open workbook
+
+        Returns:
+            Rows written, or None when the sheet (or keyed row / column) is missing
+        """
+        if self.sheet not in wb.sheetnames:
+            print(f"   WARNING: Sheet not found: {self.sheet} - skipped {self}")
+            return None
+        return self.apply(wb[self.sheet])
+
+    def _set(self, cell, value):
+        if cell.value != value:
+            cell.value = value
+            self.changed += 1
+
+    def _column(self, ws, header_row, column):
+        """Column number for a number or header name, adding the header when missing"""
+        if isinstance(column, int):
+            return column
+        columns = header_columns(ws, header_row)
+        if column not in columns:
+            columns[column] = max(columns.values(), default=0) + 1
+            self._set(ws.cell(header_row, columns[column]), column)
+        return columns[column]
+
+
+class SetCell(Operation):
+    def __init__(self, sheet, row, column, value):
+        super().__init__(sheet)
+        self.row = row
+        self.column = column
+        self.value = value
+
+    def __str__(self):
+        return f"set {self.sheet}[{self.row}, {self.column}]"
+
+    def apply(self, ws):
+        header_row = find_header_row(ws)
+        row = self.row
+        if not isinstance(row, int):
+            row = next((r for r in data_rows(ws, header_row) if ws.cell(r, 1).value == self.row), None)
+            if row is None:
+                print(f"   WARNING: No row {self.row!r} in {self.sheet} - skipped {self}")
+                return None
+        self._set(ws.cell(row, self._column(ws, header_row, self.column)), self.value)
+        return 1
+
+
+class FillColumn(Operation):
+    def __init__(self, sheet, column, value):
+        super().__init__(sheet)
+        self.column = column
+        self.value = value
+
+    def __str__(self):
+        return f"fill {self.sheet}[{self.column}]"
+
+    def apply(self, ws):
+        header_row = find_header_row(ws)
+        column = self.column
+        if not isinstance(column, int):
+            column = header_columns(ws, header_row).get(column)
+            if column is None:
+                print(f"   WARNING: No {self.column!r} column in {self.sheet} - skipped {self}")
+                return None
+        rows = 0
+        for row in data_rows(ws, header_row):
+            self._set(ws.cell(row, column), self.value)
+            rows += 1
+        return rows
+
+
+class AppendRows(Operation):
+    def __init__(self, sheet, rows, alignment=None):
+        super().__init__(sheet)
+        self.rows = [list(row) for row in rows]
+        self.alignment = alignment
+
+    def __str__(self):
+        return f"append {len(self.rows)} rows to {self.sheet}"
+
+    def apply(self, ws):
+        for values in self.rows:
+            ws.append(values)
+            self.changed += len(values)
+            if self.alignment is not None:
+                for cell in ws[ws.max_row]:
+                    cell.alignment = self.alignment
+        return len(self.rows)
+
+
+class ReplaceSheet(Operation):
+    """Drop a tab (when present) and write a DataFrame in its place with a styled header"""
+
+    def __init__(self, sheet, df):
+        super().__init__(sheet)
+        self.df = df
+        self.replaced = False
+
+    def __str__(self):
+        return f"replace {self.sheet}"
+
+    def run(self, wb):
+        if self.sheet in wb.sheetnames:
+            wb.remove(wb[self.sheet])
+            self.replaced = True
+        return self.apply(wb.create_sheet(self.sheet))
+
+    def apply(self, ws):
+        for values in dataframe_to_rows(self.df, index=False, header=True):
+            ws.append(values)
+            self.changed += len(values)
+
+        for cell in ws[1]:
+            cell.fill = HEADER_FILL
+            cell.font = HEADER_FONT
+            cell.alignment = Alignment(horizontal="center", vertical="center")
+
+        for column in ws.columns:
+            width = max(len(str(cell.value)) for cell in column)
+            ws.column_dimensions[column[0].column_letter].width = min(width + 2, MAX_COLUMN_WIDTH)
+        return len(self.df)
+
+
+class WorkbookChanges:
+    """A batch of edits to one workbook, committed in a single load/save"""
+
+    def __init__(self, path=MASTER_FILE, label="UPDATE", output_path=None):
+        """
+        Args:
+            path: Workbook to edit
+            label: Tag of the pre-change snapshot (e.g. "YPD_FIX")
+            output_path: Write the result here instead, leaving path untouched
+                (no backup is needed then)
+        """
+        self.path = Path(path)
+        self.label = label
+        self.output_path = Path(output_path) if output_path else None
+        self.operations = []
+        self.results = []
+        self.backup = None
+        self.committed = False
+
+    def __len__(self):
+        return len(self.operations)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
+
+    # -- queue -------------------------------------------------------------
+
+    def add(self, operation):
+        self.operations.append(operation)
+        return operation
+
+    def set_cell(self, sheet, row, column, value):
+        return self.add(SetCell(sheet, row, column, value))
+
+    def fill_column(self, sheet, column, value):
+        return self.add(FillColumn(sheet, column, value))
+
+    def append_rows(self, sheet, rows, alignment=None):
+        return self.add(AppendRows(sheet, rows, alignment))
+
+    def replace_sheet(self, sheet, df):
+        return self.add(ReplaceSheet(sheet, df))
+
+    # -- commit ------------------------------------------------------------
+
+    @property
+    def target(self):
+        return self.output_path or self.path
+
+    @property
+    def changed(self):
+        return sum(operation.changed for operation in self.operations)
+
+    def commit(self):
+        """
+        Apply every queued operation and write the workbook once
+
+        Returns:
+            Per-operation results in queue order (rows written, None = skipped)
+        """
+        if self.committed:
+            return self.results
+        self.committed = True
+
+        wb = openpyxl.load_workbook(self.path)
+        for operation in self.operations:
+            operation.result = operation.run(wb)
+        self.results = [operation.result for operation in self.operations]
+        if not self.changed:
+            wb.close()
+            print(f"   {self.target.name}: already up to date - not saved")
+            return self.results
+
+        temp_path = self.target.with_name(f".{self.target.stem}.{os.getpid()}.tmp{self.target.suffix}")
+        try:
+            wb.save(temp_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        finally:
+            wb.close()
+
+        if self.output_path is None:
+            self.backup = store.snapshot(self.path, label=self.label)["id"]
+        os.replace(temp_path, self.target)
+
+        sync_from_master(self.target)
+        return self.results
+
+    def summary(self):
+        if not self.committed:
+            return f"{self.target.name}: {len(self.operations)} changes queued"
+        if not self.changed:
+            return f"{self.target.name}: no changes"
+        skipped = sum(1 for result in self.results if result is None)
+        backup = f", previous version in snapshot {self.backup}" if self.backup else ""
+        return (f"{self.target.name}: {self.changed} cells changed by {len(self.operations) - skipped} "
+                f"operations in one save" + (f" ({skipped} skipped)" if skipped else "") + backup)